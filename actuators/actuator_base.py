@@ -1,18 +1,21 @@
-import paho.mqtt.client as mqtt
+import logging
 import time
+from transport.mqtt_transport import MqttTransport
+
+logger = logging.getLogger(__name__)
 
 class ActuatorBase:
-    def __init__(self, name, topic):
+    def __init__(self, name, topic, broker="localhost", port=1883, transport=None):
         self.name = name
         self.topic = topic
-        self.client = mqtt.Client(f"Actuator_{name}")
+        # Conexão MQTT compartilhada, se injetada; caso contrário, uma conexão própria
+        self.transport = transport or MqttTransport(f"Actuator_{name}", broker, port)
         self.active = False
 
-    def connect(self, broker="localhost", port=1883):
-        self.client.connect(broker, port)
-        self.client.on_message = self.on_message
-        self.client.subscribe(self.topic)
-        print(f"{self.name} conectado ao broker MQTT e assinando o tópico {self.topic}")
+    def connect(self):
+        self.transport.start()
+        self.transport.subscribe(self.topic, self.on_message)
+        logger.info("%s conectado ao broker MQTT e assinando o tópico %s", self.name, self.topic)
 
     def on_message(self, client, userdata, message):
         """Recebe comandos e processa ações."""
@@ -22,36 +25,35 @@ class ActuatorBase:
         elif command == "OFF":
             self.deactivate()
         else:
-            print(f"Comando inválido recebido por {self.name}: {command}")
+            logger.warning("Comando inválido recebido por %s: %s", self.name, command)
         self.publish_state()
 
     def publish_state(self):
         """Publica o estado atual do atuador no tópico de estado."""
         state_topic = f"{self.topic}/state"
         state = "ON" if self.active else "OFF"
-        self.client.publish(state_topic, state)
-        print(f"{self.name}: Estado publicado no tópico {state_topic} - {state}")
+        self.transport.publish(state_topic, state)
+        logger.debug("%s: Estado publicado no tópico %s - %s", self.name, state_topic, state)
 
 
     def activate(self):
         if not self.active:
             self.active = True
-            print(f"{self.name} ativado!")
+            logger.info("%s ativado!", self.name)
             self.perform_action()
 
     def deactivate(self):
         if self.active:
             self.active = False
-            print(f"{self.name} desativado!")
+            logger.info("%s desativado!", self.name)
 
     def perform_action(self):
         raise NotImplementedError("Este método deve ser implementado pela classe derivada.")
 
     def start(self):
         self.connect()
-        self.client.loop_start()
 
     def stop(self):
-        self.client.loop_stop()
-        self.client.disconnect()
-        print(f"{self.name} desconectado do broker MQTT")
+        self.transport.unsubscribe(self.topic, self.on_message)
+        self.transport.stop()
+        logger.info("%s desconectado do broker MQTT", self.name)
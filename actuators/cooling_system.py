@@ -1,9 +1,12 @@
+import logging
 from actuators.actuator_base import ActuatorBase
 
+logger = logging.getLogger(__name__)
+
 class CoolingActuator(ActuatorBase):
-    def __init__(self, topic="agriculture/actuators/cooling"):
-        super().__init__("Refrigeração", topic)
+    def __init__(self, topic="agriculture/actuators/cooling", **kwargs):
+        super().__init__("Refrigeração", topic, **kwargs)
 
     def perform_action(self):
         if self.active:
-            print("❄️ Sistema de refrigeração ativado! Resfriando a estufa.")
+            logger.info("❄️ Sistema de refrigeração ativado! Resfriando a estufa.")
@@ -1,9 +1,12 @@
+import logging
 from actuators.actuator_base import ActuatorBase
 
+logger = logging.getLogger(__name__)
+
 class IrrigationActuator(ActuatorBase):
-    def __init__(self, topic="agriculture/actuators/irrigation"):
-        super().__init__("Irrigação", topic)
+    def __init__(self, topic="agriculture/actuators/irrigation", **kwargs):
+        super().__init__("Irrigação", topic, **kwargs)
 
     def perform_action(self):
         if self.active:
-            print("💧 Sistema de irrigação ativado! Fornecendo água às plantas.")
+            logger.info("💧 Sistema de irrigação ativado! Fornecendo água às plantas.")
@@ -1,9 +1,12 @@
+import logging
 from actuators.actuator_base import ActuatorBase
 
+logger = logging.getLogger(__name__)
+
 class LightingActuator(ActuatorBase):
-    def __init__(self, topic="agriculture/actuators/lighting"):
-        super().__init__("Iluminação", topic)
+    def __init__(self, topic="agriculture/actuators/lighting", **kwargs):
+        super().__init__("Iluminação", topic, **kwargs)
 
     def perform_action(self):
         if self.active:
-            print("💡 Sistema de iluminação ativado! Garantindo luz para as plantas.")
+            logger.info("💡 Sistema de iluminação ativado! Garantindo luz para as plantas.")
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncEngine:
+    """Loop asyncio único, em uma thread, que executa o transporte MQTT, as filas de ingestão,
+    a escrita em lote e os sensores de todos os controladores do processo (ENGINE=asyncio).
+
+    O código síncrono dos controladores (regras, failover, consultas das chamadas RPC) continua
+    igual: roda no loop quando chamado pelo transporte e nas threads de quem chama nos demais casos.
+    """
+
+    def __init__(self, name="AsyncEngine"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run_loop, name=self.name, daemon=True)
+            self.thread.start()
+            logger.info("[ENGINE] Loop asyncio iniciado.")
+        return self
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.thread = None
+
+    def in_loop(self):
+        return threading.current_thread() is self.thread
+
+    def submit(self, coroutine):
+        """Agenda a corrotina no loop e retorna um concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Executa a corrotina no loop e aguarda o resultado (não pode ser chamada de dentro do loop)."""
+        if self.in_loop():
+            coroutine.close()
+            raise RuntimeError("Chamada bloqueante dentro do loop do motor asyncio")
+        return self.submit(coroutine).result(timeout)
+
+    def call_soon(self, callback, *args):
+        """Executa o callback no loop: imediatamente, se já estiver nele."""
+        if self.in_loop():
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def stats(self):
+        return {
+            "running": self.thread is not None and self.thread.is_alive(),
+            "tasks": len(asyncio.all_tasks(self.loop)) if self.thread is not None else 0,
+        }
@@ -0,0 +1,354 @@
+"""Benchmark ponta a ponta do middleware sem serviços externos.
+
+Sobe um broker MQTT em processo (local_broker.py) e um MongoDB em memória (local_mongo.py)
+e exercita o Middleware e os controladores reais (CoolingController, IrrigationController,
+LightingController) pelo MqttTransport/paho de verdade. Mede:
+
+- vazão de ingestão (mensagens/s processadas pelos controladores principais);
+- latência leitura -> comando (p50/p99), do publish da leitura até o comando chegar ao atuador;
+- escritas/s no MongoDB (documentos inseridos + rollups atualizados);
+- latência de get_historical_sensor_data em função do tamanho do histórico (buffer frio e aquecido);
+- tempo de recuperação de simulate_failover (até o novo principal responder a uma leitura),
+  com failover frio e hot standby;
+- threads do processo com o motor de threads ou o asyncio (--engine asyncio, requer aiomqtt),
+  opcionalmente com mais zonas com sensores simulados ativos (--zones);
+- com --rule-batch-interval, as regras avaliadas em lote (RuleTable) em vez de por mensagem.
+
+Os resultados são gravados em JSON para comparar execuções:
+    python3 benchmarks/bench_end_to_end.py --output resultado.json
+    python3 benchmarks/bench_end_to_end.py --output novo.json --compare resultado.json
+    python3 benchmarks/bench_end_to_end.py --engine asyncio --zones 20 --output asyncio.json --compare resultado.json
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_engine import AsyncEngine
+from benchmarks.local_broker import LocalBroker
+from benchmarks.local_mongo import InMemoryMongoManager
+from controllers.controller_base import DEFAULT_ZONE
+from controllers.cooling_controller import CoolingController
+from logging_setup import configure_logging
+from middleware_app import Middleware
+from transport.async_mqtt_transport import AsyncMqttTransport
+from transport.mqtt_transport import MqttTransport
+
+# Tipo de controlador -> (leitura que liga o atuador, leitura que o desliga)
+GROUPS = {
+    "cooling": (35, 20),
+    "irrigation": (10, 50),
+    "lighting": (100, 5000),
+}
+
+# Destino padrão dos resultados (ignorado pelo git)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies):
+    return {
+        "samples": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def wait_until(condition, timeout=30.0, interval=0.005):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condição não atingida dentro do tempo limite.")
+        time.sleep(interval)
+
+
+def reading(value):
+    return json.dumps({"valor": value, "unidade": "bench"})
+
+
+class Environment:
+    """Broker, MongoDB em memória, Middleware e um cliente de carga ligados entre si."""
+
+    def __init__(self, args, hot_standby):
+        self.broker = LocalBroker().start()
+        self.mongo = InMemoryMongoManager()
+        self.engine = None
+        if args.engine == "asyncio":
+            self.engine = AsyncEngine().start()
+            self.transport = AsyncMqttTransport(self.engine, "Bench_Middleware", "127.0.0.1", self.broker.port)
+        else:
+            self.transport = MqttTransport("Bench_Middleware", "127.0.0.1", self.broker.port)
+        self.options = {
+            "mongo_manager": self.mongo,
+            "transport": self.transport,
+            "engine": self.engine,
+            "ingest_policy": args.ingest_policy,
+            "ingest_workers": args.ingest_workers,
+            "batch_size": args.batch_size,
+            "flush_interval": args.flush_interval,
+        }
+        # Zonas extras mantêm os sensores simulados ligados (mais dispositivos no processo)
+        zones = [DEFAULT_ZONE] + [f"zona-{i}" for i in range(1, args.zones)]
+        self.middleware = Middleware(controller_options=self.options, hot_standby=hot_standby, zones=zones,
+                                     rule_batch_interval=args.rule_batch_interval)
+        self.threads = threading.active_count()
+        # A carga vem do benchmark: desliga os sensores simulados da zona medida
+        for controllers in self.groups().values():
+            controllers[0].control_sensor("off")
+
+        # Cliente de carga: publica leituras e recebe os comandos enviados aos atuadores
+        self.commands = queue.Queue()
+        self.load = MqttTransport("Bench_Load", "127.0.0.1", self.broker.port)
+        self.load.start()
+        for controllers in self.groups().values():
+            self.load.subscribe(controllers[0].actuator_topic, self.on_command)
+        wait_until(lambda: self.transport.connected and self.load.connected)
+        time.sleep(0.2)  # Aguarda os SUBACKs
+
+    def groups(self):
+        return {name: self.middleware.get_controllers(name, DEFAULT_ZONE) for name in GROUPS}
+
+    def on_command(self, client, userdata, message):
+        self.commands.put((message.topic, message.payload.decode(), time.perf_counter()))
+
+    def wait_command(self, topic, command, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            received_topic, received, received_at = self.commands.get(timeout=max(0.0, deadline - time.monotonic()))
+            if received_topic == topic and received == command:
+                return received_at
+
+    def drain_commands(self):
+        while not self.commands.empty():
+            self.commands.get_nowait()
+
+    def close(self):
+        self.load.stop()
+        self.middleware.stop_all_controllers()
+        self.broker.stop()
+        if self.engine is not None:
+            self.engine.stop()
+
+
+def measure_throughput(env, messages):
+    primaries = [controllers[0] for controllers in env.groups().values()]
+    processed_before = sum(c.ingest.processed for c in primaries)
+    written_before = sum(c.db_writer.written for c in primaries)
+    writes_before = env.mongo.write_stats()
+    # Leituras aleatórias entre os valores que ligam e desligam o atuador de cada grupo
+    ranges = [(c.sensor_topic, min(on, off), max(on, off))
+              for c, (on, off) in zip(primaries, GROUPS.values())]
+
+    start = time.perf_counter()
+    for i in range(messages):
+        topic, low, high = ranges[i % len(ranges)]
+        env.load.publish(topic, reading(round(random.uniform(low, high), 2)))
+    wait_until(lambda: sum(c.ingest.processed for c in primaries) - processed_before >= messages, timeout=120)
+    ingest_elapsed = time.perf_counter() - start
+
+    # Escritas: até a fila de escrita em lote dos controladores esvaziar
+    enqueued = sum(c.db_writer.enqueued for c in primaries)
+    wait_until(lambda: sum(c.db_writer.written + c.db_writer.failed for c in primaries) >= enqueued, timeout=120)
+    for controller in primaries:
+        controller.rollups.flush()
+    write_elapsed = time.perf_counter() - start
+    writes_after = env.mongo.write_stats()
+    documents = writes_after["inserted"] - writes_before["inserted"]
+    rollup_updates = writes_after["updated"] - writes_before["updated"]
+    return {
+        "messages": messages,
+        "messages_per_s": round(messages / ingest_elapsed, 1),
+        "documents_written": sum(c.db_writer.written for c in primaries) - written_before,
+        "rollup_updates": rollup_updates,
+        "mongo_write_calls": writes_after["write_calls"] - writes_before["write_calls"],
+        "mongo_writes_per_s": round((documents + rollup_updates) / write_elapsed, 1),
+        "commands_sent": sum(c.commands_sent for c in primaries),
+        "broker": env.broker.stats(),
+    }
+
+
+def measure_command_latency(env, samples, group="cooling"):
+    on_value, off_value = GROUPS[group]
+    controller = env.groups()[group][0]
+    topic = controller.sensor_topic
+    # Leva o atuador a um estado conhecido (OFF)
+    env.load.publish(topic, reading(off_value))
+    wait_until(lambda: controller.actuator_last_value == "OFF", timeout=5)
+    time.sleep(0.1)
+    env.drain_commands()
+
+    latencies = []
+    for i in range(samples):
+        command, value = ("ON", on_value) if i % 2 == 0 else ("OFF", off_value)
+        start = time.perf_counter()
+        env.load.publish(topic, reading(value))
+        latencies.append(env.wait_command(controller.actuator_topic, command) - start)
+    return summarize(latencies)
+
+
+def measure_history(env, sizes, limit, repetitions, history_size):
+    controller = CoolingController(role="Bench", mongo_manager=env.mongo, transport=env.transport, engine=env.engine,
+                                   collection_name="bench_history", history_size=history_size)
+    results = []
+    for size in sizes:
+        controller.collection.delete_many({})
+        base = datetime.utcnow() - timedelta(seconds=size)
+        controller.collection.insert_many([
+            {"controller": controller.data_id, "timestamp": base + timedelta(seconds=i), "data_type": "sensor",
+             "topic": controller.sensor_topic, "value": round(random.uniform(15, 35), 2)}
+            for i in range(size)
+        ])
+        timings = {}
+        for mode in ("cold", "warm"):
+            if mode == "cold":
+                controller.history.clear()  # Sem buffer: tudo vem do banco
+            else:
+                controller.warm_history_from_db()
+            latencies = []
+            for _ in range(repetitions):
+                start = time.perf_counter()
+                controller.get_historical_sensor_data(limit)
+                latencies.append(time.perf_counter() - start)
+            timings[mode] = summarize(latencies)
+        results.append({"history_size": size, "limit": limit, "cold_buffer": timings["cold"],
+                        "warm_buffer": timings["warm"]})
+    controller.close()
+    return results
+
+
+def measure_failover(env, rounds, group="cooling"):
+    on_value, off_value = GROUPS[group]
+    controllers = env.groups()[group]
+    topic = controllers[0].sensor_topic
+    recoveries = []
+    for _ in range(rounds):
+        env.drain_commands()
+        start = time.perf_counter()
+        env.middleware.simulate_failover(group)
+        # O novo principal liga o atuador (ON); a recuperação termina quando ele responde a uma leitura
+        env.load.publish(topic, reading(off_value))
+        recoveries.append(env.wait_command(controllers[0].actuator_topic, "OFF") - start)
+        env.load.publish(topic, reading(on_value))
+        env.wait_command(controllers[0].actuator_topic, "ON")
+        controllers[0].control_sensor("off")  # O failover religa o sensor simulado
+    stats = env.middleware.get_failover_stats()
+    return {
+        "rounds": rounds,
+        "recovery": summarize(recoveries),
+        "avg_promotion_ms": stats["avg_promotion_ms"],
+        "max_promotion_ms": stats["max_promotion_ms"],
+    }
+
+
+def run_mode(args, hot_standby):
+    env = Environment(args, hot_standby)
+    try:
+        return {
+            "threads": env.threads,
+            "throughput": measure_throughput(env, args.messages),
+            "command_latency": measure_command_latency(env, args.latency_samples),
+            "history": measure_history(env, args.history_sizes, args.history_limit, args.repetitions,
+                                       args.history_buffer),
+            "failover": measure_failover(env, args.failovers),
+        }
+    finally:
+        env.close()
+
+
+def flatten(data, prefix=""):
+    """Métricas numéricas do resultado, com chaves no formato a.b.c."""
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            items.update(flatten(value, f"{prefix}{i}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        items[prefix[:-1]] = data
+    return items
+
+
+def compare(previous, current):
+    before, after = flatten(previous["runs"]), flatten(current["runs"])
+    print(f"\n{'métrica':<55} | {'anterior':>12} | {'atual':>12} | {'variação':>9}")
+    for key in sorted(before.keys() & after.keys()):
+        if not key.endswith(("_s", "_ms", "per_s")):
+            continue
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{key:<55} | {old:>12} | {new:>12} | {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta com broker e MongoDB em processo.")
+    parser.add_argument("--modes", nargs="+", choices=["cold", "hot"], default=["cold", "hot"],
+                        help="Failover frio (recupera do banco) e/ou com hot standby")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--latency-samples", type=int, default=500)
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--history-limit", type=int, default=50)
+    parser.add_argument("--history-buffer", type=int, default=500, help="Tamanho do buffer de histórico em memória")
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--failovers", type=int, default=5)
+    parser.add_argument("--ingest-policy", default="block")
+    parser.add_argument("--ingest-workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--zones", type=int, default=1, help="Zonas do Middleware (as extras com sensores ativos)")
+    parser.add_argument("--rule-batch-interval", type=float, help="Tick (s) da avaliação das regras em lote")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "bench_end_to_end.json"),
+                        help="Arquivo JSON com os resultados (padrão em benchmarks/results/, fora do git)")
+    parser.add_argument("--compare", help="Resultado JSON anterior para comparação")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    configure_logging(args.log_level)
+
+    runs = {}
+    for mode in args.modes:
+        print(f"Executando modo {mode}...", file=sys.stderr)
+        runs[mode] = run_mode(args, hot_standby=mode == "hot")
+
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "runs": runs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for mode, run in runs.items():
+        throughput, latency, failover = run["throughput"], run["command_latency"], run["failover"]
+        print(f"\n[{mode}] {run['threads']} threads ({args.engine}, {args.zones} zona(s))")
+        print(f"[{mode}] {throughput['messages_per_s']} msg/s | {throughput['mongo_writes_per_s']} escritas/s no MongoDB")
+        print(f"[{mode}] leitura -> comando: p50 {latency['p50_ms']} ms | p99 {latency['p99_ms']} ms")
+        for entry in run["history"]:
+            print(f"[{mode}] histórico com {entry['history_size']:>7} leituras: "
+                  f"buffer frio p50 {entry['cold_buffer']['p50_ms']} ms | aquecido p50 {entry['warm_buffer']['p50_ms']} ms")
+        print(f"[{mode}] failover: recuperação p50 {failover['recovery']['p50_ms']} ms | "
+              f"promoção média {failover['avg_promotion_ms']} ms")
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Mede a latência das consultas de histórico em função do tamanho da coleção.
+
+Compara a coleção sem índice, com o índice composto (controller, data_type, timestamp desc)
+e, opcionalmente, o layout time-series. Usa um banco descartável (agriculture_benchmark).
+
+Uso:
+    python3 benchmarks/bench_history_query.py [--sizes 1000 10000 100000] [--timeseries]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pymongo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.db_layout import create_timeseries_collection, ensure_history_index, series_query, to_stored_document
+
+CONTROLLERS = ["Irrigação (Primary)", "Refrigeração (Primary)", "Iluminação (Primary)"]
+
+
+def populate(collection, size, timeseries=False):
+    start = datetime.utcnow() - timedelta(seconds=size)
+    batch = []
+    for i in range(size):
+        data_type = "sensor" if i % 2 == 0 else "actuator"
+        batch.append(to_stored_document({
+            "controller": CONTROLLERS[i % len(CONTROLLERS)],
+            "timestamp": start + timedelta(seconds=i),
+            "data_type": data_type,
+            "topic": "benchmark",
+            "value": round(random.uniform(10, 60), 2) if data_type == "sensor" else random.choice(["ON", "OFF"]),
+        }, timeseries))
+        if len(batch) >= 5000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def measure(collection, repetitions, timeseries=False):
+    """Retorna (latência mediana do find_one de recuperação, do find().limit(50) de histórico, docs examinados)."""
+    query = series_query(CONTROLLERS[0], "sensor", timeseries)
+    sort = [("timestamp", pymongo.DESCENDING)]
+    recover, history = [], []
+    for _ in range(repetitions):
+        t = time.perf_counter()
+        collection.find_one(query, sort=sort)
+        recover.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        list(collection.find(query, sort=sort).limit(50))
+        history.append(time.perf_counter() - t)
+
+    explain = collection.find(query, sort=sort).limit(50).explain()
+    examined = explain.get("executionStats", {}).get("totalDocsExamined", "?")
+    return statistics.median(recover) * 1000, statistics.median(history) * 1000, examined
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas de histórico do controller_data.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repetitions", type=int, default=50)
+    parser.add_argument("--timeseries", action="store_true", help="Inclui o layout time-series na comparação")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.uri)
+    db = client["agriculture_benchmark"]
+    layouts = ["sem índice", "índice composto"] + (["time-series"] if args.timeseries else [])
+
+    print(f"{'documentos':>10} | {'layout':<16} | {'recover (ms)':>12} | {'histórico (ms)':>14} | {'docs examinados':>15}")
+    for size in args.sizes:
+        for layout in layouts:
+            db.drop_collection("controller_data")
+            if layout == "time-series":
+                create_timeseries_collection(db, "controller_data")
+            collection = db["controller_data"]
+            timeseries = layout == "time-series"  # Série no metaField (meta.controller/meta.data_type)
+            populate(collection, size, timeseries)
+            if layout != "sem índice":
+                ensure_history_index(collection, timeseries)
+            recover_ms, history_ms, examined = measure(collection, args.repetitions, timeseries)
+            print(f"{size:>10} | {layout:<16} | {recover_ms:>12.3f} | {history_ms:>14.3f} | {examined:>15}")
+
+    client.drop_database("agriculture_benchmark")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Microbenchmark dos codecs de payload do sensor: custo de codificação/decodificação e bytes por leitura.
+
+A decodificação usa decode_payload, o mesmo caminho dos controladores (com a detecção automática do formato).
+
+Uso:
+    python3 benchmarks/bench_payload_codec.py [--readings 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transport.payload_codec import CODECS, decode_payload
+
+# (unidade, faixa de valores) de cada tipo de sensor
+SENSORS = [("°C", 15.0, 35.0), ("%", 10.0, 60.0), ("lux", 100.0, 10000.0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos codecs de payload do sensor.")
+    parser.add_argument("--readings", type=int, default=200000)
+    args = parser.parse_args()
+
+    readings = []
+    for i in range(args.readings):
+        unit, low, high = SENSORS[i % len(SENSORS)]
+        readings.append((round(random.uniform(low, high), 2), unit))
+
+    print(f"{'codec':<8} | {'bytes/leitura':>13} | {'encode (ns)':>11} | {'decode (ns)':>11}")
+    for name, codec in CODECS.items():
+        start = time.perf_counter()
+        # O MQTT entrega bytes ao controlador: o JSON é codificado como no envio pelo paho
+        payloads = [codec.encode(value, unit) for value, unit in readings]
+        encode_ns = (time.perf_counter() - start) / len(readings) * 1e9
+        payloads = [p.encode() if isinstance(p, str) else p for p in payloads]
+
+        start = time.perf_counter()
+        decoded = [decode_payload(p) for p in payloads]
+        decode_ns = (time.perf_counter() - start) / len(readings) * 1e9
+
+        assert all(d["valor"] == value and d["unidade"] == unit for d, (value, unit) in zip(decoded, readings))
+        size = sum(len(p) for p in payloads) / len(payloads)
+        print(f"{name:<8} | {size:>13.1f} | {encode_ns:>11.0f} | {decode_ns:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
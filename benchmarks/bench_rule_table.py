@@ -0,0 +1,163 @@
+"""Benchmark das regras dos controladores: caminho por mensagem contra a avaliação em lote (RuleTable/NumPy).
+
+Cria os controladores reais de N zonas (sem broker nem MongoDB: transporte que só conta as publicações e
+MongoDB em memória) e, a cada tick, entrega uma leitura por controlador (passeio aleatório dentro da faixa
+de validação). Compara, com as mesmas leituras:
+
+- por mensagem: process_sensor_data de cada controlador e Middleware.validate_sensor_data;
+- em lote: RuleBatcher.evaluate_batch (decisões e validação vetorizadas, comandos via request_command).
+
+Os dois caminhos devem decidir os mesmos comandos: o benchmark confere o estado final e os contadores de comandos.
+    python3 benchmarks/bench_rule_table.py --zones 10000 --ticks 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.local_mongo import InMemoryMongoManager
+from benchmarks.sensor_fleet import CountingTransport
+from controllers.rule_table import RuleBatcher
+from logging_setup import configure_logging
+from metrics import MetricsRegistry
+from middleware_app import Middleware
+
+# Destino padrão dos resultados (ignorado pelo git)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def build_controllers(zones):
+    options = {"transport": CountingTransport(), "mongo_manager": InMemoryMongoManager(), "metrics": MetricsRegistry()}
+    controllers, sensor_types = [], []
+    for zone in range(zones):
+        for controller_type, controller_class in Middleware.CONTROLLER_CLASSES.items():
+            controllers.append(controller_class(zone=f"zona-{zone}", **options))
+            sensor_types.append(Middleware.CONTROLLER_SENSORS[controller_type])
+    return controllers, sensor_types
+
+
+def generate_ticks(sensor_types, ticks, step, seed):
+    """Leituras de cada tick: passeio aleatório por controlador, com passo relativo à faixa de validação."""
+    rng = np.random.default_rng(seed)
+    bounds = np.array([Middleware.VALIDATION_LIMITS[sensor_type] for sensor_type in sensor_types], dtype=np.float64)
+    low, high = bounds[:, 0], bounds[:, 1]
+    values = rng.uniform(low, high)
+    readings = []
+    for _ in range(ticks):
+        values = np.clip(values + rng.normal(0, step, len(values)) * (high - low), low, high).round(2)
+        readings.append(values.tolist())
+    return readings
+
+
+def reset(controllers):
+    for controller in controllers:
+        controller.actuator_last_value = None
+        controller.last_command_time = None
+        controller.commands_requested = 0
+        controller.commands_sent = 0
+        controller.commands_suppressed = 0
+
+
+def run_scalar(controllers, sensor_types, readings):
+    durations = []
+    for values in readings:
+        started = time.perf_counter()
+        for controller, sensor_type, value in zip(controllers, sensor_types, values):
+            controller.process_sensor_data(value)
+            Middleware.validate_sensor_data(sensor_type, value)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run_batch(batcher, controllers, readings):
+    durations = []
+    for values in readings:
+        started = time.perf_counter()
+        batcher.evaluate_batch(controllers, values)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations, readings_per_tick):
+    tick = statistics.median(durations)
+    return {
+        "tick_p50_ms": round(tick * 1000, 3),
+        "tick_max_ms": round(max(durations) * 1000, 3),
+        "readings_per_s": round(readings_per_tick / tick, 1),
+    }
+
+
+def snapshot(controllers):
+    return [(controller.actuator_last_value, controller.get_command_stats()) for controller in controllers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regras por mensagem contra a avaliação em lote com NumPy.")
+    parser.add_argument("--zones", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--step", type=float, default=0.02, help="Passo do passeio aleatório (fração da faixa)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "bench_rule_table.json"),
+                        help="Arquivo JSON com os resultados (padrão em benchmarks/results/, fora do git)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    print(f"Criando os controladores de {args.zones} zona(s)...", file=sys.stderr)
+    controllers, sensor_types = build_controllers(args.zones)
+    readings = generate_ticks(sensor_types, args.ticks, args.step, args.seed)
+
+    scalar = run_scalar(controllers, sensor_types, readings)
+    scalar_state = snapshot(controllers)
+
+    reset(controllers)
+    batcher = RuleBatcher(
+        {controller_class: Middleware.VALIDATION_LIMITS[Middleware.CONTROLLER_SENSORS[controller_type]]
+         for controller_type, controller_class in Middleware.CONTROLLER_CLASSES.items()},
+        metrics=MetricsRegistry()
+    )
+    for controller in controllers:
+        controller.rule_batcher = batcher  # Para get_command_stats incluir os comandos descartados no lote
+    batch = run_batch(batcher, controllers, readings)
+    if snapshot(controllers) != scalar_state:
+        raise AssertionError("A avaliação em lote decidiu comandos diferentes do caminho por mensagem")
+
+    # Só o núcleo vetorizado (decisões e validação), sem o envio dos comandos
+    rows = [batcher.table.row(controller) for controller in controllers]
+    kernel = []
+    for values in readings:
+        started = time.perf_counter()
+        batcher.table.evaluate(rows, values)
+        kernel.append(time.perf_counter() - started)
+
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "controllers": len(controllers),
+        "commands_sent": sum(stats["sent"] for _, stats in scalar_state),
+        "per_message": summarize(scalar, len(controllers)),
+        "batch": summarize(batch, len(controllers)),
+        "batch_kernel": summarize(kernel, len(controllers)),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n{len(controllers)} controladores ({args.zones} zonas), {args.ticks} ticks, "
+          f"{result['commands_sent']} comandos enviados")
+    for name in ("per_message", "batch", "batch_kernel"):
+        entry = result[name]
+        print(f"{name:<12} | tick p50 {entry['tick_p50_ms']:>9} ms | {entry['readings_per_s']:>12} leituras/s")
+    print(f"Ganho do lote: {result['per_message']['tick_p50_ms'] / result['batch']['tick_p50_ms']:.2f}x")
+    print(f"\nResultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Benchmark do modo com shards (SHARDS=N): vazão de ingestão com as zonas distribuídas entre processos.
+
+Sobe o broker MQTT em processo (local_broker.py) e, para cada quantidade de shards pedida, um
+ShardedMiddleware com as mesmas zonas; cada shard usa um MongoDB em memória próprio (local_mongo.py).
+Mede:
+
+- vazão de ingestão (leituras/s processadas pelos controladores principais de todos os shards);
+- tempo de recuperação após matar o processo de um shard (até ele voltar a responder).
+
+O broker e o gerador de carga rodam neste processo: com muitos shards eles podem virar o limite,
+então compare a vazão com `--shards 1` na mesma máquina e com núcleos livres para o broker.
+    python3 benchmarks/bench_sharding.py --zones 8 --shards 1 2 4 --messages 40000
+"""
+import argparse
+import functools
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.local_broker import LocalBroker
+from benchmarks.local_mongo import InMemoryMongoManager
+from controllers.controller_base import zone_topic
+from logging_setup import configure_logging
+from sharding import ShardedMiddleware
+from transport.mqtt_transport import MqttTransport
+from transport.payload_codec import get_codec
+
+# Tópico base e faixa de leituras de cada tipo de controlador
+SENSORS = {
+    "irrigation": ("agriculture/sensors/soil_moisture", 10, 60, "%"),
+    "cooling": ("agriculture/sensors/temperature", 15, 35, "°C"),
+    "lighting": ("agriculture/sensors/light", 100, 10000, "lux"),
+}
+
+# Nome usado por control_sensors para cada tipo
+SENSOR_CONTROLS = {"irrigation": "soil-moisture", "cooling": "temperature", "lighting": "lighting"}
+
+# Destino padrão dos resultados (ignorado pelo git)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def bench_options(port, client_id):
+    """Opções dos controladores de um shard (executada no processo do shard)."""
+    return {"transport": MqttTransport(client_id, "127.0.0.1", port), "mongo_manager": InMemoryMongoManager()}
+
+
+def processed(middleware):
+    return sum(stats["ingest"]["processed"] for stats in middleware.get_controller_stats().values())
+
+
+def measure_throughput(middleware, load, zones, messages, codec, timeout):
+    payloads = []
+    for i in range(messages):
+        zone = zones[i % len(zones)]
+        topic, low, high, unit = SENSORS[list(SENSORS)[(i // len(zones)) % len(SENSORS)]]
+        value = low if i % 2 else high
+        payloads.append((zone_topic(topic, zone), codec.encode(value, unit)))
+
+    baseline = processed(middleware)
+    start = time.perf_counter()
+    for topic, payload in payloads:
+        load.publish(topic, payload)
+    published = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    while processed(middleware) - baseline < messages:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Leituras processadas: {processed(middleware) - baseline} de {messages}")
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    return {
+        "messages": messages,
+        "elapsed_s": round(elapsed, 3),
+        "publish_s": round(published - start, 3),
+        "messages_per_s": round(messages / elapsed, 1),
+    }
+
+
+def measure_restart(middleware, zone):
+    """Mata o processo do shard dono da zona e mede o tempo até a zona voltar a responder."""
+    shard = middleware.zone_shards[zone]
+    os.kill(shard.process.pid, signal.SIGKILL)
+    start = time.perf_counter()
+    middleware.get_sensor_data(zone)  # Detecta o canal fechado, reinicia o shard e repete a chamada
+    recovery = time.perf_counter() - start
+    return {"recovery_ms": round(recovery * 1000, 3), "restarts": middleware.get_failover_stats()["shard_restarts"]}
+
+
+def run(args, broker, shards):
+    zones = [f"zona-{i}" for i in range(args.zones)]
+    middleware = ShardedMiddleware(zones, shards, functools.partial(bench_options, broker.port),
+                                   {"replicas": args.replicas})
+    load = MqttTransport(f"Bench_Load_{shards}", "127.0.0.1", broker.port)
+    load.start()
+    try:
+        # A carga vem do benchmark: desliga os sensores simulados
+        for zone in zones:
+            for sensor_name in SENSOR_CONTROLS.values():
+                middleware.control_sensors(sensor_name, "off", zone)
+        time.sleep(0.5)
+        result = {
+            "shards": len(middleware.shards),
+            "throughput": measure_throughput(middleware, load, zones, args.messages, get_codec(args.codec),
+                                             args.timeout),
+        }
+        if args.restart:
+            result["restart"] = measure_restart(middleware, zones[0])
+        return result
+    finally:
+        load.stop()
+        middleware.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão de ingestão com as zonas distribuídas entre processos.")
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--messages", type=int, default=40000)
+    parser.add_argument("--replicas", type=int, default=1, help="Controladores por grupo (principal + réplicas)")
+    parser.add_argument("--codec", default="json")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--no-restart", dest="restart", action="store_false", help="Não mede o reinício de shard")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "bench_sharding.json"),
+                        help="Arquivo JSON com os resultados (padrão em benchmarks/results/, fora do git)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    broker = LocalBroker().start()
+    runs = []
+    try:
+        for shards in args.shards:
+            print(f"Executando com {shards} shard(s)...", file=sys.stderr)
+            runs.append(run(args, broker, shards))
+    finally:
+        broker.stop()
+
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": runs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    base = runs[0]["throughput"]["messages_per_s"]
+    print(f"\nCPUs: {os.cpu_count()}")
+    for entry in runs:
+        throughput = entry["throughput"]
+        line = (f"{entry['shards']} shard(s): {throughput['messages_per_s']} msg/s "
+                f"({throughput['messages_per_s'] / base:.2f}x)")
+        if "restart" in entry:
+            line += f" | reinício de shard: {entry['restart']['recovery_ms']} ms"
+        print(line)
+    print(f"\nResultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
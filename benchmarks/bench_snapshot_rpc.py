@@ -0,0 +1,95 @@
+"""Compara o caminho antigo da página do controlador (três chamadas RPyC com netrefs)
+com o snapshot único serializado (exposed_get_controller_snapshot).
+
+Os dois caminhos buscam os mesmos dados da página: sensor, atuador, histórico e histórico agregado
+(o caminho antigo com uma chamada a mais, exposed_get_aggregated_history, como faria a rota sem o snapshot).
+
+Requer o middleware em execução (python middleware_app.py).
+
+Uso:
+    python3 benchmarks/bench_snapshot_rpc.py [--controller cooling] [--iterations 200]
+"""
+import argparse
+import json
+import statistics
+import time
+
+import rpyc
+
+SENSOR_KEYS = {"irrigation": "soil_moisture", "lighting": "luminosity", "cooling": "temperature"}
+
+
+class RoundTripCounter:
+    """Conta as requisições enviadas pela conexão RPyC (cada uma é uma ida e volta ao servidor)."""
+
+    def __init__(self, conn):
+        self.count = 0
+        original_send = conn._send
+
+        def counting_send(msg, seq, args):
+            if msg == rpyc.core.consts.MSG_REQUEST:
+                self.count += 1
+            return original_send(msg, seq, args)
+
+        conn._send = counting_send
+
+
+def legacy_path(conn, controller_id, bucket):
+    """Reproduz os acessos da rota antiga e do template sobre os netrefs."""
+    sensors_data = conn.root.exposed_get_sensor_data()
+    actuators_status = conn.root.exposed_get_actuator_data()
+    sensor_key = SENSOR_KEYS[controller_id]
+    sensors = {sensor_key: sensors_data[sensor_key]} if sensor_key in sensors_data else {}
+    actuators = {controller_id: actuators_status[controller_id]}
+    historical_data = conn.root.exposed_get_historical_sensor_data(controller_id)
+    # O template itera o histórico e lê cada campo
+    history = [{"timestamp": item["timestamp"], "value": item["value"]} for item in historical_data]
+    # Mesmo histórico agregado que o snapshot inclui; o gráfico lê cada campo do bucket
+    aggregated_data = conn.root.exposed_get_aggregated_history(controller_id, bucket=bucket)
+    aggregated = [{key: item[key] for key in ("start", "min", "max", "avg", "count")} for item in aggregated_data]
+    return sensors, actuators, history, aggregated
+
+
+def snapshot_path(conn, controller_id, bucket):
+    snapshot = json.loads(conn.root.exposed_get_controller_snapshot(controller_id, bucket))
+    return snapshot["sensors"], snapshot["actuators"], snapshot["historical_data"], snapshot["aggregated_data"]
+
+
+def run(conn, counter, path, controller_id, bucket, iterations):
+    latencies = []
+    counter.count = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        path(conn, controller_id, bucket)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "round_trips_per_view": counter.count / iterations,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do snapshot do controlador via RPyC.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=18812)
+    parser.add_argument("--controller", default="cooling", choices=list(SENSOR_KEYS))
+    parser.add_argument("--bucket", default="1m")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    conn = rpyc.connect(args.host, args.port)
+    counter = RoundTripCounter(conn)
+    conn.root  # Resolve a raiz antes de começar a contar
+
+    print(f"Controlador {args.controller}: sensor, atuador, histórico e histórico agregado ({args.bucket}) "
+          f"nos dois caminhos")
+    print(f"{'caminho':<10} | {'idas e voltas':>13} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+    for name, path in (("antigo", legacy_path), ("snapshot", snapshot_path)):
+        result = run(conn, counter, path, args.controller, args.bucket, args.iterations)
+        print(f"{name:<10} | {result['round_trips_per_view']:>13.1f} | {result['p50_ms']:>9.3f} | {result['p99_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Teste de carga do cliente Flask: vazão por número de clientes HTTP simultâneos.
+
+Requer o middleware e o cliente em execução, por exemplo:
+    python middleware_app.py
+    PORT=5001 RPYC_POOL_SIZE=8 python client/client.py
+
+Uso:
+    python3 benchmarks/load_test_client.py [--url http://localhost:5001/controller/cooling] [--concurrency 1 2 4 8 16]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+
+def worker(url, deadline, latencies, errors, lock):
+    session = requests.Session()
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=30)
+            if response.status_code != 200 or response.text.startswith("Erro"):
+                local_errors += 1
+        except requests.RequestException:
+            local_errors += 1
+        local_latencies.append(time.perf_counter() - start)
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run(url, concurrency, duration):
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(url, deadline, latencies, errors, lock)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do cliente Flask.")
+    parser.add_argument("--url", default="http://localhost:5001/controller/cooling")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por nível de concorrência")
+    args = parser.parse_args()
+
+    print(f"{'clientes':>8} | {'requisições':>11} | {'erros':>5} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+    for concurrency in args.concurrency:
+        result = run(args.url, concurrency, args.duration)
+        print(f"{concurrency:>8} | {result['requests']:>11} | {result['errors']:>5} | {result['throughput']:>8.1f} | "
+              f"{result['p50_ms']:>9.2f} | {result['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
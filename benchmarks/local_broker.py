@@ -0,0 +1,168 @@
+"""Broker MQTT 3.1.1 mínimo, em processo, para benchmarks sem serviços externos.
+
+Atende clientes paho reais (o MqttTransport do projeto) por TCP local, com suporte a
+CONNECT, SUBSCRIBE/UNSUBSCRIBE (inclusive filtros com + e #), PUBLISH QoS 0/1 e PINGREQ.
+Não implementa sessões persistentes, mensagens retidas nem QoS 2: serve para medir o
+middleware, não para substituir o Mosquitto.
+"""
+import asyncio
+import struct
+import threading
+
+from paho.mqtt.client import topic_matches_sub
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value):
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def packet(packet_type, body, flags=0):
+    return bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+
+
+class Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.filters = set()
+
+
+class LocalBroker:
+    """Broker executado em uma thread própria com loop asyncio."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port  # 0 escolhe uma porta livre; a porta real fica disponível após start()
+        self.sessions = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+
+        # Contadores expostos por stats()
+        self.clients = 0
+        self.messages_in = 0
+        self.messages_out = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="LocalBroker", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle_client, self.host, self.port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # Para de aceitar conexões e fecha as abertas; os handlers terminam pela leitura interrompida
+            self.server.close()
+            for session in list(self.sessions):
+                session.writer.close()
+            try:
+                self.loop.run_until_complete(asyncio.wait_for(self.server.wait_closed(), 5.0))
+            except asyncio.TimeoutError:
+                pass
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    async def read_packet(self, reader):
+        header = await reader.readexactly(1)
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    async def handle_client(self, reader, writer):
+        session = Session(writer)
+        self.sessions.add(session)
+        self.clients += 1
+        try:
+            while True:
+                packet_type, flags, body = await self.read_packet(reader)
+                if packet_type == CONNECT:
+                    writer.write(packet(CONNACK, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    self.handle_publish(writer, flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self.handle_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    packet_id, topics = body[:2], self.read_topics(body[2:], with_qos=False)
+                    session.filters.difference_update(topics)
+                    writer.write(packet(UNSUBACK, packet_id))
+                elif packet_type == PINGREQ:
+                    writer.write(packet(PINGRESP, b""))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # CancelledError: broker encerrado com o cliente ainda conectado
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def read_topics(self, data, with_qos=True):
+        topics, offset = [], 0
+        while offset < len(data):
+            (size,) = struct.unpack_from("!H", data, offset)
+            offset += 2
+            topics.append(data[offset:offset + size].decode())
+            offset += size + (1 if with_qos else 0)
+        return topics
+
+    def handle_subscribe(self, session, body):
+        packet_id, topics = body[:2], self.read_topics(body[2:])
+        session.filters.update(topics)
+        # Concede QoS 0 a todas as assinaturas
+        session.writer.write(packet(SUBACK, packet_id + b"\x00" * len(topics)))
+
+    def handle_publish(self, writer, flags, body):
+        qos = (flags >> 1) & 0x03
+        (size,) = struct.unpack_from("!H", body)
+        topic = body[2:2 + size].decode()
+        offset = 2 + size
+        if qos:
+            writer.write(packet(PUBACK, body[offset:offset + 2]))
+            offset += 2
+        self.messages_in += 1
+
+        outgoing = packet(PUBLISH, encode_string(topic) + body[offset:])
+        for session in self.sessions:
+            if any(topic_matches_sub(topic_filter, topic) for topic_filter in session.filters):
+                session.writer.write(outgoing)
+                self.messages_out += 1
+
+    def stats(self):
+        return {"port": self.port, "clients": self.clients, "sessions": len(self.sessions),
+                "messages_in": self.messages_in, "messages_out": self.messages_out}
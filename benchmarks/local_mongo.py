@@ -0,0 +1,231 @@
+"""MongoDB em memória para benchmarks sem serviços externos.
+
+Implementa apenas as operações usadas pelos controladores (insert_many, find/find_one com
+ordenação e limite, filtros por igualdade (inclusive em subdocumentos, "meta.controller"), $lt/$lte/$gt/$gte e $or, bulk_write de UpdateOne com
+upsert e $inc/$min/$max, create_index, list_collections...). As consultas percorrem a
+coleção inteira: os tempos refletem o lado do middleware, não os índices do MongoDB
+(para isso, use bench_history_query.py com um servidor real).
+"""
+import itertools
+import threading
+from copy import deepcopy
+
+import pymongo
+from pymongo.errors import CollectionInvalid
+
+OPERATORS = {
+    "$lt": lambda value, bound: value < bound,
+    "$lte": lambda value, bound: value <= bound,
+    "$gt": lambda value, bound: value > bound,
+    "$gte": lambda value, bound: value >= bound,
+    "$ne": lambda value, bound: value != bound,
+}
+
+
+def get_field(document, field):
+    """Valor do campo, inclusive em subdocumentos ("meta.controller")."""
+    for part in field.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, alternative) for alternative in condition):
+                return False
+            continue
+        value = get_field(document, field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            if value is None:
+                return False
+            if not all(OPERATORS[operator](value, bound) for operator, bound in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class InMemoryCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.limit_count = 0
+
+    def sort(self, key, direction=pymongo.ASCENDING):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, field_direction in reversed(keys):
+            self.documents.sort(key=lambda d: get_field(d, field), reverse=field_direction == pymongo.DESCENDING)
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def __iter__(self):
+        documents = self.documents[:self.limit_count] if self.limit_count else self.documents
+        return (deepcopy(d) for d in documents)
+
+
+class InMemoryCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.documents = []
+        self.indexes = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+        # Contadores expostos por stats()
+        self.inserted = 0
+        self.updated = 0
+        self.write_calls = 0
+
+    def insert_one(self, document):
+        self.insert_many([document])
+
+    def insert_many(self, documents, ordered=True):
+        with self.lock:
+            for document in documents:
+                document.setdefault("_id", next(self.ids))
+                self.documents.append(deepcopy(document))
+            self.inserted += len(documents)
+            self.write_calls += 1
+
+    def find(self, query=None, projection=None, sort=None):
+        with self.lock:
+            documents = [d for d in self.documents if matches(d, query or {})]
+        cursor = InMemoryCursor(documents)
+        if sort:
+            cursor.sort(sort)
+        return cursor
+
+    def find_one(self, query=None, sort=None):
+        for document in self.find(query, sort=sort).limit(1):
+            return document
+        return None
+
+    def bulk_write(self, operations, ordered=True):
+        with self.lock:
+            for operation in operations:
+                self.apply_update(operation._filter, operation._doc, operation._upsert)
+            self.write_calls += 1
+
+    def apply_update(self, query, update, upsert):
+        target = next((d for d in self.documents if matches(d, query)), None)
+        if target is None:
+            if not upsert:
+                return
+            target = {"_id": next(self.ids), **query}
+            self.documents.append(target)
+        for field, amount in update.get("$inc", {}).items():
+            target[field] = target.get(field, 0) + amount
+        for field, value in update.get("$min", {}).items():
+            target[field] = value if field not in target else min(target[field], value)
+        for field, value in update.get("$max", {}).items():
+            target[field] = value if field not in target else max(target[field], value)
+        for field, value in update.get("$set", {}).items():
+            target[field] = value
+        self.updated += 1
+
+    def create_index(self, keys, name=None, **options):
+        self.indexes[name or str(keys)] = keys
+        return name
+
+    def delete_many(self, query):
+        with self.lock:
+            self.documents = [d for d in self.documents if not matches(d, query)]
+
+    def count_documents(self, query):
+        with self.lock:
+            return sum(1 for d in self.documents if matches(d, query))
+
+    def stats(self):
+        return {"documents": len(self.documents), "inserted": self.inserted, "updated": self.updated,
+                "write_calls": self.write_calls}
+
+
+class InMemoryDatabase:
+    def __init__(self, name):
+        self.name = name
+        self.collections = {}
+        self.options = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = InMemoryCollection(self, name)
+            return self.collections[name]
+
+    def exists(self, name):
+        """Como no MongoDB, db[nome] não cria a coleção: ela passa a existir ao ser criada ou ao receber dados."""
+        collection = self.collections.get(name)
+        return name in self.options or (collection is not None and bool(collection.documents or collection.indexes))
+
+    def create_collection(self, name, **options):
+        with self.lock:
+            if self.exists(name):
+                raise CollectionInvalid(f"collection {name} already exists")
+            self.options[name] = options
+        return self[name]
+
+    def list_collection_names(self):
+        return [name for name in list(self.collections) if self.exists(name)]
+
+    def list_collections(self, filter=None):
+        names = [filter["name"]] if filter and "name" in filter else list(self.collections)
+        for name in names:
+            if self.exists(name):
+                options = self.options.get(name, {})
+                yield {"name": name, "type": "timeseries" if "timeseries" in options else "collection", "options": options}
+
+
+class InMemoryClient:
+    def __init__(self):
+        self.databases = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.databases:
+                self.databases[name] = InMemoryDatabase(name)
+            return self.databases[name]
+
+    def close(self):
+        pass
+
+
+class InMemoryMongoManager:
+    """Mesma interface do MongoClientManager, entregando sempre o mesmo cliente em memória."""
+
+    def __init__(self):
+        self.client = InMemoryClient()
+        self.references = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            self.references += 1
+            return self.client
+
+    def release(self):
+        with self.lock:
+            self.references = max(0, self.references - 1)
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"uri": "memory://", "references": self.references, "connected": True}
+
+    def write_stats(self):
+        """Documentos inseridos e atualizados em todas as coleções."""
+        inserted = updated = calls = 0
+        for database in self.client.databases.values():
+            for collection in database.collections.values():
+                inserted += collection.inserted
+                updated += collection.updated
+                calls += collection.write_calls
+        return {"inserted": inserted, "updated": updated, "write_calls": calls}
@@ -0,0 +1,195 @@
+"""Simulador de frota de sensores / gerador de carga para o middleware.
+
+Executa milhares de sensores virtuais (instâncias de TemperatureSensor, SoilMoistureSensor
+e LightSensor) em um único loop asyncio, publicando por poucas conexões MQTT compartilhadas,
+sem uma thread e uma conexão por sensor.
+
+Exemplos:
+    python3 benchmarks/sensor_fleet.py --sensors 3000 --rate 1 --duration 60
+    python3 benchmarks/sensor_fleet.py --sensors 5000 --rate 0.5 --distribution random_walk \\
+        --burst-every 20 --burst-duration 5 --burst-factor 10 --invalid-ratio 0.01
+    python3 benchmarks/sensor_fleet.py --sensors 10000 --rate 2 --dry-run   # mede só o gerador
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensors.light_sensor import LightSensor
+from sensors.soil_moisture_sensor import SoilMoistureSensor
+from sensors.temperature_sensor import TemperatureSensor
+from transport.mqtt_transport import MqttTransport
+from transport.payload_codec import CODECS
+
+# Faixa válida de cada sensor (a mesma de Middleware.VALIDATION_LIMITS)
+SENSOR_TYPES = {
+    "temperature": (TemperatureSensor, (15, 35)),
+    "soil_moisture": (SoilMoistureSensor, (10, 60)),
+    "luminosity": (LightSensor, (100, 10000)),
+}
+
+
+class CountingTransport:
+    """Transporte que só conta as publicações (--dry-run), para medir a capacidade do próprio gerador."""
+
+    def __init__(self):
+        self.messages_out = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.messages_out += 1
+
+
+class VirtualSensor:
+    """Sensor virtual: reaproveita a classe de sensor existente para valores e payload, sem thread própria."""
+
+    def __init__(self, sensor, valid_range, distribution, invalid_ratio, malformed_ratio):
+        self.sensor = sensor
+        self.low, self.high = valid_range
+        self.distribution = distribution
+        self.invalid_ratio = invalid_ratio
+        self.malformed_ratio = malformed_ratio
+        self.value = random.uniform(self.low, self.high)
+
+    def next_value(self):
+        if self.distribution == "native":
+            return self.sensor.generate_value()
+        span = self.high - self.low
+        if self.distribution == "gaussian":
+            value = random.gauss((self.low + self.high) / 2, span / 8)
+        else:  # random_walk
+            self.value += random.gauss(0, span / 100)
+            self.value = min(self.high, max(self.low, self.value))
+            value = self.value
+        return round(min(self.high, max(self.low, value)), 2)
+
+    def next_payload(self):
+        draw = random.random()
+        if draw < self.malformed_ratio:
+            return "{valor: corrompido"
+        if draw < self.malformed_ratio + self.invalid_ratio:
+            # Fora da faixa válida: deve ser rejeitado pela validação do middleware
+            span = self.high - self.low
+            return self.sensor.build_payload(random.choice([self.low - span, self.high + span]))
+        return self.sensor.build_payload(self.next_value())
+
+
+class FleetSimulator:
+    def __init__(self, args):
+        self.args = args
+        if args.dry_run:
+            self.transports = [CountingTransport() for _ in range(args.connections)]
+        else:
+            self.transports = [
+                MqttTransport(f"SensorFleet_{os.getpid()}_{i}", args.broker, args.port)
+                for i in range(args.connections)
+            ]
+        types = args.types or list(SENSOR_TYPES)
+        transport_cycle = itertools.cycle(self.transports)
+        self.sensors = []
+        for i in range(args.sensors):
+            sensor_class, valid_range = SENSOR_TYPES[types[i % len(types)]]
+            sensor = sensor_class(transport=next(transport_cycle), codec=args.codec)
+            self.sensors.append(VirtualSensor(sensor, valid_range, args.distribution, args.invalid_ratio, args.malformed_ratio))
+        self.published = 0
+        self.late = 0
+        self.start_time = None
+
+    def rate_multiplier(self, elapsed):
+        """Multiplicador da taxa no instante atual (rajadas periódicas)."""
+        args = self.args
+        if args.burst_every and elapsed % args.burst_every < args.burst_duration:
+            return args.burst_factor
+        return 1.0
+
+    async def run_sensor(self, virtual_sensor, loop, end_time):
+        # Defasagem aleatória para não publicar todos os sensores no mesmo instante
+        next_time = loop.time() + random.uniform(0, 1 / self.args.rate)
+        while next_time < end_time:
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.1:
+                self.late += 1
+            sensor = virtual_sensor.sensor
+            sensor.transport.publish(sensor.topic, virtual_sensor.next_payload())
+            self.published += 1
+            next_time += 1 / (self.args.rate * self.rate_multiplier(next_time - self.start_time))
+
+    async def report(self, loop, end_time):
+        last_count, last_time = 0, loop.time()
+        while loop.time() < end_time:
+            await asyncio.sleep(self.args.report_interval)
+            now = loop.time()
+            print(f"[{now - self.start_time:6.1f}s] {(self.published - last_count) / (now - last_time):10.1f} msg/s "
+                  f"(total {self.published}, atrasadas {self.late})")
+            last_count, last_time = self.published, now
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.start_time = loop.time()
+        end_time = self.start_time + self.args.duration
+        tasks = [self.run_sensor(sensor, loop, end_time) for sensor in self.sensors]
+        tasks.append(self.report(loop, end_time))
+        await asyncio.gather(*tasks)
+        return loop.time() - self.start_time
+
+    def start(self):
+        for transport in self.transports:
+            transport.start()
+
+    def stop(self):
+        for transport in self.transports:
+            transport.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de frota de sensores para teste de carga.")
+    parser.add_argument("--sensors", type=int, default=1000, help="Número de sensores virtuais")
+    parser.add_argument("--types", nargs="+", choices=list(SENSOR_TYPES), help="Tipos de sensor (padrão: todos)")
+    parser.add_argument("--rate", type=float, default=1.0, help="Publicações por segundo de cada sensor")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--distribution", choices=["native", "gaussian", "random_walk"], default="native",
+                        help="native usa generate_value() da classe do sensor")
+    parser.add_argument("--burst-every", type=float, default=0, help="Período das rajadas em segundos (0 desativa)")
+    parser.add_argument("--burst-duration", type=float, default=5.0)
+    parser.add_argument("--burst-factor", type=float, default=5.0, help="Multiplicador da taxa durante a rajada")
+    parser.add_argument("--invalid-ratio", type=float, default=0.0, help="Fração de valores fora da faixa válida")
+    parser.add_argument("--malformed-ratio", type=float, default=0.0, help="Fração de payloads malformados")
+    parser.add_argument("--codec", choices=list(CODECS), default="json", help="Formato do payload publicado")
+    parser.add_argument("--connections", type=int, default=2, help="Conexões MQTT compartilhadas pelos sensores")
+    parser.add_argument("--broker", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--dry-run", action="store_true", help="Não conecta ao broker; só conta as publicações")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    simulator = FleetSimulator(args)
+    simulator.start()
+    try:
+        elapsed = asyncio.run(simulator.run())
+    finally:
+        simulator.stop()
+
+    target = args.sensors * args.rate
+    achieved = simulator.published / elapsed
+    print(f"\nSensores: {args.sensors} | conexões: {args.connections} | taxa alvo (sem rajadas): {target:.1f} msg/s")
+    print(f"Publicadas: {simulator.published} em {elapsed:.1f}s | vazão alcançada: {achieved:.1f} msg/s "
+          f"| publicações atrasadas >100 ms: {simulator.late}")
+
+
+if __name__ == "__main__":
+    main()
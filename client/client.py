@@ -1,18 +1,54 @@
 from datetime import datetime
+import csv
+import io
+import itertools
+import json
 import os
+import queue
 import sys
-from flask import Flask, render_template, request, redirect, url_for
-import rpyc
+from flask import Flask, Response, render_template, request, redirect, url_for, stream_with_context
+from rpyc_pool import RpycConnectionPool
+from live_updates import LiveUpdateBroadcaster
+from response_cache import ResponseCache
 
 app = Flask(__name__)
 
-# Conectando ao servidor rpyc
-client = rpyc.connect("localhost", 18812)
+# Pool de conexões com o servidor rpyc (uma conexão emprestada por requisição)
+rpyc_pool = RpycConnectionPool(
+    os.environ.get("MIDDLEWARE_HOST", "localhost"),
+    int(os.environ.get("MIDDLEWARE_PORT", 18812)),
+    size=int(os.environ.get("RPYC_POOL_SIZE", 8))
+)
+
+# Uma única assinatura de eventos no middleware, compartilhada por todos os navegadores
+live_updates = LiveUpdateBroadcaster(rpyc_pool)
+
+# Cache das respostas do middleware por visão e controlador (CACHE_TTL em segundos)
+response_cache = ResponseCache(
+    ttl=float(os.environ.get("CACHE_TTL", 5)),
+    max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+)
+
+# Zona (estufa) exibida quando a URL não informa ?zone=
+DEFAULT_ZONE = "default"
+
+def invalidate_controller_cache(controller_id, zone=DEFAULT_ZONE):
+    """Descarta as entradas do controlador na zona e a página inicial após uma ação do usuário."""
+    response_cache.invalidate(lambda key: key[0] == "index" or key[1:3] == (controller_id, zone))
+
+def load_controllers_and_replicas():
+    with rpyc_pool.connection() as client:
+        # Recebido por valor (JSON): o cache não pode guardar netrefs de uma conexão emprestada
+        return json.loads(client.root.exposed_get_controllers_and_replicas())
+
+def load_controller_snapshot(controller_id, bucket, zone):
+    with rpyc_pool.connection() as client:
+        return json.loads(client.root.exposed_get_controller_snapshot(controller_id, bucket, zone))
 
 @app.route("/")
 def index():
     try:
-        controllers_data = client.root.exposed_get_controllers_and_replicas()
+        controllers_data = response_cache.get_or_load(("index",), load_controllers_and_replicas)
 
         return render_template("index.html", controllers=controllers_data)
     except Exception as e:
@@ -24,48 +60,119 @@ def index():
 def controller_data(controller_id):
     """Retorna os dados dos sensores, atuadores e histórico do controlador selecionado."""
     try:
-        # Buscar os dados dos sensores e atuadores
-        sensors_data = client.root.exposed_get_sensor_data()
-        actuators_status = client.root.exposed_get_actuator_data()
-
-        # Filtrar os dados pelo controlador selecionado
-        filtered_sensors = {}
-        filtered_actuators = {}
-
-        if controller_id == "lighting":
-            filtered_sensors["luminosity"] = sensors_data["luminosity"]
-            filtered_actuators["lighting"] = actuators_status["lighting"]
-        elif controller_id == "irrigation":
-            filtered_sensors["soil_moisture"] = sensors_data["soil_moisture"]
-            filtered_actuators["irrigation"] = actuators_status["irrigation"]
-        elif controller_id == "cooling":
-            filtered_sensors["temperature"] = sensors_data["temperature"]
-            filtered_actuators["cooling"] = actuators_status["cooling"]
-
-        # Buscar histórico de dados no MongoDB
-        historical_data = client.root.exposed_get_historical_sensor_data(controller_id)
+        # Sensor, atuador e históricos em uma única chamada, recebidos por valor (JSON)
+        bucket = request.args.get("bucket", "1m")
+        zone = request.args.get("zone", DEFAULT_ZONE)
+        snapshot = response_cache.get_or_load(("controller", controller_id, zone, bucket),
+                                              lambda: load_controller_snapshot(controller_id, bucket, zone))
 
         return render_template("controllers.html", 
-                               sensors=filtered_sensors, 
-                               actuators=filtered_actuators,
+                               sensors=snapshot.get("sensors", {}), 
+                               actuators=snapshot.get("actuators", {}),
                                selected_controller=controller_id,
-                               historical_data=historical_data)
+                               selected_zone=zone,
+                               historical_data=snapshot.get("historical_data", []),
+                               aggregated_data=snapshot.get("aggregated_data", []),
+                               selected_bucket=bucket)
     except Exception as e:
         print(f"Erro ao buscar dados do controlador {controller_id}: {e}")
         return f"Erro ao carregar os dados do controller {controller_id}"
 
 
 
+@app.route("/controller/<controller_id>/events")
+def controller_events(controller_id):
+    """Envia ao navegador (Server-Sent Events) as leituras do sensor e os comandos do atuador do controlador."""
+    zone = request.args.get("zone", DEFAULT_ZONE)
+    subscriber = live_updates.subscribe()
+
+    def stream():
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"  # Mantém a conexão aberta através de proxies
+                    continue
+                if event["controller"] == controller_id and event.get("zone", DEFAULT_ZONE) == zone:
+                    yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            live_updates.unsubscribe(subscriber)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def export_pages(controller_id, zone, start, end, fields, resume_token, chunk_size):
+    """Percorre o iterador de exportação do middleware, mantendo a conexão emprestada até o fim."""
+    with rpyc_pool.connection() as client:
+        for page in client.root.exposed_export_history(controller_id, start, end, fields, resume_token, chunk_size, zone):
+            yield json.loads(page)
+
+@app.route("/controller/<controller_id>/export")
+def export_history(controller_id):
+    """Exporta o histórico do sensor em CSV ou NDJSON, em streaming: uma página do middleware por vez.
+
+    Parâmetros: format (csv ou ndjson), start e end (ISO 8601), fields (ex.: timestamp,value,topic),
+    resume_token (retoma uma exportação interrompida), chunk_size e zone. Depois de cada página vai o token
+    que a retoma: a linha {"resume_token": ...} no NDJSON e "# resume_token=..." no CSV, vazio/null no fim.
+    """
+    zone = request.args.get("zone", DEFAULT_ZONE)
+    export_format = request.args.get("format", "csv")
+    if export_format not in ("csv", "ndjson"):
+        return f"Formato inválido: {export_format}. Use csv ou ndjson.", 400
+    pages = export_pages(controller_id, zone, request.args.get("start"), request.args.get("end"),
+                         request.args.get("fields"), request.args.get("resume_token"),
+                         request.args.get("chunk_size", 1000, type=int))
+    try:
+        # Busca a primeira página antes de responder, para que parâmetros inválidos virem um erro 400
+        first_page = next(pages)
+    except ValueError as e:
+        print(f"Erro ao exportar o histórico do controlador {controller_id}: {e}")
+        # Só a mensagem de validação: o restante é o traceback remoto do RPyC (caminhos e código do servidor)
+        return f"Erro ao exportar o histórico do controlador {controller_id}: {str(e).splitlines()[0]}", 400
+    except Exception as e:
+        print(f"Erro ao exportar o histórico do controlador {controller_id}: {e}")
+        return f"Erro ao exportar o histórico do controlador {controller_id}.", 500
+
+    def stream():
+        try:
+            if export_format == "ndjson":
+                for page in itertools.chain([first_page], pages):
+                    yield "".join(json.dumps(row) + "\n" for row in page["data"])
+                    yield json.dumps({"resume_token": page["resume_token"]}) + "\n"
+                return
+            # CSV: cabeçalho mesmo sem leituras; cada página é escrita em um buffer esvaziado depois de enviado
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=first_page["fields"])
+            writer.writeheader()
+            for page in itertools.chain([first_page], pages):
+                writer.writerows(page["data"])
+                buffer.write(f"# resume_token={page['resume_token'] or ''}\n")
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            pages.close()  # Navegador desconectou no meio: devolve a conexão ao pool
+
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"{controller_id}_{zone}.{export_format}"
+    return Response(stream_with_context(stream()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}", "X-Accel-Buffering": "no"})
+
 @app.route("/<controller_id>/control_actuators", methods=["GET", "POST"])
 def control_actuators(controller_id):
     """Controlar os atuadores manualmente."""
+    zone = request.args.get("zone", DEFAULT_ZONE)
     if request.method == "POST":
         action = request.form["action"]
-        client.root.exposed_control_actuators(controller_id, action)
-        return redirect(url_for("controller_data", controller_id=controller_id))
+        with rpyc_pool.connection() as client:
+            client.root.exposed_control_actuators(controller_id, action, zone)
+        invalidate_controller_cache(controller_id, zone)
+        return redirect(url_for("controller_data", controller_id=controller_id, zone=zone))
 
     return render_template("toggle_actuators.html",
-                           selected_controller=controller_id)
+                           selected_controller=controller_id,
+                           selected_zone=zone)
 
 @app.route("/<controller_id>/control_sensors", methods=["GET", "POST"])
 def control_sensors(controller_id):
@@ -76,27 +183,56 @@ def control_sensors(controller_id):
         sensor_type = "temperature"
     elif controller_id == "lighting":
         sensor_type = "luminosity"
+    zone = request.args.get("zone", DEFAULT_ZONE)
     if request.method == "POST":
         action = request.form["action"]
-        client.root.exposed_control_sensors(sensor_type, action)
-        return redirect(url_for("controller_data", controller_id=controller_id))
+        with rpyc_pool.connection() as client:
+            client.root.exposed_control_sensors(sensor_type, action, zone)
+        invalidate_controller_cache(controller_id, zone)
+        return redirect(url_for("controller_data", controller_id=controller_id, zone=zone))
     
     return render_template("toggle_sensors.html",
                            selected_controller=controller_id,
+                           selected_zone=zone,
                            selected_sensor=sensor_type)
 
 @app.route("/<controller_id>/simulate_failover", methods=["POST"])
 def simulate_failover(controller_id):
     """Simula a falha do controlador selecionado."""
+    zone = request.args.get("zone", DEFAULT_ZONE)
     try:
-        print(f"Simulando falha no controlador {controller_id}.")
-        client.root.exposed_simulate_failover(controller_id)
+        print(f"Simulando falha no controlador {controller_id} (zona {zone}).")
+        with rpyc_pool.connection() as client:
+            client.root.exposed_simulate_failover(controller_id, zone)
+        invalidate_controller_cache(controller_id, zone)
 
-        return redirect(url_for('controller_data', controller_id=controller_id))
+        return redirect(url_for('controller_data', controller_id=controller_id, zone=zone))
     except Exception as e:
         print(f"Erro ao simular failover no controlador {controller_id}: {e}")
         return f"Erro ao simular failover para o controlador {controller_id}"
 
+@app.route("/cache/stats")
+def cache_stats():
+    """Retorna os contadores do cache de respostas (acertos, falhas, coalescências, despejos)."""
+    return response_cache.stats()
+
+@app.route("/metrics")
+def metrics():
+    """Métricas do middleware e deste cliente (pool RPyC e cache) no formato de texto do Prometheus."""
+    try:
+        with rpyc_pool.connection() as client:
+            body = client.root.exposed_get_metrics("prometheus").decode()
+    except Exception as e:
+        print(f"Erro ao buscar métricas do middleware: {e}")
+        body = ""
+    lines = []
+    for prefix, stats in (("client_rpyc_pool", rpyc_pool.stats()), ("client_response_cache", response_cache.stats())):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+    return Response(body + "\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
 current_port = int(os.environ.get('PORT', 5001))  # Porta padrão 5001 se não especificada
 
 if __name__ == "__main__":
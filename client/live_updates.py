@@ -0,0 +1,81 @@
+import json
+import queue
+import threading
+import time
+
+
+class LiveUpdateBroadcaster:
+    """Mantém uma única assinatura (long polling) no middleware e distribui os eventos a todos os navegadores conectados."""
+
+    def __init__(self, rpyc_pool, poll_timeout=25.0, subscriber_queue_size=100, retry_delay=2.0):
+        self.rpyc_pool = rpyc_pool
+        self.poll_timeout = poll_timeout
+        self.subscriber_queue_size = subscriber_queue_size
+        self.retry_delay = retry_delay
+        self.subscribers = set()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.last_seq = None  # None: ainda não sincronizado com o middleware
+
+        # Contadores
+        self.polls = 0
+        self.events_received = 0
+        self.events_dropped = 0
+
+    def subscribe(self):
+        """Cria a fila de eventos de um navegador, iniciando a assinatura no middleware se necessário."""
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self.condition:
+            self.subscribers.add(subscriber)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="LiveUpdateBroadcaster", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.condition:
+            self.subscribers.discard(subscriber)
+
+    def run(self):
+        while True:
+            with self.condition:
+                # Sem navegadores conectados não há por que consultar o middleware
+                self.condition.wait_for(lambda: self.subscribers)
+            try:
+                with self.rpyc_pool.connection() as client:
+                    timeout = 0 if self.last_seq is None else self.poll_timeout
+                    result = json.loads(client.root.exposed_wait_for_events(self.last_seq or 0, timeout))
+            except Exception as e:
+                print(f"Erro ao buscar atualizações ao vivo: {e}")
+                time.sleep(self.retry_delay)
+                continue
+
+            self.polls += 1
+            if self.last_seq is None or result["seq"] < self.last_seq:
+                # Primeira consulta ou middleware reiniciado: só acompanha os eventos novos
+                self.last_seq = result["seq"]
+                continue
+            self.last_seq = result["seq"]
+            self.broadcast(result["events"])
+
+    def broadcast(self, events):
+        with self.condition:
+            subscribers = list(self.subscribers)
+        for event in events:
+            self.events_received += 1
+            for subscriber in subscribers:
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # Navegador lento: descarta em vez de atrasar os demais
+                    self.events_dropped += 1
+
+    def stats(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "last_seq": self.last_seq,
+            "polls": self.polls,
+            "events_received": self.events_received,
+            "events_dropped": self.events_dropped,
+        }
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class InFlight:
+    """Busca em andamento de uma chave, compartilhada pelas requisições simultâneas."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """Cache em processo com TTL por entrada, despejo LRU e coalescência de buscas simultâneas."""
+
+    def __init__(self, ttl=5.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # chave -> (expira_em, valor), da menos para a mais recente
+        self.in_flight = {}
+        self.generation = 0  # Incrementada a cada invalidação; buscas antigas não são gravadas
+        self.lock = threading.Lock()
+
+        # Contadores expostos por stats()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, loader):
+        """Retorna o valor em cache da chave ou executa `loader` uma única vez para todas as requisições que esperam por ela."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = InFlight()
+                generation = self.generation
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+                if flight.error is None and generation == self.generation:
+                    self.store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def store(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Remove as entradas cujas chaves satisfazem `predicate` (todas, se omitido)."""
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            for key in [key for key in self.entries if predicate is None or predicate(key)]:
+                del self.entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "ttl_s": self.ttl,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import rpyc
+
+
+class RpycConnectionPool:
+    """Pool de conexões RPyC com o middleware, seguro para as threads de requisição do Flask."""
+
+    def __init__(self, host="localhost", port=18812, size=8, acquire_timeout=10.0, health_check_interval=30.0,
+                 min_backoff=0.5, max_backoff=30.0):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.acquire_timeout = acquire_timeout  # Espera máxima por uma conexão livre
+        self.health_check_interval = health_check_interval  # Conexões ociosas há mais tempo recebem um ping
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.idle = deque()  # (conexão, instante em que ficou ociosa)
+        self.in_use = 0
+        self.condition = threading.Condition()
+
+        # Reconexão com espera exponencial após falhas seguidas
+        self.backoff = 0.0
+        self.next_attempt = 0.0
+
+        # Contadores expostos por stats()
+        self.created = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.connect_failures = 0
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão durante a requisição; conexões com erro de rede são descartadas."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (EOFError, ConnectionError, OSError):
+            self.release(conn, broken=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self.condition:
+            self.checkouts += 1
+        while True:
+            with self.condition:
+                while True:
+                    # A conexão ociosa retirada já conta como em uso, reservando a vaga durante o ping
+                    if self.idle:
+                        conn, idle_since = self.idle.pop()
+                        self.in_use += 1
+                        break
+                    if self.in_use + len(self.idle) < self.size:
+                        self.in_use += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Nenhuma conexão RPyC livre no pool.")
+                    self.waits += 1
+                    self.condition.wait(remaining)
+
+            if conn is None:
+                # Conecta fora do lock para não bloquear as outras requisições
+                try:
+                    return self.connect()
+                except Exception:
+                    with self.condition:
+                        self.in_use -= 1
+                        self.condition.notify()
+                    raise
+
+            # O ping (até 2 s) e o fechamento também ficam fora do lock
+            if self.is_healthy(conn, idle_since):
+                return conn
+            self.discard(conn)
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+
+    def release(self, conn, broken=False):
+        broken = broken or conn.closed
+        with self.condition:
+            self.in_use -= 1
+            if not broken:
+                self.idle.append((conn, time.monotonic()))
+            self.condition.notify()
+        if broken:
+            self.discard(conn)
+
+    def connect(self):
+        now = time.monotonic()
+        if now < self.next_attempt:
+            raise ConnectionError(f"Middleware indisponível; nova tentativa em {self.next_attempt - now:.1f}s.")
+        try:
+            conn = rpyc.connect(self.host, self.port)
+        except Exception:
+            with self.condition:
+                self.connect_failures += 1
+                self.backoff = min(self.max_backoff, self.backoff * 2 if self.backoff else self.min_backoff)
+                self.next_attempt = time.monotonic() + self.backoff
+            raise
+        with self.condition:
+            self.created += 1
+            self.backoff = 0.0
+            self.next_attempt = 0.0
+        return conn
+
+    def is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            conn.ping(timeout=2)
+            return True
+        except Exception:
+            return False
+
+    def discard(self, conn):
+        """Fecha a conexão descartada; chamado fora do lock, pois o fechamento pode bloquear na rede."""
+        with self.condition:
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for conn, _ in idle:
+            self.discard(conn)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "in_use": self.in_use,
+            "created": self.created,
+            "discarded": self.discarded,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "connect_failures": self.connect_failures,
+            "backoff_s": self.backoff,
+        }
@@ -1,109 +1,356 @@
-import paho.mqtt.client as mqtt
-import json
+import logging
 import pymongo
 from datetime import datetime
 import time
+from controllers.db_writer import AsyncBatchWriter, BatchWriter
+from controllers.ingest_queue import AsyncIngestQueue, IngestQueue
+from controllers.db_layout import prepare_controller_collection, series_query, to_stored_document
+from controllers.history_export import DEFAULT_CHUNK_SIZE, query_history_page
+from controllers.ring_buffer import RingBuffer
+from controllers.rollups import BUCKETS, RollupAccumulator, query_rollups
+from controllers.mongo_pool import get_shared_manager
+from transport.mqtt_transport import MqttTransport
+from transport.payload_codec import decode_payload
+from metrics import registry as default_registry
+
+logger = logging.getLogger(__name__)
+
+# Zona (estufa) padrão: mantém os nomes e tópicos originais, de antes da divisão em zonas
+DEFAULT_ZONE = "default"
+
+
+def zone_topic(topic, zone):
+    """Insere a zona no tópico (agriculture/sensors/x -> agriculture/<zona>/sensors/x)."""
+    if zone == DEFAULT_ZONE:
+        return topic
+    root, rest = topic.split("/", 1)
+    return f"{root}/{zone}/{rest}"
+
 
 class ControllerBase:
-    def __init__(self, name, sensor_topic, actuator_topic, limits, role="Primary", db_name="agriculture_db", collection_name="controller_data"):
-        self.name = f"{name} ({role})"  # Nome dinâmico com o papel
+    # Coleções já preparadas (índices/time-series) neste processo -> layout efetivo (True = time-series)
+    prepared_collections = {}
+
+    # Regra declarada para a avaliação em lote (RuleTable): chave de `limits` e se o atuador liga acima do limite
+    rule_limit = None
+    rule_above = True
+
+    def __init__(self, name, sensor_topic, actuator_topic, limits, role="Primary", db_name="agriculture_db", collection_name="controller_data",
+                 batch_size=100, flush_interval=1.0, ingest_queue_size=1000, ingest_workers=1, ingest_policy="block",
+                 timeseries=False, history_size=500, rollup_collection_name="controller_rollups",
+                 mongo_manager=None, transport=None, broker="localhost", port=1883,
+                 hysteresis=None, min_dwell=0.0, refresh_interval=300.0, sensor_options=None, metrics=None,
+                 zone=DEFAULT_ZONE, engine=None, rule_batcher=None):
+        # Nome dinâmico com o papel (e a zona, fora da zona padrão)
+        self.name = f"{name} ({role})" if zone == DEFAULT_ZONE else f"{name} [{zone}] ({role})"
+        # Chave dos dados no MongoDB ("controller"), estável entre failovers: o nome do principal do grupo, igual
+        # para todas as réplicas e para os dados já gravados. A réplica promovida lê o histórico do primário falho
+        self.data_id = f"{name} (Primary)" if zone == DEFAULT_ZONE else f"{name} [{zone}] (Primary)"
         self.role = role  # Papel do controlador
-        self.sensor_topic = sensor_topic
+        self.zone = zone
+        self.sensor_topic = zone_topic(sensor_topic, zone)
         self.sensor_last_value = None
-        self.actuator_topic = actuator_topic
+        self.actuator_topic = zone_topic(actuator_topic, zone)
         self.actuator_last_value = None
         self.limits = limits
-        self.client = mqtt.Client(f"Controller_{self.name}")
+        self.sensor_options = sensor_options or {}  # Repassadas ao sensor (report-by-exception, amostragem adaptativa)
+        # Motor asyncio (AsyncEngine): fila, escrita em lote e sensor viram tarefas do loop em vez de threads
+        self.engine = engine
+        if engine is not None:
+            self.sensor_options = {**self.sensor_options, "engine": engine}
+
+        # Avaliação das regras em lote (RuleBatcher), compartilhada por todos os controladores; None = por mensagem
+        self.rule_batcher = rule_batcher
+
+        # Camada de comandos: envia só nas transições de estado
+        self.hysteresis = hysteresis or {}  # Banda de histerese por limite (mesmas chaves de `limits`)
+        self.min_dwell = min_dwell  # Tempo mínimo (s) em um estado antes de trocar
+        self.refresh_interval = refresh_interval  # Reenvio periódico (s) do estado atual, por segurança; None desativa
+        self.last_command_time = None
+        self.commands_requested = 0
+        self.commands_sent = 0
+        self.commands_suppressed = 0
+        self.commands_held = 0
+        self.commands_refreshed = 0
+        # Conexão MQTT compartilhada com sensor e atuador, se injetada; caso contrário, uma conexão própria
+        self.transport = transport or MqttTransport(f"Controller_{self.name}", broker, port)
 
-        # Configuração do MongoDB
-        self.mongo_client = pymongo.MongoClient("mongodb://localhost:27017/")
+        # Configuração do MongoDB: cliente (e pool de conexões) compartilhado por todos os controladores
+        self.mongo_manager = mongo_manager or get_shared_manager()
+        self.mongo_client = self.mongo_manager.acquire()
         self.db = self.mongo_client[db_name]
         self.collection = self.db[collection_name]
+        if (db_name, collection_name) not in ControllerBase.prepared_collections:
+            layout = prepare_controller_collection(self.db, collection_name, timeseries=timeseries,
+                                                   rollup_collection_name=rollup_collection_name)
+            if layout is not None:
+                ControllerBase.prepared_collections[(db_name, collection_name)] = layout
+        # Layout dos documentos: no time-series, controller e data_type ficam no metaField (db_layout.py)
+        self.timeseries = ControllerBase.prepared_collections.get((db_name, collection_name), timeseries)
+
+        # Escrita em lote no MongoDB, fora da thread do MQTT
+        if engine is not None:
+            self.db_writer = AsyncBatchWriter(engine, self.collection, name=self.name, batch_size=batch_size,
+                                              flush_interval=flush_interval)
+        else:
+            self.db_writer = BatchWriter(self.collection, name=self.name, batch_size=batch_size, flush_interval=flush_interval)
+
+        # Agregados por bucket (min/max/soma/contagem), atualizados junto com a escrita em lote
+        self.rollup_collection = self.db[rollup_collection_name]
+        self.rollups = RollupAccumulator(self.rollup_collection, self.data_id)
+        self.db_writer.add_flush_hook(self.rollups.flush)
+
+        # Fila de ingestão: o callback do MQTT apenas enfileira, os workers processam
+        if engine is not None:
+            self.ingest = AsyncIngestQueue(engine, self.handle_message, name=self.name, max_size=ingest_queue_size,
+                                           policy=ingest_policy)
+        else:
+            self.ingest = IngestQueue(self.handle_message, name=self.name, max_size=ingest_queue_size,
+                                      workers=ingest_workers, policy=ingest_policy)
+
+        # Últimas leituras do sensor em memória, para servir o histórico recente sem consultar o MongoDB
+        self.history = RingBuffer(history_size)
 
         # Variável para armazenar o tempo da última mensagem recebida
         self.last_message_time = None
 
-    def connect(self, broker="localhost", port=1883):
-        self.client.connect(broker, port)
-        self.client.on_message = self.on_message
-        self.client.subscribe(self.sensor_topic)
-        print(f"{self.name} conectado e monitorando {self.sensor_topic}")
+        # Hot standby: acompanha o fluxo do primário sem enviar comandos nem gravar no MongoDB
+        self.standby = False
+
+        # Funções notificadas a cada leitura do sensor e comando do atuador (ex.: atualizações ao vivo)
+        self.listeners = []
+
+        # Métricas do caminho quente, por controlador (expostas por exposed_get_metrics e /metrics)
+        metrics = metrics or default_registry
+        self.messages_received = metrics.counter(
+            "controller_messages_received_total", "Mensagens do sensor recebidas", controller=self.name)
+        self.messages_invalid = metrics.counter(
+            "controller_messages_invalid_total", "Mensagens do sensor descartadas por payload inválido", controller=self.name)
+        self.message_latency = metrics.histogram(
+            "controller_message_processing_seconds", "Processamento de uma mensagem do sensor", controller=self.name)
+        self.decode_latency = metrics.histogram(
+            "controller_payload_decode_seconds", "Decodificação do payload do sensor", controller=self.name)
+        self.store_latency = metrics.histogram(
+            "controller_store_seconds", "Enfileiramento de um documento para o MongoDB", controller=self.name)
+        self.command_latency = metrics.histogram(
+            "controller_send_command_seconds", "Envio de um comando ao atuador", controller=self.name)
+        self.recover_latency = metrics.histogram(
+            "controller_recover_state_seconds", "Recuperação do estado a partir do MongoDB", controller=self.name)
+
+    def connect(self):
+        self.transport.start()
+        self.transport.subscribe(self.sensor_topic, self.on_message)
+        logger.info("%s conectado e monitorando %s", self.name, self.sensor_topic)
 
     def on_message(self, client, userdata, message):
+        """Executado na thread de rede do MQTT: apenas enfileira o payload."""
+        self.messages_received.inc()
+        self.ingest.put(message.topic, message.payload)
+
+    def handle_message(self, topic, payload):
+        """Processa uma mensagem do sensor (executado pelos workers da fila de ingestão)."""
+        started = time.perf_counter()
         try:
-            data = json.loads(message.payload.decode())
+            data = decode_payload(payload)  # JSON ou binário, detectado pelo primeiro byte
+            self.decode_latency.observe(time.perf_counter() - started)
             value = data["valor"]
-            print(f"{self.name} - Valor recebido do sensor: {value}")
-            self.process_sensor_data(value)
+            logger.debug("%s - Valor recebido do sensor: %s", self.name, value)
+            if self.rule_batcher is not None:
+                self.rule_batcher.add(self, value)
+            else:
+                self.process_sensor_data(value)
             self.sensor_last_value = value
 
             # Atualiza a hora da última mensagem recebida
             self.last_message_time = datetime.utcnow()
+            if isinstance(value, (int, float)):
+                self.history.append(self.last_message_time, value)
+                if not self.standby:
+                    self.rollups.add(self.last_message_time, value)
 
-            # Armazenar dados do sensor no MongoDB
-            self.store_data_in_db(data_type="sensor", value=value)
+            # Armazenar dados do sensor no MongoDB (o primário é quem grava)
+            if not self.standby:
+                self.store_data_in_db(data_type="sensor", value=value, timestamp=self.last_message_time)
+                self.notify_listeners("sensor", value, self.last_message_time)
 
-        except (json.JSONDecodeError, KeyError):
-            print(f"{self.name}: Mensagem inválida recebida.")
+        except (ValueError, KeyError, TypeError):  # TypeError: valor de tipo inesperado (ex.: "valor": null)
+            self.messages_invalid.inc()
+            logger.warning("%s: Mensagem inválida recebida.", self.name)
+        self.message_latency.observe(time.perf_counter() - started)
 
     def process_sensor_data(self, value):
         raise NotImplementedError("Este método deve ser implementado na classe derivada.")
 
+    def request_command(self, command):
+        """Envia o comando decidido pelas regras apenas se houver transição de estado (ou refresh periódico)."""
+        self.commands_requested += 1
+        now = time.monotonic()
+        if command == self.actuator_last_value and self.last_command_time is not None:
+            if self.refresh_interval is None or now - self.last_command_time < self.refresh_interval:
+                self.commands_suppressed += 1
+                return False
+            self.commands_refreshed += 1
+        elif self.last_command_time is not None and now - self.last_command_time < self.min_dwell:
+            # Transição antes do tempo mínimo de permanência no estado atual
+            self.commands_held += 1
+            return False
+        self.send_command(command)
+        return True
+
+    def refresh_command(self):
+        """Leitura dentro da banda de histerese: reenvia o estado atual se o refresh periódico venceu.
+
+        Sem isso, um atuador que perdeu o último comando só o receberia de novo quando a leitura saísse da banda.
+        """
+        if self.actuator_last_value is None or self.last_command_time is None or self.refresh_interval is None:
+            return False
+        if time.monotonic() - self.last_command_time < self.refresh_interval:
+            return False
+        return self.request_command(self.actuator_last_value)
+
     def send_command(self, command):
         self.actuator_last_value = command
-        self.client.publish(self.actuator_topic, command)
-        print(f"{self.name}: Comando enviado para {self.actuator_topic} - {command}")
+        self.last_command_time = time.monotonic()
+        if self.standby:
+            # Em standby o estado é mantido, mas o comando fica a cargo do primário
+            return
+        started = time.perf_counter()
+        self.transport.publish(self.actuator_topic, command)
+        self.commands_sent += 1
+        logger.info("%s: Comando enviado para %s - %s", self.name, self.actuator_topic, command)
 
         # Armazenar estado do atuador no MongoDB
-        self.store_data_in_db(data_type="actuator", value=command)
+        timestamp = datetime.utcnow()
+        self.store_data_in_db(data_type="actuator", value=command, timestamp=timestamp)
+        self.notify_listeners("actuator", command, timestamp)
+        self.command_latency.observe(time.perf_counter() - started)
+
+    def add_listener(self, listener):
+        """Registra uma função chamada com (controlador, tipo de dado, valor, timestamp)."""
+        self.listeners.append(listener)
 
-    def store_data_in_db(self, data_type, value):
+    def notify_listeners(self, data_type, value, timestamp):
+        for listener in self.listeners:
+            try:
+                listener(self, data_type, value, timestamp)
+            except Exception as e:
+                logger.error("%s: Erro ao notificar ouvinte: %s", self.name, e)
+
+    def store_data_in_db(self, data_type, value, timestamp=None):
         """Armazena os dados no MongoDB."""
+        started = time.perf_counter()
         document = {
-            "controller": self.name,
-            "timestamp": datetime.utcnow(),
+            "controller": self.data_id,
+            "timestamp": timestamp or datetime.utcnow(),
             "data_type": data_type,
             "topic": self.sensor_topic if data_type == "sensor" else self.actuator_topic,
             "value": value
         }
-        self.collection.insert_one(document)
-        print(f"{self.name}: Dados armazenados no MongoDB: {document}")
+        self.db_writer.submit(to_stored_document(document, self.timeseries))
+        logger.debug("%s: Dados enfileirados para o MongoDB: %s", self.name, document)
+        self.store_latency.observe(time.perf_counter() - started)
 
     def recover_state_from_db(self):
         """Recupera o estado mais recente do MongoDB e o aplica ao controlador."""
+        started = time.perf_counter()
         try:
             # Recupera os dados do sensor mais recente
             last_sensor_data = self.collection.find_one(
-                {"controller": self.name, "data_type": "sensor"},
+                series_query(self.data_id, "sensor", self.timeseries),
                 sort=[("timestamp", pymongo.DESCENDING)]
             )
 
             # Recupera o estado mais recente do atuador
             last_actuator_data = self.collection.find_one(
-                {"controller": self.name, "data_type": "actuator"},
+                series_query(self.data_id, "actuator", self.timeseries),
                 sort=[("timestamp", pymongo.DESCENDING)]
             )
 
             # Atualiza os atributos do controlador
             if last_sensor_data:
                 self.sensor_last_value = last_sensor_data["value"]
-                print(f"{self.name}: Estado do sensor recuperado: {self.sensor_last_value}")
+                logger.info("%s: Estado do sensor recuperado: %s", self.name, self.sensor_last_value)
 
             if last_actuator_data:
                 self.actuator_last_value = last_actuator_data["value"]
-                print(f"{self.name}: Estado do atuador recuperado: {self.actuator_last_value}")
+                logger.info("%s: Estado do atuador recuperado: %s", self.name, self.actuator_last_value)
 
         except Exception as e:
-            print(f"{self.name}: Erro ao recuperar estado do MongoDB: {e}")
+            logger.error("%s: Erro ao recuperar estado do MongoDB: %s", self.name, e)
+        self.recover_latency.observe(time.perf_counter() - started)
+
+    def on_actuator_message(self, client, userdata, message):
+        """Em standby, acompanha os comandos publicados pelo primário (inclusive os manuais)."""
+        command = message.payload.decode()
+        if command in ("ON", "OFF"):
+            self.actuator_last_value = command
+
+    def start_standby(self):
+        """Inicia o controlador como hot standby: assina os tópicos e mantém o estado em memória."""
+        self.standby = True
+        self.ingest.start()
+        self.transport.start()
+        self.transport.subscribe(self.sensor_topic, self.on_message)
+        self.transport.subscribe(self.actuator_topic, self.on_actuator_message)
+        logger.info("%s em hot standby, acompanhando %s e %s", self.name, self.sensor_topic, self.actuator_topic)
+
+    def promote(self):
+        """Promove o standby a primário: apenas habilita comandos e gravação, já que o estado está atualizado."""
+        self.transport.unsubscribe(self.actuator_topic, self.on_actuator_message)
+        self.db_writer.start()
+        self.role = "Primary"
+        self.standby = False
+        logger.info("%s promovido de hot standby a principal.", self.name)
 
     def start(self):
+        self.db_writer.start()
+        self.ingest.start()
         self.connect()
-        self.client.loop_start()
 
     def stop(self):
-        self.client.loop_stop()
-        self.client.disconnect()
-        print(f"{self.name} desconectado do broker MQTT")
+        # Processa as mensagens já recebidas antes de desconectar
+        self.ingest.stop()
+        if self.standby:
+            self.transport.unsubscribe(self.actuator_topic, self.on_actuator_message)
+        self.transport.unsubscribe(self.sensor_topic, self.on_message)
+        self.transport.stop()
+        logger.info("%s desconectado do broker MQTT", self.name)
+
+        # Garante que os dados pendentes sejam gravados antes do failover
+        self.db_writer.stop()
+
+    def close(self):
+        """Libera os recursos do controlador descartado (referência ao cliente MongoDB compartilhado)."""
+        if self.mongo_client is not None:
+            self.mongo_client = None
+            self.mongo_manager.release()
+        if self.rule_batcher is not None:
+            self.rule_batcher.remove(self)
+
+    def get_stats(self):
+        """Retorna as métricas internas do controlador."""
+        return {"db_writer": self.db_writer.stats(), "ingest": self.ingest.stats(), "rollups": self.rollups.stats(),
+                "transport": self.transport.stats(), "commands": self.get_command_stats(),
+                "sensor": self.get_sensor_stats()}
+
+    def get_sensor_stats(self):
+        sensor = getattr(self, "sensor", None)
+        return sensor.get_stats() if sensor is not None else {}
+
+    def get_command_stats(self):
+        """Volume de comandos: pedidos pelas regras (um por leitura, como antes) contra efetivamente enviados."""
+        # Na avaliação em lote, os comandos iguais ao estado atual são descartados e contados pelo RuleBatcher
+        batch_suppressed = self.rule_batcher.suppressed_commands(self) if self.rule_batcher is not None else 0
+        suppressed = self.commands_suppressed + batch_suppressed
+        return {
+            "requested": self.commands_requested + batch_suppressed,
+            "sent": self.commands_sent,
+            "suppressed_same_state": suppressed,
+            "held_min_dwell": self.commands_held,
+            "refreshes": self.commands_refreshed,
+            # Cada comando suprimido evita uma publicação MQTT, a publicação de estado do atuador e uma escrita no MongoDB
+            "writes_avoided": suppressed + self.commands_held
+        }
 
     def get_sensor_last_value(self):
         return self.sensor_last_value
@@ -117,16 +364,39 @@ class ControllerBase:
     def control_actuator(self, action):
         raise NotImplementedError("Este método deve ser implementado na classe derivada.")
 
+    def warm_history_from_db(self):
+        """Preenche o buffer de leituras recentes com os dados mais novos do MongoDB."""
+        try:
+            recent_data = list(self.collection.find(
+                series_query(self.data_id, "sensor", self.timeseries),
+                sort=[("timestamp", pymongo.DESCENDING)]
+            ).limit(self.history.capacity))
+            self.history.clear()
+            for d in reversed(recent_data):
+                if isinstance(d["value"], (int, float)) and isinstance(d["timestamp"], datetime):
+                    self.history.append(d["timestamp"], d["value"])
+            logger.info("%s: Buffer de histórico aquecido com %d leituras.", self.name, len(self.history))
+        except Exception as e:
+            logger.error("%s: Erro ao aquecer o buffer de histórico: %s", self.name, e)
+
     def get_historical_sensor_data(self, limit=50):
-        """Busca os dados históricos do sensor no MongoDB."""
+        """Busca os dados históricos do sensor: recentes do buffer em memória, mais antigos do MongoDB."""
+        # Leituras recentes servidas da memória
+        formatted_data = [{"timestamp": ts.isoformat(), "value": value} for ts, value in self.history.latest(limit)]
+        if len(formatted_data) >= limit:
+            return formatted_data
+
         try:
-            # Recupera os dados mais recentes para o sensor
+            # Completa com os dados anteriores à leitura mais antiga do buffer
+            query = series_query(self.data_id, "sensor", self.timeseries)
+            oldest = self.history.oldest_timestamp()
+            if oldest is not None:
+                query["timestamp"] = {"$lt": oldest}
             historical_data = self.collection.find(
-                {"controller": self.name, "data_type": "sensor"},
+                query,
                 sort=[("timestamp", pymongo.DESCENDING)]
-            ).limit(limit)
+            ).limit(limit - len(formatted_data))
             # Formata os dados como uma lista de dicionários
-            formatted_data = []
             for d in historical_data:
                 # Converte o timestamp para ISO 8601
                 iso_timestamp = d["timestamp"].isoformat() if isinstance(d["timestamp"], datetime) else str(d["timestamp"])
@@ -134,6 +404,24 @@ class ControllerBase:
 
             return formatted_data
         except Exception as e:
-            print(f"{self.name}: Erro ao buscar dados históricos: {e}")
-            return []
+            logger.error("%s: Erro ao buscar dados históricos: %s", self.name, e)
+            return formatted_data
+
+    def get_history_page(self, start=None, end=None, fields=None, resume_token=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Uma página do histórico do sensor em [start, end), em ordem crescente, e o token da próxima (ou None).
 
+        Lê só do MongoDB: as leituras ainda na fila da escrita em lote entram na exportação seguinte.
+        """
+        return query_history_page(self.collection, self.data_id, start, end, fields, resume_token, chunk_size,
+                                  timeseries=self.timeseries)
+
+    def get_aggregated_history(self, start, end, bucket="1m"):
+        """Retorna min/max/avg/count por bucket do sensor entre start e end, a partir dos rollups."""
+        if bucket not in BUCKETS:
+            logger.warning("%s: Bucket inválido para histórico agregado: %s", self.name, bucket)
+            return []
+        try:
+            return query_rollups(self.rollup_collection, self.data_id, bucket, start, end)
+        except Exception as e:
+            logger.error("%s: Erro ao buscar histórico agregado: %s", self.name, e)
+            return []
@@ -1,45 +1,56 @@
+import logging
 from controllers.controller_base import ControllerBase
 from sensors.temperature_sensor import TemperatureSensor
 from actuators.cooling_system import CoolingActuator
 
+logger = logging.getLogger(__name__)
+
 class CoolingController(ControllerBase):
-    def __init__(self, role="Primary"):
+    rule_limit = "max_temperature"
+    rule_above = True
+
+    def __init__(self, role="Primary", **kwargs):
+        kwargs.setdefault("hysteresis", {"max_temperature": 1})  # Banda para não alternar o atuador perto do limite
         super().__init__(
             name="Refrigeração",
             sensor_topic="agriculture/sensors/temperature",
             actuator_topic="agriculture/actuators/cooling",
             limits={"max_temperature": 30},
-            role=role
+            role=role,
+            **kwargs
         )
-        self.sensor = TemperatureSensor()
-        self.actuator = CoolingActuator()
+        self.sensor = TemperatureSensor(topic=self.sensor_topic, transport=self.transport, **self.sensor_options)
+        self.actuator = CoolingActuator(topic=self.actuator_topic, transport=self.transport)
 
     def process_sensor_data(self, value):
-        if value > self.limits["max_temperature"]:
-            print(f"{self.name}: Temperatura alta ({value}°C), ativando refrigeração.")
-            self.send_command("ON")
+        limit = self.limits["max_temperature"]
+        if value > limit:
+            logger.debug("%s: Temperatura alta (%s°C), ativando refrigeração.", self.name, value)
+            self.request_command("ON")
+        elif value <= limit - self.hysteresis.get("max_temperature", 0) or self.actuator_last_value is None:
+            logger.debug("%s: Temperatura adequada (%s°C), desativando refrigeração.", self.name, value)
+            self.request_command("OFF")
         else:
-            print(f"{self.name}: Temperatura adequada ({value}°C), desativando refrigeração.")
-            self.send_command("OFF")
+            self.refresh_command()  # Dentro da banda: mantém o estado, com o refresh periódico
 
     def control_sensor(self, action):
         """Liga ou desliga o sensor."""
         if action == "on":
-            print(f"{self.name}: Sensor ativado.")
+            logger.info("%s: Sensor ativado.", self.name)
             self.sensor.start()
         elif action == "off":
-            print(f"{self.name}: Sensor desativado.")
+            logger.info("%s: Sensor desativado.", self.name)
             self.sensor.stop()
         else:
-            print(f"{self.name}: Ação inválida para sensor - {action}")
+            logger.warning("%s: Ação inválida para sensor - %s", self.name, action)
     
     def control_actuator(self, action):
         """Liga ou desliga o atuador."""
         if action == "on":
             self.send_command("ON")
-            print(f"{self.name}: Atuador ligado.")
+            logger.info("%s: Atuador ligado.", self.name)
         elif action == "off":
             self.send_command("OFF")
-            print(f"{self.name}: Atuador desligado.")
+            logger.info("%s: Atuador desligado.", self.name)
         else:
-            print(f"{self.name}: Ação inválida para atuador - {action}")
+            logger.warning("%s: Ação inválida para atuador - %s", self.name, action)
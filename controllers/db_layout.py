@@ -0,0 +1,119 @@
+"""Layout da coleção controller_data: índice de histórico e, opcionalmente, coleção time-series.
+
+Na coleção comum, controller e data_type são campos do documento. No layout time-series eles identificam a
+série e ficam no metaField, o subdocumento meta {controller, data_type}: o MongoDB agrupa os buckets por série,
+então as consultas do sensor não leem os buckets do atuador. Os leitores montam filtros e índices por
+series_field e voltam ao formato comum com from_stored_document.
+"""
+import logging
+
+import pymongo
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from controllers.rollups import ensure_rollup_index
+
+logger = logging.getLogger(__name__)
+
+# Campos que identificam a série e vão para o metaField no layout time-series
+META_FIELD = "meta"
+SERIES_FIELDS = ("controller", "data_type")
+
+# Índice usado por recover_state_from_db e get_historical_sensor_data:
+# filtro por controlador/tipo de dado e ordenação pelo timestamp mais recente
+HISTORY_INDEX_NAME = "controller_data_type_timestamp"
+
+
+def series_field(field, timeseries=False):
+    """Caminho do campo no documento gravado (meta.controller no layout time-series)."""
+    return f"{META_FIELD}.{field}" if timeseries and field in SERIES_FIELDS else field
+
+
+def series_query(controller, data_type=None, timeseries=False):
+    """Filtro pela série (controlador e, opcionalmente, tipo de dado) no layout da coleção."""
+    query = {series_field("controller", timeseries): controller}
+    if data_type is not None:
+        query[series_field("data_type", timeseries)] = data_type
+    return query
+
+
+def to_stored_document(document, timeseries=False):
+    """Converte o documento do formato comum para o layout da coleção (move a série para meta)."""
+    if not timeseries:
+        return document
+    stored = {key: value for key, value in document.items() if key not in SERIES_FIELDS}
+    stored[META_FIELD] = {field: document[field] for field in SERIES_FIELDS if field in document}
+    return stored
+
+
+def from_stored_document(document):
+    """Converte um documento lido de qualquer um dos layouts para o formato comum."""
+    if META_FIELD not in document:
+        return document
+    document = dict(document)
+    document.update(document.pop(META_FIELD) or {})
+    return document
+
+
+def history_index_keys(timeseries=False):
+    return [
+        (series_field("controller", timeseries), pymongo.ASCENDING),
+        (series_field("data_type", timeseries), pymongo.ASCENDING),
+        ("timestamp", pymongo.DESCENDING),
+    ]
+
+
+def is_timeseries_collection(db, collection_name):
+    """Verifica se a coleção existe e é uma coleção time-series."""
+    for info in db.list_collections(filter={"name": collection_name}):
+        return info.get("type") == "timeseries"
+    return False
+
+
+def uses_meta_layout(db, collection_name):
+    """Indica se os documentos usam o subdocumento meta (time-series criada com META_FIELD como metaField).
+
+    Coleções time-series criadas antes, com controller como metaField, mantêm os campos no documento.
+    """
+    for info in db.list_collections(filter={"name": collection_name}):
+        return info.get("options", {}).get("timeseries", {}).get("metaField") == META_FIELD
+    return False
+
+
+def create_timeseries_collection(db, collection_name, granularity="seconds"):
+    """Cria a coleção time-series com a série (meta: controlador e tipo de dado) como metaField."""
+    try:
+        db.create_collection(
+            collection_name,
+            timeseries={"timeField": "timestamp", "metaField": META_FIELD, "granularity": granularity},
+        )
+        logger.info("[MONGODB] Coleção time-series %s criada.", collection_name)
+    except CollectionInvalid:
+        # A coleção já existe
+        pass
+
+
+def ensure_history_index(collection, timeseries=False):
+    """Cria (se necessário) o índice composto (controller, data_type, timestamp desc), no layout da coleção."""
+    collection.create_index(history_index_keys(timeseries), name=HISTORY_INDEX_NAME)
+
+
+def prepare_controller_collection(db, collection_name, timeseries=False, rollup_collection_name=None):
+    """Prepara a coleção de dados dos controladores: layout time-series opcional, índice de histórico e rollups.
+
+    Retorna o layout efetivo (True se os documentos usam meta), ou None se o MongoDB não pôde ser preparado.
+    """
+    try:
+        if timeseries:
+            if collection_name in db.list_collection_names() and not is_timeseries_collection(db, collection_name):
+                logger.warning("[MONGODB] %s já existe como coleção comum. "
+                               "Execute scripts/migrate_controller_data.py para convertê-la em time-series.", collection_name)
+            else:
+                create_timeseries_collection(db, collection_name)
+        layout = uses_meta_layout(db, collection_name)
+        ensure_history_index(db[collection_name], layout)
+        if rollup_collection_name:
+            ensure_rollup_index(db[rollup_collection_name])
+        return layout
+    except PyMongoError as e:
+        logger.error("[MONGODB] Erro ao preparar a coleção %s: %s", collection_name, e)
+        return None
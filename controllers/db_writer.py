@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Escreve documentos no MongoDB em lote, a partir de uma thread em segundo plano."""
+
+    def __init__(self, collection, name="BatchWriter", batch_size=100, flush_interval=1.0, max_queue_size=10000):
+        self.collection = collection
+        self.name = name
+        self.batch_size = batch_size  # Descarrega ao atingir este número de documentos
+        self.flush_interval = flush_interval  # ... ou após este tempo (segundos)
+        self.max_queue_size = max_queue_size  # Limite da fila antes de bloquear quem escreve
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.active = False
+        self.flush_hooks = []  # Funções chamadas a cada ciclo de descarga (ex.: rollups)
+
+        # Contadores expostos por stats()
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.thread = threading.Thread(target=self.run, name=f"BatchWriter_{self.name}", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Para a thread de escrita, descarregando o que ainda estiver na fila."""
+        if self.active:
+            with self.condition:
+                self.active = False
+                self.condition.notify_all()
+            if self.thread and self.thread.is_alive():
+                self.thread.join()
+        self.flush()
+        self.run_flush_hooks()
+
+    def add_flush_hook(self, hook):
+        """Registra uma função executada pela thread de escrita a cada ciclo de descarga."""
+        self.flush_hooks.append(hook)
+
+    def run_flush_hooks(self):
+        for hook in self.flush_hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.error("%s: Erro ao executar descarga auxiliar: %s", self.name, e)
+
+    def submit(self, document):
+        """Enfileira um documento. Sem a thread ativa, a escrita é feita imediatamente."""
+        if not self.active:
+            self.write_batch([document])
+            return
+        with self.condition:
+            while self.active and len(self.queue) >= self.max_queue_size:
+                # Fila cheia: aguarda a thread de escrita liberar espaço
+                self.condition.notify_all()
+                self.condition.wait(self.flush_interval)
+            self.queue.append(document)
+            self.enqueued += 1
+            if len(self.queue) >= self.batch_size:
+                self.condition.notify_all()
+
+    def run(self):
+        while self.active:
+            with self.condition:
+                if self.active and len(self.queue) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+            self.flush()
+            self.run_flush_hooks()
+
+    def flush(self):
+        """Descarrega toda a fila em lotes de até batch_size documentos."""
+        with self.flush_lock:
+            while True:
+                with self.condition:
+                    if not self.queue:
+                        return
+                    batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+                    self.condition.notify_all()
+                self.write_batch(batch)
+
+    def write_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except PyMongoError as e:
+            self.record_failure(batch, e)
+        self.record_flush(batch, time.perf_counter() - start)
+
+    def record_failure(self, batch, error):
+        if isinstance(error, BulkWriteError):
+            inserted = error.details.get("nInserted", 0)
+            self.written += inserted
+            self.failed += len(batch) - inserted
+            logger.error("%s: Falha parcial ao gravar lote no MongoDB: %d documento(s) perdido(s)", self.name, len(batch) - inserted)
+        else:
+            self.failed += len(batch)
+            logger.error("%s: Erro ao gravar lote no MongoDB: %s", self.name, error)
+
+    def record_flush(self, batch, latency):
+        self.flushes += 1
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    def stats(self):
+        """Retorna os contadores de fila, tamanho de lote e latência de descarga."""
+        flushes = self.flushes or 1
+        return {
+            "queue_depth": len(self.queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": round((self.written + self.failed) / flushes, 2),
+            "max_batch_size": self.max_batch_size,
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 3),
+            "avg_flush_latency_ms": round(self.total_flush_latency / flushes * 1000, 3),
+            "max_flush_latency_ms": round(self.max_flush_latency * 1000, 3),
+        }
+
+
+class AsyncBatchWriter(BatchWriter):
+    """Escrita em lote do motor asyncio: a descarga é uma tarefa do loop do AsyncEngine, sem thread própria.
+
+    Com o cliente motor (AsyncMongoManager) o insert_many é aguardado no loop; com o pymongo, roda
+    no executor padrão do loop. Os ciclos auxiliares (rollups) usam a API síncrona e rodam no executor.
+    """
+
+    def __init__(self, engine, collection, name="BatchWriter", batch_size=100, flush_interval=1.0, max_queue_size=10000):
+        super().__init__(collection, name=name, batch_size=batch_size, flush_interval=flush_interval,
+                         max_queue_size=max_queue_size)
+        self.engine = engine
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.task = self.engine.submit(self.run_async())
+
+    def stop(self):
+        """Para a tarefa de escrita, descarregando o que ainda estiver na fila.
+
+        Chamado de dentro do loop, não pode bloquear: a descarga final vira uma tarefa, retornada para quem
+        quiser aguardá-la.
+        """
+        if self.active:
+            self.active = False
+            self.engine.call_soon(self.wakeup.set)
+        if self.engine.in_loop():
+            return asyncio.ensure_future(self.finish_async())
+        self.engine.run(self.finish_async())
+
+    async def finish_async(self):
+        """Aguarda a tarefa de escrita terminar e descarrega o que sobrou na fila."""
+        if self.task is not None:
+            await asyncio.wrap_future(self.task)
+        await self.flush_async()
+        await asyncio.get_running_loop().run_in_executor(None, self.run_flush_hooks)
+
+    def submit(self, document):
+        """Enfileira um documento sem bloquear o loop (a fila cheia só antecipa a descarga)."""
+        if not self.active:
+            if self.engine.in_loop():
+                asyncio.ensure_future(self.write_batch_async([document]))
+            else:
+                self.engine.run(self.write_batch_async([document]))
+            return
+        with self.condition:
+            self.queue.append(document)
+            self.enqueued += 1
+            full = len(self.queue) >= self.batch_size
+        if full:
+            self.engine.call_soon(self.wakeup.set)
+
+    async def run_async(self):
+        loop = asyncio.get_running_loop()
+        while self.active:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush_async()
+            await loop.run_in_executor(None, self.run_flush_hooks)
+
+    async def flush_async(self):
+        """Descarrega toda a fila em lotes de até batch_size documentos."""
+        while True:
+            with self.condition:
+                if not self.queue:
+                    return
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            await self.write_batch_async(batch)
+
+    async def write_batch_async(self, batch):
+        start = time.perf_counter()
+        collection = getattr(self.collection, "async_target", None)
+        try:
+            if collection is not None:
+                await collection.insert_many(batch, ordered=False)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: self.collection.insert_many(batch, ordered=False))
+            self.written += len(batch)
+        except PyMongoError as e:
+            self.record_failure(batch, e)
+        self.record_flush(batch, time.perf_counter() - start)
@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+
+import pymongo
+from bson import json_util
+
+from controllers.db_layout import from_stored_document, series_field, series_query
+
+# Campos que podem ser pedidos na exportação do histórico (projeção); timestamp e value por padrão
+EXPORT_FIELDS = ("timestamp", "value", "data_type", "topic", "controller")
+DEFAULT_EXPORT_FIELDS = ("timestamp", "value")
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10000  # Limita a memória de cada página no middleware e no cliente
+
+
+def normalize_fields(fields):
+    """Valida a projeção pedida (lista ou "a,b"), mantendo a ordem; None usa os campos padrão."""
+    if fields is None:
+        return DEFAULT_EXPORT_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = tuple(dict.fromkeys(field.strip() for field in fields if field.strip()))
+    unknown = [field for field in fields if field not in EXPORT_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Campos inválidos para exportação: {unknown or fields}. Use {list(EXPORT_FIELDS)}")
+    return fields
+
+
+def encode_resume_token(document):
+    """Token opaco com a posição (timestamp, _id) do último documento entregue."""
+    # O timestamp vai em ISO 8601 para manter os microssegundos ($date do json_util guarda só milissegundos)
+    position = json_util.dumps({"t": document["timestamp"].isoformat(), "id": document["_id"]})
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_resume_token(token):
+    """Retorna (timestamp, _id) do token; levanta ValueError se ele for inválido."""
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(position["t"]), position["id"]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError(f"Token de retomada inválido: {token!r}") from None
+
+
+def format_document(document, fields):
+    document = from_stored_document(document)
+    row = {}
+    for field in fields:
+        value = document.get(field)
+        row[field] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+def query_history_page(collection, controller, start=None, end=None, fields=None, resume_token=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, data_type="sensor", timeseries=False):
+    """Retorna uma página do histórico do controlador, em ordem crescente de timestamp, e o token da próxima.
+
+    Paginação por chave (timestamp, _id), sem skip: cada página é uma consulta nova que começa depois do
+    último documento entregue, usando o índice (controller, data_type, timestamp), então o custo não cresce
+    com o quanto já foi exportado e a exportação pode ser retomada pelo token. O token é None na última página.
+    """
+    fields = normalize_fields(fields)
+    chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+    query = series_query(controller, data_type, timeseries)
+    time_range = {}
+    if start is not None:
+        time_range["$gte"] = start
+    if end is not None:
+        time_range["$lt"] = end
+    if resume_token is not None:
+        # Depois da posição do token: timestamp maior, ou o mesmo timestamp com _id maior
+        last_timestamp, last_id = decode_resume_token(resume_token)
+        query["$or"] = [{"timestamp": {"$gt": last_timestamp}}, {"timestamp": last_timestamp, "_id": {"$gt": last_id}}]
+    if time_range:
+        query["timestamp"] = time_range
+
+    projection = {series_field(field, timeseries): 1 for field in fields}
+    projection.update({"timestamp": 1, "_id": 1})  # Necessários para o token
+    documents = list(collection.find(
+        query,
+        projection,
+        sort=[("timestamp", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+    ).limit(chunk_size))
+    next_token = encode_resume_token(documents[-1]) if len(documents) == chunk_size else None
+    return [format_document(document, fields) for document in documents], next_token
+
+
+def iterate_pages(get_page, resume_token=None):
+    """Gera as páginas {"fields", "data", "resume_token"} de get_page(token), seguindo o token até a última.
+
+    Só uma página fica em memória por vez; o token de cada página retoma a exportação logo depois dela.
+    Sempre há ao menos uma página (vazia num período sem leituras) e a última tem resume_token None.
+    """
+    while True:
+        page = get_page(resume_token)
+        yield page
+        resume_token = page["resume_token"]
+        if resume_token is None:
+            return
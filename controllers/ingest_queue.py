@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    """Fila limitada entre o callback do MQTT e um pool de workers que processa as mensagens."""
+
+    POLICIES = ("block", "drop_oldest", "coalesce")
+
+    def __init__(self, handler, name="IngestQueue", max_size=1000, workers=1, policy="block"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Política de fila inválida: {policy}. Use uma de {self.POLICIES}")
+        self.handler = handler  # Função chamada pelos workers com (topic, payload)
+        self.name = name
+        self.max_size = max_size
+        self.num_workers = workers  # Com mais de um worker a ordem entre mensagens não é garantida
+        self.policy = policy
+        self.queue = deque()
+        self.pending_by_topic = {}  # Última entrada pendente por tópico (política "coalesce")
+        self.condition = threading.Condition()
+        self.workers = []
+        self.active = False
+
+        # Contadores expostos por stats()
+        self.enqueued = 0
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.high_watermark = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_process_time = 0.0
+        self.max_process_time = 0.0
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.workers = [
+                threading.Thread(target=self.run, name=f"Ingest_{self.name}_{i}", daemon=True)
+                for i in range(self.num_workers)
+            ]
+            for worker in self.workers:
+                worker.start()
+
+    def stop(self):
+        """Para de aceitar mensagens e aguarda os workers esvaziarem a fila."""
+        with self.condition:
+            if not self.active:
+                return
+            self.active = False
+            self.condition.notify_all()
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.join()
+        self.workers = []
+
+    def put(self, topic, payload):
+        """Enfileira uma mensagem aplicando a política de contrapressão quando a fila está cheia."""
+        with self.condition:
+            if not self.active:
+                self.rejected += 1
+                return False
+
+            if len(self.queue) >= self.max_size:
+                if self.policy == "coalesce" and topic in self.pending_by_topic:
+                    # Substitui o payload pendente do mesmo tópico pelo mais recente
+                    self.pending_by_topic[topic][1] = payload
+                    self.coalesced += 1
+                    return True
+                if self.policy == "drop_oldest":
+                    oldest = self.queue.popleft()
+                    if self.pending_by_topic.get(oldest[0]) is oldest:
+                        del self.pending_by_topic[oldest[0]]
+                    self.dropped += 1
+                else:
+                    self.blocked += 1
+                    blocked_since = time.perf_counter()
+                    while self.active and len(self.queue) >= self.max_size:
+                        self.condition.wait()
+                    self.blocked_time += time.perf_counter() - blocked_since
+                    if not self.active:
+                        self.rejected += 1
+                        return False
+
+            entry = [topic, payload, time.perf_counter()]
+            self.queue.append(entry)
+            self.pending_by_topic[topic] = entry
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, len(self.queue))
+            self.condition.notify_all()
+            return True
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.active and not self.queue:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                entry = self.queue.popleft()
+                if self.pending_by_topic.get(entry[0]) is entry:
+                    del self.pending_by_topic[entry[0]]
+                self.condition.notify_all()
+
+            self.process(*entry)
+
+    def process(self, topic, payload, enqueued_at):
+        started = time.perf_counter()
+        try:
+            self.handler(topic, payload)
+        except Exception as e:
+            self.errors += 1
+            logger.error("%s: Erro ao processar mensagem de %s: %s", self.name, topic, e)
+        finished = time.perf_counter()
+
+        with self.condition:
+            self.processed += 1
+            self.total_wait_time += started - enqueued_at
+            self.max_wait_time = max(self.max_wait_time, started - enqueued_at)
+            self.total_process_time += finished - started
+            self.max_process_time = max(self.max_process_time, finished - started)
+
+    def stats(self):
+        """Retorna profundidade, descartes e latências da fila de ingestão."""
+        processed = self.processed or 1
+        return {
+            "policy": self.policy,
+            "workers": self.num_workers,
+            "max_size": self.max_size,
+            "queue_depth": len(self.queue),
+            "high_watermark": self.high_watermark,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "blocked": self.blocked,
+            "blocked_time_ms": round(self.blocked_time * 1000, 3),
+            "avg_wait_ms": round(self.total_wait_time / processed * 1000, 3),
+            "max_wait_ms": round(self.max_wait_time * 1000, 3),
+            "avg_process_ms": round(self.total_process_time / processed * 1000, 3),
+            "max_process_ms": round(self.max_process_time * 1000, 3),
+        }
+
+
+class AsyncIngestQueue(IngestQueue):
+    """Fila de ingestão do motor asyncio: sem workers, processa as mensagens no loop do AsyncEngine.
+
+    Com a política "block" cada mensagem é processada assim que chega: o transporte só lê a próxima
+    depois, o que aplica a contrapressão no próprio socket. Com "drop_oldest" e "coalesce" as mensagens
+    são enfileiradas e uma tarefa do loop as consome, cedendo a vez ao transporte entre uma e outra.
+    """
+
+    def __init__(self, engine, handler, name="IngestQueue", max_size=1000, workers=1, policy="block"):
+        super().__init__(handler, name=name, max_size=max_size, workers=1, policy=policy)
+        self.engine = engine
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            if self.policy != "block":
+                self.task = self.engine.submit(self.run())
+
+    def stop(self):
+        """Para de aceitar mensagens e aguarda a tarefa esvaziar a fila."""
+        with self.condition:
+            if not self.active:
+                return
+            self.active = False
+        if self.task is not None:
+            self.engine.call_soon(self.wakeup.set)
+            if not self.engine.in_loop():
+                self.task.result()
+            self.task = None
+
+    def put(self, topic, payload):
+        if self.policy == "block":
+            if not self.active:
+                self.rejected += 1
+                return False
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, 1)
+            self.process(topic, payload, time.perf_counter())
+            return True
+        # Com a fila cheia, descarte e coalescência nunca aguardam: put não bloqueia o loop
+        accepted = super().put(topic, payload)
+        if accepted:
+            self.engine.call_soon(self.wakeup.set)
+        return accepted
+
+    async def run(self):
+        while True:
+            with self.condition:
+                if not self.queue:
+                    if not self.active:
+                        return
+                    self.wakeup.clear()
+                    entry = None
+                else:
+                    entry = self.queue.popleft()
+                    if self.pending_by_topic.get(entry[0]) is entry:
+                        del self.pending_by_topic[entry[0]]
+            if entry is None:
+                await self.wakeup.wait()
+                continue
+            self.process(*entry)
+            await asyncio.sleep(0)  # Deixa o transporte ler as próximas mensagens
@@ -1,46 +1,57 @@
+import logging
 from controllers.controller_base import ControllerBase
 from sensors.soil_moisture_sensor import SoilMoistureSensor
 from actuators.irrigation_system import IrrigationActuator
 
+logger = logging.getLogger(__name__)
+
 class IrrigationController(ControllerBase):
-    def __init__(self,role="Primary"):
+    rule_limit = "min_moisture"
+    rule_above = False
+
+    def __init__(self, role="Primary", **kwargs):
+        kwargs.setdefault("hysteresis", {"min_moisture": 2})  # Banda para não alternar o atuador perto do limite
         super().__init__(
             name="Irrigação",
             sensor_topic="agriculture/sensors/soil_moisture",
             actuator_topic="agriculture/actuators/irrigation",
             limits={"min_moisture": 30},
-            role=role
+            role=role,
+            **kwargs
         )
-        self.sensor = SoilMoistureSensor()
-        self.actuator = IrrigationActuator()
+        self.sensor = SoilMoistureSensor(topic=self.sensor_topic, transport=self.transport, **self.sensor_options)
+        self.actuator = IrrigationActuator(topic=self.actuator_topic, transport=self.transport)
 
     def process_sensor_data(self, value):
-        if value < self.limits["min_moisture"]:
-            print(f"{self.name}: Umidade baixa ({value}%), ativando irrigação.")
-            self.send_command("ON")
+        limit = self.limits["min_moisture"]
+        if value < limit:
+            logger.debug("%s: Umidade baixa (%s%%), ativando irrigação.", self.name, value)
+            self.request_command("ON")
+        elif value >= limit + self.hysteresis.get("min_moisture", 0) or self.actuator_last_value is None:
+            logger.debug("%s: Umidade adequada (%s%%), desativando irrigação.", self.name, value)
+            self.request_command("OFF")
         else:
-            print(f"{self.name}: Umidade adequada ({value}%), desativando irrigação.")
-            self.send_command("OFF")
+            self.refresh_command()  # Dentro da banda: mantém o estado, com o refresh periódico
     
     def control_sensor(self, action):
         """Liga ou desliga o sensor."""
         if action == "on":
-            print(f"{self.name}: Sensor ativado.")
+            logger.info("%s: Sensor ativado.", self.name)
             self.sensor.start()
         elif action == "off":
-            print(f"{self.name}: Sensor desativado.")
+            logger.info("%s: Sensor desativado.", self.name)
             self.sensor.stop()
         else:
-            print(f"{self.name}: Ação inválida para sensor - {action}")
+            logger.warning("%s: Ação inválida para sensor - %s", self.name, action)
     
     def control_actuator(self, action):
         """Liga ou desliga o atuador."""
         if action == "on":
             self.send_command("ON")
-            print(f"{self.name}: Atuador ligado.")
+            logger.info("%s: Atuador ligado.", self.name)
         elif action == "off":
             self.send_command("OFF")
-            print(f"{self.name}: Atuador desligado.")
+            logger.info("%s: Atuador desligado.", self.name)
         else:
-            print(f"{self.name}: Ação inválida para atuador - {action}")
+            logger.warning("%s: Ação inválida para atuador - %s", self.name, action)
 
@@ -1,46 +1,57 @@
+import logging
 from controllers.controller_base import ControllerBase
 from sensors.light_sensor import LightSensor
 from actuators.lighting_system import LightingActuator
 
+logger = logging.getLogger(__name__)
+
 class LightingController(ControllerBase):
-    def __init__(self,role="Primary"):
+    rule_limit = "min_luminosity"
+    rule_above = False
+
+    def __init__(self, role="Primary", **kwargs):
+        kwargs.setdefault("hysteresis", {"min_luminosity": 50})  # Banda para não alternar o atuador perto do limite
         super().__init__(
             name="Iluminação",
             sensor_topic="agriculture/sensors/light",
             actuator_topic="agriculture/actuators/lighting",
             limits={"min_luminosity": 200},
-            role=role
+            role=role,
+            **kwargs
         )
-        self.sensor = LightSensor()
-        self.actuator = LightingActuator()
+        self.sensor = LightSensor(topic=self.sensor_topic, transport=self.transport, **self.sensor_options)
+        self.actuator = LightingActuator(topic=self.actuator_topic, transport=self.transport)
 
     def process_sensor_data(self, value):
-        if value < self.limits["min_luminosity"]:
-            print(f"{self.name}: Luminosidade baixa ({value} lux), ativando iluminação.")
-            self.send_command("ON")
+        limit = self.limits["min_luminosity"]
+        if value < limit:
+            logger.debug("%s: Luminosidade baixa (%s lux), ativando iluminação.", self.name, value)
+            self.request_command("ON")
+        elif value >= limit + self.hysteresis.get("min_luminosity", 0) or self.actuator_last_value is None:
+            logger.debug("%s: Luminosidade adequada (%s lux), desativando iluminação.", self.name, value)
+            self.request_command("OFF")
         else:
-            print(f"{self.name}: Luminosidade adequada ({value} lux), desativando iluminação.")
-            self.send_command("OFF")
+            self.refresh_command()  # Dentro da banda: mantém o estado, com o refresh periódico
     
     def control_sensor(self, action):
         """Liga ou desliga o sensor."""
         if action == "on":
-            print(f"{self.name}: Sensor ativado.")
+            logger.info("%s: Sensor ativado.", self.name)
             self.sensor.start()
         elif action == "off":
-            print(f"{self.name}: Sensor desativado.")
+            logger.info("%s: Sensor desativado.", self.name)
             self.sensor.stop()
         else:
-            print(f"{self.name}: Ação inválida para sensor - {action}")
+            logger.warning("%s: Ação inválida para sensor - %s", self.name, action)
     
     def control_actuator(self, action):
         """Liga ou desliga o atuador."""
         if action == "on":
             self.send_command("ON")
-            print(f"{self.name}: Atuador ligado.")
+            logger.info("%s: Atuador ligado.", self.name)
         elif action == "off":
             self.send_command("OFF")
-            print(f"{self.name}: Atuador desligado.")
+            logger.info("%s: Atuador desligado.", self.name)
         else:
-            print(f"{self.name}: Ação inválida para atuador - {action}")
+            logger.warning("%s: Ação inválida para atuador - %s", self.name, action)
     
@@ -0,0 +1,148 @@
+import inspect
+import threading
+
+import pymongo
+
+try:
+    from motor.motor_asyncio import (AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorCommandCursor,
+                                     AsyncIOMotorCursor, AsyncIOMotorDatabase, AsyncIOMotorLatentCommandCursor)
+    MOTOR_OBJECTS = (AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection)
+    MOTOR_CURSORS = (AsyncIOMotorCursor, AsyncIOMotorCommandCursor, AsyncIOMotorLatentCommandCursor)
+except ImportError:  # Dependência opcional do motor asyncio; sem ela, o pymongo é usado pelo executor
+    AsyncIOMotorClient = None
+
+
+class MongoClientManager:
+    """Mantém um único MongoClient (e seu pool de conexões) compartilhado pelos controladores do processo."""
+
+    def __init__(self, uri="mongodb://localhost:27017/", max_pool_size=50, **client_options):
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.client_options = client_options
+        self.client = None
+        self.references = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Retorna o cliente compartilhado, criando-o no primeiro uso."""
+        with self.lock:
+            if self.client is None:
+                self.client = pymongo.MongoClient(self.uri, maxPoolSize=self.max_pool_size, **self.client_options)
+            self.references += 1
+            return self.client
+
+    def release(self):
+        """Libera uma referência; o cliente é fechado quando nenhum controlador o utiliza mais."""
+        with self.lock:
+            if self.references == 0:
+                return
+            self.references -= 1
+            if self.references == 0 and self.client is not None:
+                self.client.close()
+                self.client = None
+
+    def close(self):
+        """Fecha o cliente independentemente das referências (encerramento do processo)."""
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+            self.references = 0
+
+    def stats(self):
+        return {"uri": self.uri, "max_pool_size": self.max_pool_size, "references": self.references,
+                "connected": self.client is not None}
+
+
+class LoopBoundProxy:
+    """Expõe a API síncrona do pymongo sobre um objeto do motor: cada operação roda no loop do AsyncEngine
+    e quem chama aguarda o resultado. Assim o código dos controladores (recover_state_from_db, históricos,
+    rollups) funciona sem mudanças; no próprio loop, use o objeto do motor (async_target) diretamente.
+    """
+
+    def __init__(self, engine, target):
+        self.engine = engine
+        self.async_target = target
+
+    def wrap(self, value):
+        if isinstance(value, MOTOR_OBJECTS):
+            return LoopBoundProxy(self.engine, value)
+        if isinstance(value, MOTOR_CURSORS):
+            return LoopBoundCursor(self.engine, value)
+        return value
+
+    def __getitem__(self, name):
+        return self.wrap(self.async_target[name])
+
+    def __getattr__(self, name):
+        attribute = getattr(self.async_target, name)
+        if not callable(attribute) or isinstance(attribute, MOTOR_OBJECTS):
+            return self.wrap(attribute)
+
+        def call(*args, **kwargs):
+            return self.wrap(self.engine.run(invoke(attribute, *args, **kwargs)))
+        return call
+
+
+class LoopBoundCursor:
+    """Cursor do motor consumido de forma síncrona (sort/limit encadeados, iteração com to_list)."""
+
+    def __init__(self, engine, cursor):
+        self.engine = engine
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor.limit(count)
+        return self
+
+    def __iter__(self):
+        return iter(self.engine.run(invoke(self.cursor.to_list, None)))
+
+
+async def invoke(method, *args, **kwargs):
+    """Chama o método do motor no loop (ele cria futures do loop) e aguarda o resultado, se houver."""
+    result = method(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class AsyncMongoManager(MongoClientManager):
+    """Gerenciador do motor asyncio: um AsyncIOMotorClient no loop do AsyncEngine, entregue aos
+    controladores pela API síncrona (LoopBoundProxy). Sem o pacote motor, usa o pymongo normalmente.
+    """
+
+    def __init__(self, engine, uri="mongodb://localhost:27017/", max_pool_size=50, **client_options):
+        super().__init__(uri, max_pool_size=max_pool_size, **client_options)
+        self.engine = engine
+
+    def acquire(self):
+        if AsyncIOMotorClient is None:
+            return super().acquire()
+        with self.lock:
+            if self.client is None:
+                motor_client = AsyncIOMotorClient(self.uri, maxPoolSize=self.max_pool_size,
+                                                  io_loop=self.engine.loop, **self.client_options)
+                self.client = LoopBoundProxy(self.engine, motor_client)
+            self.references += 1
+            return self.client
+
+    def stats(self):
+        return {**super().stats(), "driver": "pymongo" if AsyncIOMotorClient is None else "motor"}
+
+
+# Gerenciador padrão do processo, usado quando nenhum é injetado no controlador
+shared_manager = None
+shared_manager_lock = threading.Lock()
+
+
+def get_shared_manager():
+    global shared_manager
+    with shared_manager_lock:
+        if shared_manager is None:
+            shared_manager = MongoClientManager()
+        return shared_manager
@@ -0,0 +1,64 @@
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_ms(timestamp):
+    """Converte um datetime UTC em milissegundos desde a época (mesma precisão do BSON)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(milliseconds):
+    """Converte milissegundos desde a época em um datetime UTC sem fuso, como os lidos do MongoDB."""
+    return EPOCH + timedelta(milliseconds=milliseconds)
+
+
+class RingBuffer:
+    """Buffer circular de capacidade fixa com as últimas leituras (timestamp, valor) em arrays tipados."""
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.timestamps = array("q", [0]) * capacity  # Milissegundos desde a época
+        self.values = array("d", [0.0]) * capacity
+        self.next_index = 0  # Posição da próxima escrita
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, value):
+        """Adiciona uma leitura, sobrescrevendo a mais antiga quando o buffer está cheio."""
+        with self.lock:
+            self.timestamps[self.next_index] = to_epoch_ms(timestamp)
+            self.values[self.next_index] = value
+            self.next_index = (self.next_index + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def clear(self):
+        with self.lock:
+            self.next_index = 0
+            self.size = 0
+
+    def latest(self, limit=None):
+        """Retorna até `limit` leituras (datetime, valor), da mais recente para a mais antiga."""
+        with self.lock:
+            count = self.size if limit is None else min(limit, self.size)
+            result = []
+            index = self.next_index
+            for _ in range(count):
+                index = (index - 1) % self.capacity
+                result.append((from_epoch_ms(self.timestamps[index]), self.values[index]))
+            return result
+
+    def oldest_timestamp(self):
+        """Retorna o timestamp da leitura mais antiga do buffer, ou None se estiver vazio."""
+        with self.lock:
+            if self.size == 0:
+                return None
+            return from_epoch_ms(self.timestamps[(self.next_index - self.size) % self.capacity])
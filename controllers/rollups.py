@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos de bucket suportados (em segundos)
+BUCKETS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+ROLLUP_INDEX_NAME = "controller_bucket_start"
+ROLLUP_INDEX_KEYS = [
+    ("controller", pymongo.ASCENDING),
+    ("bucket", pymongo.ASCENDING),
+    ("start", pymongo.ASCENDING),
+]
+
+
+def bucket_start(timestamp, bucket):
+    """Retorna o início do bucket (alinhado à época) que contém o timestamp."""
+    seconds = BUCKETS[bucket]
+    offset = (timestamp - datetime(1970, 1, 1)).total_seconds()
+    return datetime(1970, 1, 1) + timedelta(seconds=int(offset // seconds) * seconds)
+
+
+def ensure_rollup_index(collection):
+    """Cria o índice único (controller, bucket, start) da coleção de rollups."""
+    collection.create_index(ROLLUP_INDEX_KEYS, name=ROLLUP_INDEX_NAME, unique=True)
+
+
+def query_rollups(collection, controller, bucket, start, end):
+    """Retorna min/max/avg/count por bucket do controlador no intervalo [start, end)."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Bucket inválido: {bucket}. Use um de {list(BUCKETS)}")
+    cursor = collection.find(
+        {"controller": controller, "bucket": bucket, "start": {"$gte": bucket_start(start, bucket), "$lt": end}},
+        sort=[("start", pymongo.ASCENDING)]
+    )
+    return [
+        {
+            "start": d["start"].isoformat(),
+            "min": d["min"],
+            "max": d["max"],
+            "avg": round(d["sum"] / d["count"], 4) if d["count"] else None,
+            "count": d["count"],
+        }
+        for d in cursor
+    ]
+
+
+class RollupAccumulator:
+    """Acumula em memória as leituras por bucket e grava os incrementos nos rollups do MongoDB."""
+
+    def __init__(self, collection, controller, buckets=tuple(BUCKETS)):
+        self.collection = collection
+        self.controller = controller
+        self.buckets = buckets
+        self.pending = {}  # (bucket, início) -> [count, sum, min, max]
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+        # Contadores expostos por stats()
+        self.readings = 0
+        self.updates = 0
+        self.failed = 0
+        self.last_flush_latency = 0.0
+
+    def add(self, timestamp, value):
+        """Incorpora uma leitura aos buckets pendentes."""
+        with self.lock:
+            self.readings += 1
+            for bucket in self.buckets:
+                key = (bucket, bucket_start(timestamp, bucket))
+                entry = self.pending.get(key)
+                if entry is None:
+                    self.pending[key] = [1, value, value, value]
+                else:
+                    entry[0] += 1
+                    entry[1] += value
+                    entry[2] = min(entry[2], value)
+                    entry[3] = max(entry[3], value)
+
+    def flush(self):
+        """Grava os incrementos pendentes com um único bulk_write não ordenado."""
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                pending, self.pending = self.pending, {}
+
+            operations = [
+                UpdateOne(
+                    {"controller": self.controller, "bucket": bucket, "start": start},
+                    {"$inc": {"count": count, "sum": total}, "$min": {"min": low}, "$max": {"max": high}},
+                    upsert=True
+                )
+                for (bucket, start), (count, total, low, high) in pending.items()
+            ]
+            started = time.perf_counter()
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+                self.updates += len(operations)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                self.updates += len(operations) - failed
+                self.failed += failed
+                logger.error("%s: Falha parcial ao atualizar rollups: %d bucket(s) perdido(s)", self.controller, failed)
+            except PyMongoError as e:
+                self.failed += len(operations)
+                logger.error("%s: Erro ao atualizar rollups: %s", self.controller, e)
+            self.last_flush_latency = time.perf_counter() - started
+
+    def stats(self):
+        return {
+            "pending_buckets": len(self.pending),
+            "readings": self.readings,
+            "updates": self.updates,
+            "failed": self.failed,
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 3),
+        }
@@ -0,0 +1,283 @@
+import logging
+import threading
+import time
+
+from metrics import registry as default_registry
+
+try:
+    import numpy as np
+except ImportError:  # Dependência opcional, necessária só com a avaliação em lote (RULE_BATCH_INTERVAL)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Decisão de cada leitura: índice em COMMANDS, ou HOLD dentro da banda de histerese (mantém o estado)
+COMMAND_OFF = 0
+COMMAND_ON = 1
+COMMAND_HOLD = -1
+COMMANDS = ("OFF", "ON")
+
+# Estado atual do atuador (actuator_last_value) na mesma codificação; OTHER_STATE não coincide com nenhuma decisão
+NO_STATE = -1
+OTHER_STATE = -2
+STATE_CODES = {None: NO_STATE, "OFF": COMMAND_OFF, "ON": COMMAND_ON}
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("A avaliação de regras em lote requer o pacote numpy (pip install numpy)")
+
+
+class RuleTable:
+    """Regras dos controladores em arrays, uma linha por controlador: limite, histerese, sentido e faixa de validação.
+
+    A linha é lida do próprio controlador (limits[rule_limit], hysteresis e rule_above), então a regra avaliada
+    em lote é a mesma do process_sensor_data da classe.
+    """
+
+    def __init__(self, capacity=1024):
+        require_numpy()
+        self.limit = np.zeros(capacity)
+        self.hysteresis = np.zeros(capacity)
+        self.sign = np.ones(capacity)  # +1: liga acima do limite; -1: liga abaixo
+        self.refresh_interval = np.full(capacity, np.inf)  # Reenvio periódico do estado (inf = desativado)
+        self.valid_min = np.full(capacity, -np.inf)
+        self.valid_max = np.full(capacity, np.inf)
+        self.suppressed = np.zeros(capacity, dtype=np.int64)  # Comandos iguais ao estado, descartados no lote
+        self.rows = {}  # Controlador -> linha
+        self.free_rows = []  # Linhas de controladores removidos, reaproveitadas
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def register(self, controller, valid_range=None):
+        """Adiciona (ou atualiza) a linha do controlador e retorna o seu índice."""
+        with self.lock:
+            row = self.rows.get(controller)
+            if row is None:
+                row = self.free_rows.pop() if self.free_rows else self.allocate_row()
+                self.rows[controller] = row
+                self.suppressed[row] = 0
+            self.limit[row] = controller.limits[controller.rule_limit]
+            self.hysteresis[row] = controller.hysteresis.get(controller.rule_limit, 0)
+            self.sign[row] = 1.0 if controller.rule_above else -1.0
+            self.refresh_interval[row] = np.inf if controller.refresh_interval is None else controller.refresh_interval
+            self.valid_min[row], self.valid_max[row] = valid_range or (-np.inf, np.inf)
+            return row
+
+    def allocate_row(self):
+        if self.size == len(self.limit):
+            # Dobra a capacidade de todos os arrays
+            for name in ("limit", "hysteresis", "sign", "refresh_interval", "valid_min", "valid_max", "suppressed"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.empty_like(array)]))
+        self.size += 1
+        return self.size - 1
+
+    def unregister(self, controller):
+        with self.lock:
+            row = self.rows.pop(controller, None)
+            if row is not None:
+                self.free_rows.append(row)
+
+    def row(self, controller):
+        return self.rows.get(controller)
+
+    def suppressed_commands(self, controller):
+        row = self.rows.get(controller)
+        return int(self.suppressed[row]) if row is not None else 0
+
+    def evaluate(self, rows, values):
+        """Avalia as leituras (linha do controlador, valor) de uma vez.
+
+        Retorna (decisões, válidas): COMMAND_ON/COMMAND_OFF/COMMAND_HOLD por leitura e se o valor está
+        na faixa de validação do controlador.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        sign = self.sign[rows]
+        # Com o sinal, "liga abaixo do limite" vira "liga acima de -limite": uma única comparação para todos os tipos
+        signed_values = values * sign
+        signed_limits = self.limit[rows] * sign
+        decisions = np.where(signed_values > signed_limits, COMMAND_ON,
+                             np.where(signed_values <= signed_limits - self.hysteresis[rows], COMMAND_OFF, COMMAND_HOLD))
+        valid = (values >= self.valid_min[rows]) & (values <= self.valid_max[rows])
+        return decisions.astype(np.int8), valid
+
+    def select_requests(self, rows, decisions, states, last_command_times, now):
+        """Separa as decisões que precisam passar por request_command das que ele só suprimiria.
+
+        Uma decisão igual ao estado atual, já enviado e sem refresh vencido, só seria contada como suprimida.
+        Retorna (decisões ajustadas, índices a enviar); HOLD sem estado vira OFF, como no caminho escalar, e HOLD
+        com refresh vencido também segue para apply, que reenvia o estado. As suprimidas entram na contagem da
+        linha (suppressed_commands).
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        states = np.asarray(states, dtype=np.int8)
+        last_command_times = np.asarray(last_command_times, dtype=np.float64)  # None -> nan (nunca enviado)
+        # Controladores com mais de uma leitura no lote: o estado muda entre elas, então todas vão a apply
+        _, inverse, counts = np.unique(rows, return_inverse=True, return_counts=True)
+        repeated = counts[inverse] > 1
+        decisions = np.where((decisions == COMMAND_HOLD) & (states == NO_STATE) & ~repeated, COMMAND_OFF, decisions)
+        refresh_due = np.isnan(last_command_times) | (now - last_command_times >= self.refresh_interval[rows])
+        active = decisions != COMMAND_HOLD
+        suppressed = active & ~repeated & (decisions == states) & ~refresh_due
+        requests = (active & ~suppressed) | ((decisions == COMMAND_HOLD) & (repeated | refresh_due))
+        # Contados aqui, por linha, em vez de uma chamada a request_command por leitura
+        np.add.at(self.suppressed, rows[suppressed], 1)
+        return decisions, np.flatnonzero(requests)
+
+
+def validate_batch(ranges, values):
+    """Valida as leituras contra as faixas (mínimo, máximo) correspondentes; retorna uma lista de booleanos."""
+    require_numpy()
+    if not values:
+        return []
+    bounds = np.asarray(ranges, dtype=np.float64).reshape(-1, 2)
+    values = np.asarray(values, dtype=np.float64)
+    return ((values >= bounds[:, 0]) & (values <= bounds[:, 1])).tolist()
+
+
+class RuleBatcher:
+    """Acumula as leituras dos controladores e as avalia em lote, a cada tick, em uma thread própria.
+
+    As leituras de todas as zonas que chegam no mesmo tick viram uma única avaliação na RuleTable; os
+    comandos decididos seguem para request_command do controlador (deduplicação, tempo mínimo e refresh
+    continuam valendo). O comando sai até tick_interval segundos depois da leitura.
+    """
+
+    def __init__(self, valid_ranges=None, tick_interval=0.05, name="RuleBatcher", metrics=None):
+        self.table = RuleTable()
+        self.valid_ranges = valid_ranges or {}  # Classe do controlador -> (mínimo, máximo) de validação
+        self.tick_interval = tick_interval
+        self.name = name
+        # Leituras do tick atual, em listas paralelas
+        self.pending_controllers = []
+        self.pending_values = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self.active = False
+
+        # Contadores expostos por stats()
+        self.ticks = 0
+        self.evaluated = 0
+        self.rejected = 0  # Leituras fora da faixa de validação (a regra é aplicada mesmo assim, como no caminho escalar)
+        self.commands = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_tick_latency = 0.0
+        self.max_tick_latency = 0.0
+        metrics = metrics or default_registry
+        self.readings_metric = metrics.counter(
+            "rule_batch_readings_total", "Leituras avaliadas em lote pela tabela de regras")
+        self.rejected_metric = metrics.counter(
+            "rule_batch_rejected_total", "Leituras avaliadas em lote fora da faixa de validação")
+        self.tick_latency = metrics.histogram(
+            "rule_batch_tick_seconds", "Avaliação das regras e envio dos comandos de um tick")
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Para a thread, avaliando as leituras que ainda estiverem pendentes."""
+        if self.active:
+            with self.condition:
+                self.active = False
+                self.condition.notify_all()
+            if self.thread and self.thread.is_alive():
+                self.thread.join()
+        self.tick()
+
+    def add(self, controller, value):
+        """Enfileira a leitura para o próximo tick; sem a thread ativa, aplica a regra escalar do controlador."""
+        if not self.active or not isinstance(value, (int, float)):
+            controller.process_sensor_data(value)
+            return
+        with self.condition:
+            self.pending_controllers.append(controller)
+            self.pending_values.append(value)
+
+    def remove(self, controller):
+        """Descarta a linha do controlador removido (após o failover)."""
+        self.table.unregister(controller)
+
+    def suppressed_commands(self, controller):
+        """Comandos do controlador descartados no lote por repetirem o estado atual."""
+        return self.table.suppressed_commands(controller)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.active:
+                    return
+                self.condition.wait(self.tick_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("%s: Erro ao avaliar as regras em lote: %s", self.name, e)
+
+    def tick(self):
+        with self.condition:
+            controllers, self.pending_controllers = self.pending_controllers, []
+            values, self.pending_values = self.pending_values, []
+        if controllers:
+            self.evaluate_batch(controllers, values)
+
+    def evaluate_batch(self, controllers, values):
+        """Avalia as leituras (controladores e valores, em listas paralelas) de uma vez e envia os comandos decididos."""
+        started = time.perf_counter()
+        row_of = self.table.rows.get
+        rows = [row_of(controller) for controller in controllers]
+        if None in rows:
+            rows = [self.table.register(controller, self.valid_ranges.get(type(controller))) if row is None else row
+                    for controller, row in zip(controllers, rows)]
+        decisions, valid = self.table.evaluate(rows, values)
+        decisions, requests = self.table.select_requests(
+            rows, decisions,
+            [STATE_CODES.get(controller.actuator_last_value, OTHER_STATE) for controller in controllers],
+            [controller.last_command_time for controller in controllers],
+            time.monotonic()
+        )
+        self.apply([controllers[i] for i in requests.tolist()], decisions[requests].tolist())
+
+        elapsed = time.perf_counter() - started
+        rejected = len(values) - int(valid.sum())
+        self.ticks += 1
+        self.evaluated += len(values)
+        self.rejected += rejected
+        self.readings_metric.inc(len(values))
+        self.rejected_metric.inc(rejected)
+        self.tick_latency.observe(elapsed)
+        self.last_batch_size = len(values)
+        self.max_batch_size = max(self.max_batch_size, len(values))
+        self.last_tick_latency = elapsed
+        self.max_tick_latency = max(self.max_tick_latency, elapsed)
+
+    def apply(self, controllers, decisions):
+        """Envia as decisões selecionadas, na ordem de chegada das leituras."""
+        for controller, decision in zip(controllers, decisions):
+            if decision == COMMAND_HOLD:
+                # Dentro da banda: define o estado inicial ou faz o refresh periódico, como o caminho escalar
+                if controller.actuator_last_value is not None:
+                    if controller.refresh_command():
+                        self.commands += 1
+                    continue
+                decision = COMMAND_OFF
+            controller.request_command(COMMANDS[decision])
+            self.commands += 1
+
+    def stats(self):
+        return {
+            "controllers": len(self.table.rows),
+            "pending": len(self.pending_values),
+            "ticks": self.ticks,
+            "evaluated": self.evaluated,
+            "rejected": self.rejected,
+            "commands": self.commands,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "last_tick_latency_ms": round(self.last_tick_latency * 1000, 3),
+            "max_tick_latency_ms": round(self.max_tick_latency * 1000, 3),
+        }
@@ -0,0 +1,30 @@
+import threading
+from collections import deque
+
+
+class EventLog:
+    """Log em memória das mudanças de sensores e atuadores, consumido por long polling a partir de um número de sequência."""
+
+    def __init__(self, capacity=1000):
+        self.events = deque(maxlen=capacity)
+        self.last_seq = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event):
+        """Adiciona um evento e acorda quem estiver aguardando."""
+        with self.condition:
+            self.last_seq += 1
+            event["seq"] = self.last_seq
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def wait_for_events(self, after_seq, timeout=25.0):
+        """Retorna (última sequência, eventos com seq > after_seq), aguardando até `timeout` se não houver novos."""
+        with self.condition:
+            if after_seq > self.last_seq:
+                # O log foi reiniciado (middleware reiniciado): recomeça do início
+                after_seq = 0
+            if self.last_seq == after_seq:
+                self.condition.wait_for(lambda: self.last_seq > after_seq, timeout)
+            events = [event for event in self.events if event["seq"] > after_seq]
+            return self.last_seq, events
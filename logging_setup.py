@@ -0,0 +1,85 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita linhas repetitivas: cada mensagem (mesmo logger, nível e texto-modelo) passa no máximo
+    `burst` vezes por janela de `interval` segundos; além disso, só 1 a cada `sample_every` (0 descarta todas).
+
+    Como as chamadas usam formatação preguiçosa (logger.warning("... %s", valor)), leituras diferentes
+    da mesma linha compartilham o texto-modelo e contam para o mesmo limite.
+    """
+
+    def __init__(self, interval=10.0, burst=5, sample_every=0):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.sample_every = sample_every
+        self.windows = {}  # (logger, nível, modelo) -> [início da janela, aceitas, suprimidas]
+        self.lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                previous = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if previous:
+                    record.msg = f"{record.msg} (+{previous} mensagem(ns) semelhante(s) suprimida(s))"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            if self.sample_every and window[2] % self.sample_every == 0:
+                return True
+            self.suppressed += 1
+            return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloqueia quem registra: com a fila cheia, a linha é descartada e contada."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level="INFO", rate_limit_interval=10.0, rate_limit_burst=5, sample_every=0, queue_size=10000):
+    """Configura o logging do processo: as threads só enfileiram os registros e uma thread escreve na saída."""
+    log_queue = queue.Queue(queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(rate_limit_interval, rate_limit_burst, sample_every))
+
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+
+    def stop_listener():
+        # Escreve o que restar na fila ao encerrar (ignora se já foi parado)
+        try:
+            listener.stop()
+        except AttributeError:
+            pass
+    atexit.register(stop_listener)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    return listener
@@ -0,0 +1,188 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class ShardedMetric:
+    """Base dos contadores e histogramas: cada thread escreve no seu próprio shard, sem lock no caminho quente.
+
+    O lock só é usado quando uma thread registra seu shard pela primeira vez e na leitura (snapshot).
+    """
+
+    def __init__(self, name, labels, size):
+        self.name = name
+        self.labels = labels
+        self.size = size
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = [0] * self.size
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def merged(self):
+        with self.lock:
+            shards = list(self.shards)
+        return [sum(values) for values in zip(*shards)] if shards else [0] * self.size
+
+
+class Counter(ShardedMetric):
+    def __init__(self, name, labels):
+        super().__init__(name, labels, 1)
+
+    def inc(self, amount=1):
+        self.shard()[0] += amount
+
+    def value(self):
+        return self.merged()[0]
+
+
+class Histogram(ShardedMetric):
+    def __init__(self, name, labels, buckets=DEFAULT_BUCKETS):
+        # Um contador por bucket, mais o bucket +Inf e a soma dos valores
+        super().__init__(name, labels, len(buckets) + 2)
+        self.buckets = buckets
+
+    def observe(self, value):
+        shard = self.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        return Timer(self)
+
+    def snapshot(self):
+        merged = self.merged()
+        counts, total = merged[:-1], merged[-1]
+        count = sum(counts)
+        return {
+            "count": count,
+            "sum": total,
+            "avg_ms": round(total / count * 1000, 3) if count else None,
+            "p50_ms": self.estimate(counts, count, 0.50),
+            "p99_ms": self.estimate(counts, count, 0.99),
+            "buckets": counts,
+        }
+
+    def estimate(self, counts, count, fraction):
+        """Percentil estimado pelo limite superior do bucket que o contém (em ms)."""
+        if not count:
+            return None
+        target, cumulative = count * fraction, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound * 1000
+        return float("inf")
+
+
+class Timer:
+    """Mede a duração de um bloco `with` e a registra no histograma."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """Registro de contadores e histogramas, identificados por nome e rótulos (ex.: controller)."""
+
+    def __init__(self):
+        self.metrics = {}  # (nome, rótulos) -> métrica
+        self.descriptions = {}  # nome -> (tipo, descrição)
+        self.lock = threading.Lock()
+
+    def get(self, metric_class, kind, name, description, labels, **options):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = metric_class(name, dict(labels), **options)
+                    self.descriptions.setdefault(name, (kind, description))
+        return metric
+
+    def counter(self, name, description="", **labels):
+        return self.get(Counter, "counter", name, description, labels)
+
+    def histogram(self, name, description="", buckets=DEFAULT_BUCKETS, **labels):
+        return self.get(Histogram, "histogram", name, description, labels, buckets=buckets)
+
+    def snapshot(self):
+        """Valores atuais agrupados por nome da métrica."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        result = {}
+        for metric in metrics:
+            kind, description = self.descriptions[metric.name]
+            entry = result.setdefault(metric.name, {"type": kind, "description": description, "series": []})
+            value = metric.value() if kind == "counter" else metric.snapshot()
+            entry["series"].append({"labels": metric.labels, "value": value})
+        return result
+
+    def export(self, **extra_labels):
+        """Valores brutos de todas as séries, serializáveis, para combinar registros de outros processos.
+
+        Cada série é (nome, tipo, descrição, rótulos, buckets, valores); extra_labels é somado aos rótulos.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        series = []
+        for metric in metrics:
+            kind, description = self.descriptions[metric.name]
+            buckets = metric.buckets if kind == "histogram" else None
+            series.append((metric.name, kind, description, {**metric.labels, **extra_labels}, buckets, metric.merged()))
+        return series
+
+    def render_prometheus(self, extra_series=()):
+        """Formato de exposição em texto do Prometheus (incluindo séries exportadas por outros registros)."""
+        series = sorted(self.export() + list(extra_series), key=lambda s: s[0])
+        lines = []
+        current = None
+        for name, kind, description, labels, buckets, merged in series:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                lines.append(f"{name}{format_labels(labels)} {merged[0]}")
+                continue
+            cumulative = 0
+            for bound, count in zip(tuple(buckets) + (float("inf"),), merged[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{format_labels(labels, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {merged[-1]}")
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels, **extra):
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in items.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(items, escaped)) + "}"
+
+
+# Registro padrão do processo, usado quando nenhum é injetado
+registry = MetricsRegistry()
@@ -1,205 +1,656 @@
-from datetime import datetime
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+import functools
+import json
+import os
+import threading
+import time
 import pymongo
 import rpyc
 from rpyc import ThreadPoolServer
 from controllers.irrigation_controller import IrrigationController
 from controllers.lighting_controller import LightingController
 from controllers.cooling_controller import CoolingController
+from controllers.controller_base import DEFAULT_ZONE
+from controllers.history_export import DEFAULT_CHUNK_SIZE, decode_resume_token, iterate_pages, normalize_fields
+from controllers.mongo_pool import AsyncMongoManager, MongoClientManager
+from controllers.rule_table import RuleBatcher, validate_batch
+from transport.async_mqtt_transport import AsyncMqttTransport
+from transport.mqtt_transport import MqttTransport
+from async_engine import AsyncEngine
+from supervisor import HeartbeatSupervisor
+from event_log import EventLog
+from metrics import registry as default_registry
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
 
 class Middleware:
+    # Período exibido por padrão para cada tamanho de bucket do histórico agregado
+    AGGREGATED_HISTORY_RANGES = {
+        "1m": timedelta(hours=1),
+        "1h": timedelta(days=1),
+        "1d": timedelta(days=30)
+    }
+
+    # Classe de cada tipo de controlador, criado em todas as zonas
+    CONTROLLER_CLASSES = {
+        "irrigation": IrrigationController,
+        "cooling": CoolingController,
+        "lighting": LightingController
+    }
+
+    # Tipo de cada classe de controlador, usado nos eventos ao vivo
+    CONTROLLER_TYPES = {controller_class: controller_type for controller_type, controller_class in CONTROLLER_CLASSES.items()}
+
+    # Chave do sensor exibido na página de cada controlador
+    CONTROLLER_SENSORS = {
+        "irrigation": "soil_moisture",
+        "lighting": "luminosity",
+        "cooling": "temperature"
+    }
+
+    # Nome do sensor usado pelo controle manual -> tipo de controlador
+    SENSOR_CONTROLS = {
+        "soil-moisture": "irrigation",
+        "temperature": "cooling",
+        "lighting": "lighting",
+        "luminosity": "lighting"
+    }
+
     VALIDATION_LIMITS = {
         "soil_moisture": (10, 60),  # Intervalo esperado para umidade do solo
         "luminosity": (100, 10000),   # Intervalo esperado para luminosidade
         "temperature": (15, 35)    # Intervalo esperado para temperatura
     }
 
-    def __init__(self):
-        # Inicializando os controladores e as réplicas
-        self.irrigation_controllers = []
-        self.cooling_controllers = []
-        self.lighting_controllers = []
+    def __init__(self, controller_options=None, hot_standby=False, supervisor_options=None, zones=None, replicas=3,
+                 recover_state=False, rule_batch_interval=None):
+        # Opções repassadas a todos os controladores (fila de ingestão, escrita em lote, layout do MongoDB...)
+        self.controller_options = controller_options or {}
+        # Registro de métricas compartilhado com os controladores (o padrão do processo, se não injetado)
+        self.metrics = self.controller_options.get("metrics") or default_registry
+
+        # Com rule_batch_interval (s), as leituras de todas as zonas são avaliadas em lote a cada tick (RuleTable)
+        self.rule_batcher = None
+        if rule_batch_interval is not None:
+            valid_ranges = {
+                controller_class: self.VALIDATION_LIMITS[self.CONTROLLER_SENSORS[controller_type]]
+                for controller_type, controller_class in self.CONTROLLER_CLASSES.items()
+            }
+            self.rule_batcher = RuleBatcher(valid_ranges, rule_batch_interval, metrics=self.metrics)
+            self.controller_options = {**self.controller_options, "rule_batcher": self.rule_batcher}
 
-        # Criando 1 primario e 2 réplicas para cada controlador
-        self.create_replicas(IrrigationController, self.irrigation_controllers, 3)
-        self.create_replicas(CoolingController, self.cooling_controllers, 3)
-        self.create_replicas(LightingController, self.lighting_controllers, 3)
+        # Com hot standby as réplicas acompanham o primário e a promoção é só uma troca de papel
+        self.hot_standby = hot_standby
+        self.failover_history = deque(maxlen=100)
+        self.failover_lock = threading.RLock()
 
-        # Inicia todos os controladores
-        self.start_all_controllers()
+        # Mudanças de sensores/atuadores para os clientes (atualizações ao vivo)
+        self.events = EventLog()
 
-    def validate_sensor_data(self, sensor_type, value):
+        # Registro dos controladores por (zona, tipo): lista com o principal seguido das réplicas.
+        # self.zones indexa os mesmos grupos por zona, para as consultas em lote filtradas
+        self.controllers = {}
+        self.zones = {}
+        for zone in zones or [DEFAULT_ZONE]:
+            for controller_type, controller_class in self.CONTROLLER_CLASSES.items():
+                controllers = []
+                # 1 primário e `replicas - 1` réplicas para cada controlador
+                self.create_replicas(controller_class, controllers, replicas, zone)
+                self.controllers[(zone, controller_type)] = controllers
+                self.zones.setdefault(zone, {})[controller_type] = controllers
+
+        # Inicia todos os controladores (recuperando o estado do MongoDB quando substituem outro processo)
+        if self.rule_batcher is not None:
+            self.rule_batcher.start()
+        self.start_all_controllers(recover_state)
+
+        # Detecção automática de falhas (opções: check_interval, message_timeout, queue_stall_timeout, confirmations)
+        self.supervisor = None
+        if supervisor_options is not None:
+            self.supervisor = HeartbeatSupervisor(self.handle_controller_failure, **supervisor_options)
+            for (zone, controller_type), controllers in self.controllers.items():
+                self.supervisor.watch(self.group_key(zone, controller_type), controllers)
+            self.supervisor.start()
+
+    @staticmethod
+    def group_key(zone, controller_type):
+        """Identificador do grupo nas métricas: o tipo na zona padrão, "zona/tipo" nas demais."""
+        return controller_type if zone == DEFAULT_ZONE else f"{zone}/{controller_type}"
+
+    def get_controllers(self, controller_type, zone=DEFAULT_ZONE):
+        """Retorna a lista (principal e réplicas) do grupo, ou None se não existir."""
+        return self.controllers.get((zone, controller_type))
+
+    def get_primary(self, controller_type, zone=DEFAULT_ZONE):
+        controllers = self.controllers.get((zone, controller_type))
+        return controllers[0] if controllers else None
+
+    def select_groups(self, zones=None, controller_types=None):
+        """Percorre os grupos (zona, tipo, controladores) das zonas e tipos pedidos (None = todos)."""
+        selected_zones = self.zones if zones is None else [zone for zone in zones if zone in self.zones]
+        for zone in selected_zones:
+            groups = self.zones[zone]
+            types = groups if controller_types is None else [t for t in controller_types if t in groups]
+            for controller_type in types:
+                yield zone, controller_type, groups[controller_type]
+
+    @classmethod
+    def validate_sensor_data(cls, sensor_type, value):
         """Valida os dados do sensor para verificar se estão dentro dos limites aceitáveis."""
-        if sensor_type in self.VALIDATION_LIMITS:
-            min_val, max_val = self.VALIDATION_LIMITS[sensor_type]
+        if sensor_type in cls.VALIDATION_LIMITS and isinstance(value, (int, float)):
+            min_val, max_val = cls.VALIDATION_LIMITS[sensor_type]
             if min_val <= value <= max_val:
                 return True
-            print(f"[VALIDAÇÃO] {sensor_type} com valor inválido: {value}")
+            logger.warning("[VALIDAÇÃO] %s com valor inválido: %s", sensor_type, value)
         return False
 
-    def create_replicas(self, controller_class, controller_list, num_replicas):
+    @classmethod
+    def validate_sensor_data_batch(cls, sensor_types, values):
+        """Mesma validação de validate_sensor_data para várias leituras, com uma comparação vetorizada (NumPy)."""
+        valid = [False] * len(values)
+        numeric = [i for i, (sensor_type, value) in enumerate(zip(sensor_types, values))
+                   if sensor_type in cls.VALIDATION_LIMITS and isinstance(value, (int, float))]
+        results = validate_batch([cls.VALIDATION_LIMITS[sensor_types[i]] for i in numeric], [values[i] for i in numeric])
+        for i, result in zip(numeric, results):
+            valid[i] = result
+            if not result:
+                logger.warning("[VALIDAÇÃO] %s com valor inválido: %s", sensor_types[i], values[i])
+        return valid
+
+    def create_replicas(self, controller_class, controller_list, num_replicas, zone=DEFAULT_ZONE):
         """Cria as réplicas dos controladores e as adiciona à lista."""
         for i in range(num_replicas):
             role = "Primary" if i == 0 else f"Replica{i}"
-            controller_instance = controller_class(role=role)  # Passe o papel para o controlador
+            controller_instance = controller_class(role=role, zone=zone, **self.controller_options)  # Passe o papel para o controlador
+            controller_instance.add_listener(self.publish_controller_event)
             controller_list.append(controller_instance)
-            print(f"{controller_instance.name} criado e adicionado à lista.")
+            logger.info("%s criado e adicionado à lista.", controller_instance.name)
 
-    
-    def get_controllers_and_replicas(self):
+    def publish_controller_event(self, controller, data_type, value, timestamp):
+        """Publica no log de eventos uma leitura válida do sensor ou um comando do atuador."""
+        controller_type = self.CONTROLLER_TYPES.get(type(controller))
+        if data_type == "sensor":
+            sensor_type = self.CONTROLLER_SENSORS.get(controller_type)
+            if not self.validate_sensor_data(sensor_type, value):
+                return
+        self.events.publish({
+            "zone": controller.zone,
+            "controller": controller_type,
+            "data_type": data_type,
+            "value": value,
+            "timestamp": timestamp.isoformat()
+        })
+
+    def wait_for_events(self, after_seq, timeout=25.0):
+        """Aguarda eventos posteriores a after_seq (long polling)."""
+        last_seq, events = self.events.wait_for_events(after_seq, timeout)
+        return {"seq": last_seq, "events": events}
+
+    def get_zones(self):
+        """Retorna as zonas e os tipos de controlador de cada uma."""
+        return {zone: list(groups) for zone, groups in self.zones.items()}
+
+    def get_controllers_and_replicas(self, zone=DEFAULT_ZONE):
         """Retorna uma lista de controladores e suas réplicas."""
-        controllers_info = {
-            "irrigation": [{"name": ctrl.name, "role": ctrl.role} for ctrl in self.irrigation_controllers],
-            "cooling": [{"name": ctrl.name, "role": ctrl.role} for ctrl in self.cooling_controllers],
-            "lighting": [{"name": ctrl.name, "role": ctrl.role} for ctrl in self.lighting_controllers]
+        return {
+            controller_type: [{"name": ctrl.name, "role": ctrl.role} for ctrl in controllers]
+            for controller_type, controllers in self.zones.get(zone, {}).items()
         }
-        return controllers_info
-    
-    def start_all_controllers(self):
+
+    def get_controller_stats(self):
+        """Retorna as métricas internas dos controladores principais."""
+        return {
+            self.group_key(zone, controller_type): controllers[0].get_stats()
+            for zone, controller_type, controllers in self.select_groups()
+        }
+
+    def start_all_controllers(self, recover_state=False):
         """Inicia os controladores principais (e sensores/atuadores)."""
-        print("Iniciando todos os controladores...")
-        self.irrigation_controllers[0].start()
-        self.cooling_controllers[0].start()
-        self.lighting_controllers[0].start()
+        logger.info("Iniciando todos os controladores...")
+        for controllers in self.controllers.values():
+            if recover_state:
+                controllers[0].recover_state_from_db()
+                controllers[0].warm_history_from_db()
+            controllers[0].start()
 
         # Liga sensores/atuadores
-        self.irrigation_controllers[0].control_sensor("on")
-        self.irrigation_controllers[0].control_actuator("on")
-        self.cooling_controllers[0].control_sensor("on")
-        self.cooling_controllers[0].control_actuator("on")
-        self.lighting_controllers[0].control_sensor("on")
-        self.lighting_controllers[0].control_actuator("on")
+        for controllers in self.controllers.values():
+            controllers[0].control_sensor("on")
+            controllers[0].control_actuator("on")
+
+        if self.hot_standby:
+            for controllers in self.controllers.values():
+                for replica in controllers[1:]:
+                    replica.start_standby()
+
+    def stop_all_controllers(self):
+        """Para o supervisor, os sensores e os controladores (gravando os dados pendentes no MongoDB)."""
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        for controllers in self.controllers.values():
+            controllers[0].control_sensor("off")
+            controllers[0].stop()
+            for replica in controllers[1:]:
+                if replica.standby:
+                    replica.stop()
+        # Avalia as leituras do último tick antes de encerrar
+        if self.rule_batcher is not None:
+            self.rule_batcher.stop()
+
+    def handle_controller_failure(self, controller_type, controllers, reason):
+        """Chamado pelo supervisor quando a falha de um controlador principal é confirmada."""
+        logger.error("[FAILOVER] Falha detectada automaticamente no controlador %s: %s", controller_type, reason)
+        self.activate_next_controller(controllers)
 
     def activate_next_controller(self, controllers):
         """Promove a próxima réplica como o controlador principal."""
-        if len(controllers) > 1:
-            controllers[0].stop()
-            failed_controller = controllers.pop(0)  # Remove o controlador principal falho
-            new_primary = controllers[0]  # Próximo na lista se torna o principal
-            print(f"[FAILOVER] {failed_controller.name} falhou. Promovendo {new_primary.name} como novo principal.")
-            new_primary.recover_state_from_db()
-            new_primary.start()  # Inicia o controlador
-            new_primary.control_sensor("on")  # Liga o sensor
-            new_primary.control_actuator("on")  # Liga o atuador
-            self.add_new_replica(type(new_primary), controllers)
-        else:
-            print("[ERRO] Não há réplicas disponíveis para ativar.")
+        with self.failover_lock:  # Failover manual e automático não podem se sobrepor
+            if len(controllers) > 1:
+                failover_start = time.perf_counter()
+                # Desliga o sensor e o atuador do primário falho, senão o sensor continua publicando ao lado do novo
+                for control in (controllers[0].control_sensor, controllers[0].control_actuator):
+                    try:
+                        control("off")
+                    except Exception as e:
+                        logger.error("[FAILOVER] Erro ao desligar %s: %s", controllers[0].name, e)
+                controllers[0].stop()
+                failed_controller = controllers.pop(0)  # Remove o controlador principal falho
+                failed_controller.close()  # Libera a conexão do controlador descartado
+                new_primary = controllers[0]  # Próximo na lista se torna o principal
+                logger.warning("[FAILOVER] %s falhou. Promovendo %s como novo principal.", failed_controller.name, new_primary.name)
+                promotion_start = time.perf_counter()
+                if new_primary.standby:
+                    mode = "hot"
+                    new_primary.promote()  # Estado já está em memória: só troca o papel
+                else:
+                    mode = "cold"
+                    new_primary.recover_state_from_db()
+                    new_primary.warm_history_from_db()
+                    new_primary.start()  # Inicia o controlador
+                new_primary.control_sensor("on")  # Liga o sensor
+                new_primary.control_actuator("on")  # Liga o atuador
+                failover_end = time.perf_counter()
+
+                self.record_failover(failed_controller, new_primary, mode,
+                                     total=failover_end - failover_start, promotion=failover_end - promotion_start)
+                self.add_new_replica(type(new_primary), controllers)
+            else:
+                logger.error("[ERRO] Não há réplicas disponíveis para ativar.")
 
     def add_new_replica(self, controller_class, controllers):
         """Adiciona uma nova réplica à lista de controladores."""
-        controller_instance = controller_class()
+        controller_instance = controller_class(zone=controllers[0].zone, **self.controller_options)
+        controller_instance.add_listener(self.publish_controller_event)
         controllers.append(controller_instance)  # Adiciona à lista de réplicas
-        print(f"[NOVO CONTROLADOR] Réplica {controller_instance.name} adicionada à lista de controladores.")
+        if self.hot_standby:
+            controller_instance.start_standby()
+        logger.info("[NOVO CONTROLADOR] Réplica %s adicionada à lista de controladores.", controller_instance.name)
+
+    def record_failover(self, failed_controller, new_primary, mode, total, promotion):
+        """Registra a duração de um failover."""
+        event = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "failed": failed_controller.name,
+            "promoted": new_primary.name,
+            "mode": mode,
+            "total_ms": round(total * 1000, 3),  # Inclui a parada do primário falho
+            "promotion_ms": round(promotion * 1000, 3)  # Até a réplica estar atendendo
+        }
+        self.failover_history.append(event)
+        logger.info("[FAILOVER] %s promovido (%s) em %s ms (total %s ms).",
+                    new_primary.name, mode, event["promotion_ms"], event["total_ms"])
+
+    def get_failover_stats(self):
+        """Retorna as durações dos failovers recentes."""
+        history = list(self.failover_history)
+        promotions = [event["promotion_ms"] for event in history]
+        return {
+            "hot_standby": self.hot_standby,
+            "count": len(history),
+            "last": history[-1] if history else None,
+            "avg_promotion_ms": round(sum(promotions) / len(promotions), 3) if promotions else None,
+            "max_promotion_ms": max(promotions) if promotions else None,
+            "history": history
+        }
+
+    def get_metrics(self):
+        """Retorna contadores e histogramas de latência do caminho quente, por controlador e por chamada RPC."""
+        return self.metrics.snapshot()
 
-    def simulate_failover(self, controllers):
+    def render_metrics(self):
+        """Retorna as métricas no formato de texto do Prometheus."""
+        return self.metrics.render_prometheus()
+
+    def export_metrics(self, **labels):
+        """Séries brutas das métricas, para o processo principal combinar as de vários shards."""
+        return self.metrics.export(**labels)
+
+    def get_shard_stats(self):
+        """Sem shards: todos os controladores rodam neste processo."""
+        return {}
+
+    def get_supervisor_stats(self):
+        """Retorna as métricas de detecção de falhas (latência de detecção, falsos positivos...)."""
+        if self.supervisor is None:
+            return {}
+        return self.supervisor.get_stats()
+
+    def simulate_failover(self, controller_type, zone=DEFAULT_ZONE):
         """Força a troca do controlador principal."""
-        print("[SIMULAÇÃO] Simulando falha do controlador principal...")
+        controllers = self.get_controllers(controller_type, zone)
+        if controllers is None:
+            logger.error("[ERRO] Tipo de controlador inválido para simular failover: %s (zona %s).", controller_type, zone)
+            return
+        logger.info("[SIMULAÇÃO] Simulando falha do controlador principal...")
         self.activate_next_controller(controllers)
 
-    def get_sensor_data(self):
+    def get_sensor_data(self, zone=DEFAULT_ZONE):
         """Retorna os dados atuais dos sensores após validação."""
-        sensor_data = {
-            "soil_moisture": self.irrigation_controllers[0].get_sensor_last_value(),
-            "luminosity": self.lighting_controllers[0].get_sensor_last_value(),
-            "temperature": self.cooling_controllers[0].get_sensor_last_value()
-        }
+        return self.get_sensor_data_bulk([zone]).get(zone, {})
 
-        # Valida os dados dos sensores
-        validated_data = {}
-        for sensor_type, value in sensor_data.items():
-            if self.validate_sensor_data(sensor_type, value):
-                validated_data[sensor_type] = value
+    def get_sensor_data_bulk(self, zones=None, controller_types=None):
+        """Retorna, em uma única consulta, os dados validados dos sensores por zona (filtros opcionais)."""
+        sensor_data = {}
+        readings = []
+        for zone, controller_type, controllers in self.select_groups(zones, controller_types):
+            sensor_data.setdefault(zone, {})
+            value = controllers[0].get_sensor_last_value()
+            if value is not None:  # Sem leituras ainda
+                readings.append((zone, self.CONTROLLER_SENSORS[controller_type], value))
+        # Valida os dados dos sensores (em lote com a avaliação vetorizada ligada)
+        sensor_types = [sensor_type for _, sensor_type, _ in readings]
+        values = [value for _, _, value in readings]
+        if self.rule_batcher is not None:
+            valid = self.validate_sensor_data_batch(sensor_types, values)
+        else:
+            valid = [self.validate_sensor_data(sensor_type, value) for sensor_type, value in zip(sensor_types, values)]
+        for (zone, sensor_type, value), is_valid in zip(readings, valid):
+            if is_valid:
+                sensor_data[zone][sensor_type] = value
             else:
-                print(f"[ALERTA] Dado inválido ignorado: {sensor_type}={value}")
-        
-        return validated_data
+                logger.warning("[ALERTA] Dado inválido ignorado: %s=%s", sensor_type, value)
+        return sensor_data
 
-    def get_actuator_data(self):
+    def get_actuator_data(self, zone=DEFAULT_ZONE):
         """Retorna os dados atuais dos atuadores."""
-        return {
-            "irrigation": str(self.irrigation_controllers[0].get_actuator_last_value()),
-            "lighting": str(self.lighting_controllers[0].get_actuator_last_value()),
-            "cooling": str(self.cooling_controllers[0].get_actuator_last_value())
-        }
+        return self.get_actuator_data_bulk([zone]).get(zone, {})
+
+    def get_actuator_data_bulk(self, zones=None, controller_types=None):
+        """Retorna, em uma única consulta, o estado dos atuadores por zona (filtros opcionais)."""
+        actuator_data = {}
+        for zone, controller_type, controllers in self.select_groups(zones, controller_types):
+            actuator_data.setdefault(zone, {})[controller_type] = str(controllers[0].get_actuator_last_value())
+        return actuator_data
 
-    def control_actuators(self, actuator_type, action):
+    def control_actuators(self, actuator_type, action, zone=DEFAULT_ZONE):
         """Encaminha o comando de controle para os atuadores."""
-        if actuator_type == "irrigation":
-            self.irrigation_controllers[0].control_actuator(action)
-        elif actuator_type == "lighting":
-            self.lighting_controllers[0].control_actuator(action)
-        elif actuator_type == "cooling":
-            self.cooling_controllers[0].control_actuator(action)
-        else:
-            print(f"Ação inválida para o atuador: {actuator_type}")
+        controller = self.get_primary(actuator_type, zone)
+        if controller is None:
+            logger.warning("Ação inválida para o atuador: %s", actuator_type)
+            return
+        controller.control_actuator(action)
 
-    def control_sensors(self, sensor_type, action):
+    def control_sensors(self, sensor_type, action, zone=DEFAULT_ZONE):
         """Encaminha o comando de controle para os sensores."""
-        if sensor_type == "soil-moisture":
-            self.irrigation_controllers[0].control_sensor(action)
-        elif sensor_type == "lighting":
-            self.lighting_controllers[0].control_sensor(action)
-        elif sensor_type == "temperature":
-            self.cooling_controllers[0].control_sensor(action)
-        else:
-            print(f"Ação inválida para o sensor: {sensor_type}")
+        controller = self.get_primary(self.SENSOR_CONTROLS.get(sensor_type), zone)
+        if controller is None:
+            logger.warning("Ação inválida para o sensor: %s", sensor_type)
+            return
+        controller.control_sensor(action)
 
-    def get_historical_sensor_data(self, controller_name):
+    def get_historical_sensor_data(self, controller_name, zone=DEFAULT_ZONE):
         """Retorna os dados históricos do sensor de um controlador específico."""
-        if controller_name == "irrigation":
-            return self.irrigation_controllers[0].get_historical_sensor_data()
-        elif controller_name == "lighting":
-            return self.lighting_controllers[0].get_historical_sensor_data()
-        elif controller_name == "cooling":
-            return self.cooling_controllers[0].get_historical_sensor_data()
-        else:
+        controller = self.get_primary(controller_name, zone)
+        return controller.get_historical_sensor_data() if controller is not None else []
+
+    def get_controller_snapshot(self, controller_id, bucket="1m", zone=DEFAULT_ZONE):
+        """Retorna, em uma única estrutura, sensor, atuador e históricos do controlador."""
+        if self.get_primary(controller_id, zone) is None:
+            return {}
+        sensors_data = self.get_sensor_data_bulk([zone], [controller_id]).get(zone, {})
+        actuators_status = self.get_actuator_data_bulk([zone], [controller_id]).get(zone, {})
+        return {
+            "zone": zone,
+            "controller": controller_id,
+            "sensors": sensors_data,
+            "actuators": actuators_status,
+            "historical_data": self.get_historical_sensor_data(controller_id, zone),
+            "aggregated_data": self.get_aggregated_history(controller_id, bucket=bucket, zone=zone),
+            "bucket": bucket
+        }
+
+    def get_aggregated_history(self, controller_name, start=None, end=None, bucket="1m", zone=DEFAULT_ZONE):
+        """Retorna o histórico agregado (min/max/avg/count por bucket) de um controlador no intervalo pedido."""
+        controller = self.get_primary(controller_name, zone)
+        if controller is None or bucket not in self.AGGREGATED_HISTORY_RANGES:
             return []
 
+        # Datas em ISO 8601 (UTC); sem intervalo, usa o período padrão do bucket até agora
+        end = datetime.fromisoformat(end) if isinstance(end, str) else (end or datetime.utcnow())
+        start = datetime.fromisoformat(start) if isinstance(start, str) else (start or end - self.AGGREGATED_HISTORY_RANGES[bucket])
+        return controller.get_aggregated_history(start, end, bucket)
+
+    def get_history_page(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        """Uma página do histórico do sensor em [start, end) (ISO 8601), com os campos pedidos e o token da próxima."""
+        fields = normalize_fields(fields)
+        controller = self.get_primary(controller_name, zone)
+        if controller is None:
+            return {"fields": fields, "data": [], "resume_token": None}
+        start = datetime.fromisoformat(start) if isinstance(start, str) else start
+        end = datetime.fromisoformat(end) if isinstance(end, str) else end
+        data, next_token = controller.get_history_page(start, end, fields, resume_token, chunk_size)
+        return {"fields": fields, "data": data, "resume_token": next_token}
+
+    def export_history(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        """Gerador das páginas do histórico do sensor, uma consulta por página (memória constante)."""
+        # Valida os parâmetros já na chamada, e não só ao pedir a primeira página
+        fields = normalize_fields(fields)
+        if resume_token is not None:
+            decode_resume_token(resume_token)
+        return iterate_pages(lambda token: self.get_history_page(controller_name, start, end, fields, token,
+                                                                 chunk_size, zone), resume_token)
+
+def rpc_fields(fields):
+    """Copia por valor a lista de campos recebida pelo RPyC (ou mantém "a,b" e None)."""
+    return fields if fields is None or isinstance(fields, str) else list(fields)
+
+
+def timed_rpc(name, method):
+    """Envolve um método exposed_* registrando a latência e os erros da chamada."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.middleware.metrics
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            metrics.counter("rpc_errors_total", "Chamadas RPC que terminaram com erro", method=name).inc()
+            raise
+        finally:
+            metrics.histogram("rpc_call_seconds", "Duração das chamadas RPC", method=name).observe(
+                time.perf_counter() - started)
+    return wrapper
+
+
+def instrument_rpc(service_class):
+    """Instrumenta todos os métodos exposed_* do serviço."""
+    for name, method in list(vars(service_class).items()):
+        if name.startswith("exposed_") and callable(method):
+            setattr(service_class, name, timed_rpc(name[len("exposed_"):], method))
+    return service_class
+
+
+@instrument_rpc
 class MiddlewareService(rpyc.Service):
     def __init__(self, middleware):
         self.middleware = middleware
 
     def on_connect(self, conn):
-        print("Cliente conectado")
+        logger.info("Cliente conectado")
 
     def on_disconnect(self, conn):
-        print("Cliente desconectado")
+        logger.info("Cliente desconectado")
+
+    def exposed_get_zones(self):
+        return self.middleware.get_zones()
+
+    def exposed_get_sensor_data(self, zone=DEFAULT_ZONE):
+        return self.middleware.get_sensor_data(zone)
+
+    def exposed_get_actuator_data(self, zone=DEFAULT_ZONE):
+        return self.middleware.get_actuator_data(zone)
 
-    def exposed_get_sensor_data(self):
-        return self.middleware.get_sensor_data()
+    def exposed_get_sensor_data_bulk(self, zones=None, controller_types=None):
+        """Dados dos sensores de várias zonas em uma chamada, serializados em JSON (bytes)."""
+        sensor_data = self.middleware.get_sensor_data_bulk(
+            list(zones) if zones is not None else None,
+            list(controller_types) if controller_types is not None else None
+        )
+        return json.dumps(sensor_data, default=str).encode()
 
-    def exposed_get_actuator_data(self):
-        return self.middleware.get_actuator_data()
+    def exposed_get_actuator_data_bulk(self, zones=None, controller_types=None):
+        """Estado dos atuadores de várias zonas em uma chamada, serializado em JSON (bytes)."""
+        actuator_data = self.middleware.get_actuator_data_bulk(
+            list(zones) if zones is not None else None,
+            list(controller_types) if controller_types is not None else None
+        )
+        return json.dumps(actuator_data, default=str).encode()
 
-    def exposed_control_actuators(self, actuator_type, action):
-        self.middleware.control_actuators(actuator_type, action)
+    def exposed_control_actuators(self, actuator_type, action, zone=DEFAULT_ZONE):
+        self.middleware.control_actuators(actuator_type, action, zone)
 
-    def exposed_control_sensors(self, sensor_type, action):
-        self.middleware.control_sensors(sensor_type, action)
+    def exposed_control_sensors(self, sensor_type, action, zone=DEFAULT_ZONE):
+        self.middleware.control_sensors(sensor_type, action, zone)
 
-    def exposed_simulate_failover(self, controller_type):
+    def exposed_simulate_failover(self, controller_type, zone=DEFAULT_ZONE):
         """Simula o failover forçando a troca do controlador principal."""
-        if controller_type == "irrigation":
-            self.middleware.simulate_failover(self.middleware.irrigation_controllers)
-        elif controller_type == "cooling":
-            self.middleware.simulate_failover(self.middleware.cooling_controllers)
-        elif controller_type == "lighting":
-            self.middleware.simulate_failover(self.middleware.lighting_controllers)
-        else:
-            print("[ERRO] Tipo de controlador inválido para simular failover.")
+        self.middleware.simulate_failover(controller_type, zone)
 
-    def exposed_get_historical_sensor_data(self, controller_name):
-        return self.middleware.get_historical_sensor_data(controller_name)
+    def exposed_get_historical_sensor_data(self, controller_name, zone=DEFAULT_ZONE):
+        return self.middleware.get_historical_sensor_data(controller_name, zone)
     
-    def exposed_get_controllers_and_replicas(self):
-        return self.middleware.get_controllers_and_replicas()
+    def exposed_get_aggregated_history(self, controller_name, start=None, end=None, bucket="1m", zone=DEFAULT_ZONE):
+        return self.middleware.get_aggregated_history(controller_name, start, end, bucket, zone)
+
+    def exposed_get_history_page(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                                 chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        """Uma página da exportação do histórico serializada em JSON (bytes); retome pelo resume_token."""
+        page = self.middleware.get_history_page(controller_name, start, end, rpc_fields(fields),
+                                                resume_token, chunk_size, zone)
+        return json.dumps(page, default=str).encode()
+
+    def exposed_export_history(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                               chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        """Iterador das páginas do histórico, cada uma em JSON (bytes): o cliente percorre a exportação inteira
+        pedindo uma página por vez, sem que o middleware ou o cliente montem a lista completa."""
+        pages = self.middleware.export_history(controller_name, start, end, rpc_fields(fields),
+                                               resume_token, chunk_size, zone)
+        return (json.dumps(page, default=str).encode() for page in pages)
+
+    def exposed_get_controller_snapshot(self, controller_id, bucket="1m", zone=DEFAULT_ZONE):
+        """Retorna o snapshot do controlador serializado em JSON (bytes), trafegando por valor e não como netref."""
+        snapshot = self.middleware.get_controller_snapshot(controller_id, bucket, zone)
+        return json.dumps(snapshot, default=str).encode()
+
+    def exposed_wait_for_events(self, after_seq=0, timeout=25.0):
+        """Long polling de eventos ao vivo, serializado em JSON (bytes)."""
+        return json.dumps(self.middleware.wait_for_events(after_seq, timeout), default=str).encode()
+
+    def exposed_get_controllers_and_replicas(self, zone=DEFAULT_ZONE):
+        """Retorna os controladores e réplicas da zona serializados em JSON (bytes), por valor e não como netref."""
+        return json.dumps(self.middleware.get_controllers_and_replicas(zone)).encode()
+
+    def exposed_get_controller_stats(self):
+        return self.middleware.get_controller_stats()
+
+    def exposed_get_failover_stats(self):
+        return self.middleware.get_failover_stats()
+
+    def exposed_get_supervisor_stats(self):
+        return self.middleware.get_supervisor_stats()
+
+    def exposed_get_shard_stats(self):
+        return self.middleware.get_shard_stats()
+
+    def exposed_get_metrics(self, fmt="json"):
+        """Métricas serializadas em JSON (bytes) ou, com fmt="prometheus", no formato de texto do Prometheus."""
+        if fmt == "prometheus":
+            return self.middleware.render_metrics().encode()
+        return json.dumps(self.middleware.get_metrics(), default=str).encode()
+
+def build_controller_options(client_id="Middleware"):
+    """Opções dos controladores a partir das variáveis de ambiente (uma conexão MQTT/MongoDB por processo)."""
+    # MONGO_URI e MONGO_MAX_POOL_SIZE configuram o cliente MongoDB compartilhado pelos controladores
+    mongo_uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+    mongo_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+    broker = os.environ.get("MQTT_BROKER", "localhost")
+    port = int(os.environ.get("MQTT_PORT", 1883))
+    # ENGINE=asyncio executa transporte, filas, escrita em lote e sensores em um único loop asyncio
+    # (aiomqtt e, se instalado, motor), em vez de threads por dispositivo
+    engine = None
+    if os.environ.get("ENGINE", "threads") == "asyncio":
+        engine = AsyncEngine().start()
+        mongo_manager = AsyncMongoManager(engine, mongo_uri, max_pool_size=mongo_pool_size)
+        transport = AsyncMqttTransport(engine, client_id, broker, port)
+    else:
+        mongo_manager = MongoClientManager(mongo_uri, max_pool_size=mongo_pool_size)
+        # Uma única conexão MQTT para todos os controladores, sensores e atuadores do processo
+        transport = MqttTransport(client_id, broker, port)
+    # CONTROLLER_DATA_TIMESERIES=1 cria controller_data como coleção time-series do MongoDB
+    return {
+        "timeseries": os.environ.get("CONTROLLER_DATA_TIMESERIES") == "1",
+        "mongo_manager": mongo_manager,
+        "transport": transport,
+        "engine": engine,
+        # SENSOR_REPORT_BY_EXCEPTION=1 publica só mudanças além do deadband; SENSOR_ADAPTIVE=1 ajusta o intervalo
+        # SENSOR_PAYLOAD_CODEC=binary publica no formato compacto (os controladores aceitam os dois formatos)
+        # A publicação de vida sai a cada HEARTBEAT_TIMEOUT/3, para o supervisor nunca ver um sensor estável como parado
+        "sensor_options": {
+            "report_by_exception": os.environ.get("SENSOR_REPORT_BY_EXCEPTION") == "1",
+            "max_silence": float(os.environ.get("HEARTBEAT_TIMEOUT", 90)) / 3,
+            "adaptive": os.environ.get("SENSOR_ADAPTIVE") == "1",
+            "codec": os.environ.get("SENSOR_PAYLOAD_CODEC", "json")
+        }
+    }
+
 
 def start_service():
-    middleware = Middleware()
+    # LOG_LEVEL=DEBUG inclui as linhas por mensagem; linhas repetitivas passam no máximo LOG_RATE_LIMIT_BURST
+    # vezes a cada LOG_RATE_LIMIT_INTERVAL segundos (e, com LOG_SAMPLE_EVERY=N, 1 a cada N além disso)
+    configure_logging(
+        os.environ.get("LOG_LEVEL", "INFO"),
+        rate_limit_interval=float(os.environ.get("LOG_RATE_LIMIT_INTERVAL", 10)),
+        rate_limit_burst=int(os.environ.get("LOG_RATE_LIMIT_BURST", 5)),
+        sample_every=int(os.environ.get("LOG_SAMPLE_EVERY", 0))
+    )
+    # HOT_STANDBY=1 mantém as réplicas acompanhando o primário para um failover quase instantâneo
+    # Failover automático por heartbeat (AUTO_FAILOVER=0 desativa; HEARTBEAT_TIMEOUT em segundos)
+    supervisor_options = None
+    if os.environ.get("AUTO_FAILOVER", "1") == "1":
+        supervisor_options = {"message_timeout": float(os.environ.get("HEARTBEAT_TIMEOUT", 90))}
+    # ZONES=estufa-1,estufa-2 cria o conjunto completo de controladores para cada zona (tópicos agriculture/<zona>/...)
+    zones = [zone.strip() for zone in os.environ.get("ZONES", DEFAULT_ZONE).split(",") if zone.strip()]
+    middleware_options = {"hot_standby": os.environ.get("HOT_STANDBY") == "1", "supervisor_options": supervisor_options}
+    # RULE_BATCH_INTERVAL=0.05 avalia as regras das leituras de todas as zonas em lote (NumPy) a cada 50 ms
+    if os.environ.get("RULE_BATCH_INTERVAL"):
+        middleware_options["rule_batch_interval"] = float(os.environ["RULE_BATCH_INTERVAL"])
+    # SHARDS=N distribui as zonas entre N processos (um núcleo de CPU cada); o processo principal só roteia
+    shards = int(os.environ.get("SHARDS", 1))
+    if shards > 1:
+        from sharding import ShardedMiddleware  # Importado aqui: sharding.py importa este módulo
+        middleware = ShardedMiddleware(zones, shards, build_controller_options, middleware_options)
+    else:
+        middleware = Middleware(controller_options=build_controller_options(), zones=zones, **middleware_options)
 
     # Iniciar servidor RPyC
     service = MiddlewareService(middleware)
     server = ThreadPoolServer(service, port=18812)
-    print("Servidor RPyC rodando em localhost:18812")
+    logger.info("Servidor RPyC rodando em localhost:18812")
     server.start()
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""Migra a coleção controller_data existente para o layout time-series do MongoDB.
+
+Uso (com o middleware parado):
+    python3 scripts/migrate_controller_data.py [--uri mongodb://localhost:27017/] [--batch-size 1000]
+
+Coleções time-series não podem ser renomeadas, então a coleção atual é renomeada
+para <coleção>_legacy, a nova coleção time-series é criada com o nome original e
+os documentos são copiados em lotes, mantendo o _id original e com controller e data_type no
+subdocumento meta (o metaField). Se interrompida, basta executá-la de novo:
+a cópia continua depois do último lote confirmado (salvo em <coleção>_migration) sem duplicar documentos.
+Com --drop-legacy a cópia antiga é removida ao final.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pymongo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.db_layout import (create_timeseries_collection, ensure_history_index, is_timeseries_collection,
+                                   to_stored_document, uses_meta_layout)
+
+
+def migrate(db, collection_name, batch_size=1000, drop_legacy=False):
+    legacy_name = f"{collection_name}_legacy"
+    names = db.list_collection_names()
+
+    if collection_name in names and is_timeseries_collection(db, collection_name) and legacy_name not in names:
+        print(f"{collection_name} já é uma coleção time-series. Nada a fazer.")
+        return 0
+
+    if collection_name in names and not is_timeseries_collection(db, collection_name):
+        if legacy_name in names:
+            raise SystemExit(f"{legacy_name} já existe. Remova-a ou conclua a migração anterior antes de continuar.")
+        db[collection_name].rename(legacy_name)
+        print(f"{collection_name} renomeada para {legacy_name}.")
+
+    create_timeseries_collection(db, collection_name)
+    # controller e data_type vão para o metaField (meta); uma time-series de antes, com controller como
+    # metaField, mantém os campos no documento
+    meta_layout = uses_meta_layout(db, collection_name)
+    ensure_history_index(db[collection_name], meta_layout)
+
+    if legacy_name not in db.list_collection_names():
+        return 0
+
+    legacy = db[legacy_name]
+    target = db[collection_name]
+    # Progresso salvo a cada lote inserido por completo: posição (timestamp, _id) do último documento do lote
+    progress = db[f"{collection_name}_migration"]
+    legacy.create_index([("timestamp", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    copied = 0
+    start = time.perf_counter()
+
+    # Retoma depois do último lote confirmado. O lote seguinte pode ter sido inserido em parte (insert_many
+    # não ordenado), então os _id (mantidos da coleção antiga) que já estiverem no destino são pulados.
+    checkpoint = progress.find_one({"_id": collection_name})
+    query = {}
+    if checkpoint:
+        query = {"$or": [{"timestamp": {"$gt": checkpoint["timestamp"]}},
+                         {"timestamp": checkpoint["timestamp"], "_id": {"$gt": checkpoint["last_id"]}}]}
+    deduplicate = checkpoint is not None or target.estimated_document_count() > 0
+
+    def copy_batch(batch):
+        nonlocal deduplicate
+        if deduplicate:
+            existing = {document["_id"] for document in
+                        target.find({"_id": {"$in": [document["_id"] for document in batch]}}, {"_id": 1})}
+            batch = [document for document in batch if document["_id"] not in existing]
+            deduplicate = False  # Só o primeiro lote depois do ponto de retomada pode ter sido copiado em parte
+        if batch:
+            target.insert_many([to_stored_document(document, meta_layout) for document in batch], ordered=False)
+        return len(batch)
+
+    batch = []
+    cursor = legacy.find(query, sort=[("timestamp", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+                         batch_size=batch_size)
+    for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            copied += copy_batch(batch)
+            progress.replace_one({"_id": collection_name},
+                                 {"timestamp": batch[-1]["timestamp"], "last_id": batch[-1]["_id"]}, upsert=True)
+            batch = []
+            print(f"{copied} documentos copiados...")
+    if batch:
+        copied += copy_batch(batch)
+    progress.drop()
+
+    print(f"Migração concluída: {copied} documentos em {time.perf_counter() - start:.1f}s.")
+    if drop_legacy:
+        legacy.drop()
+        print(f"{legacy_name} removida.")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra controller_data para uma coleção time-series.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="agriculture_db")
+    parser.add_argument("--collection", default="controller_data")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-legacy", action="store_true")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.uri)
+    migrate(client[args.db], args.collection, batch_size=args.batch_size, drop_legacy=args.drop_legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@ from sensors.sensor_base import SensorBase
 import random
 
 class HumiditySensor(SensorBase):
-    def __init__(self, topic="agriculture/sensors/humidity"):
-        super().__init__("Sensor de Umidade", topic, "%")
+    DEFAULT_DEADBAND = 2.0
+
+    def __init__(self, topic="agriculture/sensors/humidity", **kwargs):
+        super().__init__("Sensor de Umidade", topic, "%", **kwargs)
 
     def generate_value(self):
         return round(random.uniform(30.0, 90.0), 2)
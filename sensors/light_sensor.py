@@ -2,8 +2,10 @@ from sensors.sensor_base import SensorBase
 import random
 
 class LightSensor(SensorBase):
-    def __init__(self, topic="agriculture/sensors/light"):
-        super().__init__("Sensor de Luminosidade", topic, "lux")
+    DEFAULT_DEADBAND = 200
+
+    def __init__(self, topic="agriculture/sensors/light", **kwargs):
+        super().__init__("Sensor de Luminosidade", topic, "lux", **kwargs)
 
     def generate_value(self):
         # Simula valores de luminosidade em lux entre 100 e 10000
@@ -1,11 +1,20 @@
-import paho.mqtt.client as mqtt
+import asyncio
+import logging
 import time
 import random
 import threading
-import json
+from transport.mqtt_transport import MqttTransport
+from transport.payload_codec import get_codec
+
+logger = logging.getLogger(__name__)
 
 class SensorBase:
-    def __init__(self, sensor_name, topic, unit, broker="localhost", port=1883):
+    # Variação mínima que justifica uma nova publicação no modo report-by-exception (na unidade do sensor)
+    DEFAULT_DEADBAND = 1.0
+
+    def __init__(self, sensor_name, topic, unit, broker="localhost", port=1883, transport=None,
+                 report_by_exception=False, deadband=None, max_silence=30, adaptive=False, min_interval=5, max_interval=60,
+                 codec="json", engine=None):
         self.sensor_name = sensor_name
         self.topic = topic
         self.unit = unit
@@ -13,41 +22,133 @@ class SensorBase:
         self.port = port
         self.active = False
         self.interval = 30  # Intervalo padrão de publicação em segundos
-        self.client = mqtt.Client(sensor_name)
+        self.codec = get_codec(codec)  # Formato do payload: "json" ou "binary" (compacto)
+
+        # Report-by-exception: publica só quando o valor muda mais que o deadband ou após max_silence segundos.
+        # max_silence precisa ficar bem abaixo do message_timeout do HeartbeatSupervisor (90 s), senão um sensor
+        # estável é dado como parado e dispara um failover falso
+        self.report_by_exception = report_by_exception
+        self.deadband = deadband if deadband is not None else self.DEFAULT_DEADBAND
+        self.max_silence = max_silence
+        # Amostragem adaptativa: o intervalo cai enquanto o valor varia rápido e cresce quando está estável
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.current_interval = self.interval
+        self.last_sample = None
+        self.last_published = None
+        self.last_publish_time = None
+        self.samples = 0
+        self.published = 0
+        self.heartbeats = 0
+        self.stop_event = threading.Event()
+        # Conexão MQTT compartilhada, se injetada; caso contrário, uma conexão própria
+        self.transport = transport or MqttTransport(sensor_name, broker, port)
         self.thread = None
+        # Com o motor asyncio, a amostragem é uma tarefa do loop em vez de uma thread por sensor
+        self.engine = engine
+        self.task = None
 
     def connect(self):
-        self.client.connect(self.broker, self.port, 60)
-        print(f"{self.sensor_name} conectado ao broker MQTT.")
+        self.transport.start()
+        logger.info("%s conectado ao broker MQTT.", self.sensor_name)
 
     def disconnect(self):
-        self.client.disconnect()
-        print(f"{self.sensor_name} desconectado do broker MQTT.")
+        self.transport.stop()
+        logger.info("%s desconectado do broker MQTT.", self.sensor_name)
 
     def generate_value(self):
         """Deve ser implementado por sensores específicos."""
         raise NotImplementedError("Este método deve ser implementado pela classe filha.")
 
+    def build_payload(self, value):
+        """Serializa uma leitura no formato publicado no tópico do sensor."""
+        return self.codec.encode(value, self.unit)
+
+    def should_publish(self, value, now):
+        """Decide se a amostra deve ser publicada (sempre, fora do modo report-by-exception)."""
+        if not self.report_by_exception or self.last_published is None:
+            return True
+        if abs(value - self.last_published) >= self.deadband:
+            return True
+        if now - self.last_publish_time >= self.max_silence:
+            self.heartbeats += 1  # Publicação de vida, mesmo sem mudança
+            return True
+        return False
+
+    def next_interval(self, value):
+        """Calcula o intervalo até a próxima amostra."""
+        if not self.adaptive or self.last_sample is None:
+            return self.current_interval
+        change = abs(value - self.last_sample)
+        if change >= self.deadband:
+            # Valor mudando rápido: amostra com mais frequência
+            return max(self.min_interval, self.current_interval / 2)
+        if change < self.deadband / 2:
+            # Valor estável: espaça as amostras
+            return min(self.max_interval, self.current_interval * 1.5)
+        return self.current_interval
+
     def publish_data(self):
         while self.active:
-            value = self.generate_value()
-            payload = {"valor": value, "unidade": self.unit}
-            self.client.publish(self.topic, json.dumps(payload))
-            print(f"{self.sensor_name} publicado: {payload}")
-            time.sleep(self.interval)
+            # Espera interrompível, para que stop() não aguarde o intervalo inteiro
+            self.stop_event.wait(self.sample())
+
+    async def publish_data_async(self):
+        while self.active:
+            await asyncio.sleep(self.sample())
+
+    def sample(self):
+        """Gera uma amostra, publica-a se necessário e retorna o intervalo até a próxima."""
+        value = self.generate_value()
+        now = time.monotonic()
+        self.samples += 1
+        if self.should_publish(value, now):
+            payload = self.build_payload(value)
+            self.transport.publish(self.topic, payload)
+            self.published += 1
+            self.last_published = value
+            self.last_publish_time = now
+            logger.debug("%s publicado: %s", self.sensor_name, payload)
+        self.current_interval = self.next_interval(value)
+        self.last_sample = value
+        if self.report_by_exception and self.last_publish_time is not None:
+            # Acorda a tempo da publicação de vida, mesmo com o intervalo adaptativo maior que o silêncio restante
+            return min(self.current_interval, max(0.0, self.max_silence - (now - self.last_publish_time)))
+        return self.current_interval
+
+    def get_stats(self):
+        """Amostras geradas contra publicadas (tráfego evitado no broker e no banco)."""
+        return {
+            "samples": self.samples,
+            "published": self.published,
+            "suppressed": self.samples - self.published,
+            "heartbeats": self.heartbeats,
+            "current_interval_s": round(self.current_interval, 2)
+        }
 
     def start(self):
         if not self.active:
             self.active = True
+            self.stop_event.clear()
+            self.current_interval = self.interval
+            self.last_published = None
             self.connect()
-            self.thread = threading.Thread(target=self.publish_data)
-            self.thread.start()
-            print(f"{self.sensor_name} ativado.")
+            if self.engine is not None:
+                self.task = self.engine.submit(self.publish_data_async())
+            else:
+                self.thread = threading.Thread(target=self.publish_data)
+                self.thread.start()
+            logger.info("%s ativado.", self.sensor_name)
 
     def stop(self):
         if self.active:
             self.active = False
+            self.stop_event.set()
+            if self.task is not None:
+                self.task.cancel()
+                self.task = None
             if self.thread and self.thread.is_alive():
                 self.thread.join()
             self.disconnect()
-            print(f"{self.sensor_name} desativado.")
+            logger.info("%s desativado.", self.sensor_name)
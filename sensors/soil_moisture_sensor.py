@@ -2,8 +2,10 @@ from sensors.sensor_base import SensorBase
 import random
 
 class SoilMoistureSensor(SensorBase):
-    def __init__(self, topic="agriculture/sensors/soil_moisture"):
-        super().__init__("Sensor de Umidade do Solo", topic, "%")
+    DEFAULT_DEADBAND = 1.0
+
+    def __init__(self, topic="agriculture/sensors/soil_moisture", **kwargs):
+        super().__init__("Sensor de Umidade do Solo", topic, "%", **kwargs)
 
     def generate_value(self):
         # Simula valores de umidade do solo entre 10% e 60%
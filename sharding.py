@@ -0,0 +1,404 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from controllers.controller_base import DEFAULT_ZONE
+from controllers.history_export import DEFAULT_CHUNK_SIZE, iterate_pages
+from event_log import EventLog
+from logging_setup import configure_logging
+from metrics import registry as default_registry
+from middleware_app import Middleware
+
+logger = logging.getLogger(__name__)
+
+
+def run_shard(shard_id, zones, options_factory, middleware_options, conn, event_queue, log_level, workers=8):
+    """Processo do shard: cria o Middleware das suas zonas e atende as chamadas recebidas pelo Pipe.
+
+    As chamadas são executadas em paralelo por um pool de threads (como no servidor RPyC do processo único)
+    e cada resposta leva o id da requisição, então uma consulta lenta não atrasa as demais.
+    """
+    configure_logging(log_level)
+    controller_options = options_factory(f"Middleware-shard{shard_id}")
+    middleware = Middleware(controller_options=controller_options, zones=zones, **middleware_options)
+
+    def forward_events():
+        # Repassa os eventos ao vivo ao processo principal, que mantém o log único consultado pelos clientes
+        seq = 0
+        while True:
+            seq, events = middleware.events.wait_for_events(seq, timeout=5.0)
+            for event in events:
+                event_queue.put({key: value for key, value in event.items() if key != "seq"})
+
+    threading.Thread(target=forward_events, name=f"ShardEvents-{shard_id}", daemon=True).start()
+    conn.send(("ready", zones))
+    send_lock = threading.Lock()  # As respostas das threads do pool não podem se intercalar no Pipe
+
+    def execute(request_id, method, args, kwargs):
+        try:
+            reply = (request_id, True, getattr(middleware, method)(*args, **kwargs))
+        except Exception as e:
+            reply = (request_id, False, f"{type(e).__name__}: {e}")
+        try:
+            with send_lock:
+                conn.send(reply)
+        except OSError:
+            pass  # Processo principal encerrado ou Pipe substituído
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"ShardCall-{shard_id}")
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break  # Processo principal encerrado
+        if request is None:
+            break
+        executor.submit(execute, *request)
+
+    executor.shutdown(wait=True)
+    middleware.stop_all_controllers()
+
+
+class Shard:
+    """Processo que executa os controladores de um subconjunto das zonas, atendendo chamadas por um Pipe.
+
+    Várias chamadas podem estar em andamento no mesmo Pipe: cada requisição leva um id e uma thread
+    recebe as respostas e entrega cada uma à chamada que a aguarda.
+    """
+
+    def __init__(self, shard_id, zones, context, call_timeout=30.0, workers=8):
+        self.shard_id = shard_id
+        self.zones = zones
+        self.context = context
+        self.call_timeout = call_timeout  # Espera máxima pela resposta; depois disso o shard é tratado como falho
+        self.workers = workers  # Threads que atendem as chamadas no processo do shard
+        self.process = None
+        self.conn = None
+        self.pending = {}  # id da requisição -> Future da chamada, por Pipe
+        self.request_ids = itertools.count()
+        self.lock = threading.Lock()  # Protege o envio no Pipe e a troca de processo/Pipe
+        self.generation = 0  # Incrementada a cada (re)início do processo
+        self.calls = 0
+        self.started_at = None
+
+    def start(self, options_factory, middleware_options, event_queue, timeout):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=run_shard,
+            args=(self.shard_id, self.zones, options_factory, middleware_options, child_conn, event_queue,
+                  logging.getLogger().level, self.workers),
+            name=f"MiddlewareShard-{self.shard_id}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        # Aguarda o processo criar e iniciar os controladores
+        if not parent_conn.poll(timeout):
+            process.terminate()
+            raise RuntimeError(f"Shard {self.shard_id} não iniciou em {timeout} s")
+        parent_conn.recv()
+        pending = {}
+        threading.Thread(target=self.receive_replies, args=(parent_conn, pending),
+                         name=f"ShardReplies-{self.shard_id}", daemon=True).start()
+        # Troca sob o lock: nenhuma chamada em andamento vê o Pipe de um processo e o processo de outro
+        with self.lock:
+            old_conn, self.conn, self.process = self.conn, parent_conn, process
+            self.pending = pending
+            self.generation += 1
+            self.started_at = time.time()
+        if old_conn is not None:
+            old_conn.close()
+
+    def receive_replies(self, conn, pending):
+        """Entrega cada resposta do shard à chamada com o mesmo id; com o Pipe fechado, falha as pendentes."""
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except (EOFError, OSError) as e:
+                with self.lock:
+                    futures = list(pending.values())
+                    pending.clear()
+                for future in futures:
+                    future.set_exception(e if isinstance(e, OSError) else EOFError())
+                return
+            with self.lock:
+                future = pending.pop(request_id, None)
+            if future is not None:  # None: a chamada já desistiu por timeout
+                future.set_result((ok, result))
+
+    def call(self, method, /, *args, **kwargs):
+        future = Future()
+        with self.lock:
+            request_id = next(self.request_ids)
+            pending = self.pending
+            pending[request_id] = future
+            try:
+                self.conn.send((request_id, method, args, kwargs))
+            except Exception:
+                pending.pop(request_id, None)
+                raise
+        try:
+            ok, result = future.result(self.call_timeout)
+        except TimeoutError:
+            with self.lock:
+                pending.pop(request_id, None)
+            raise TimeoutError(f"Shard {self.shard_id} não respondeu a {method} em {self.call_timeout} s") from None
+        with self.lock:
+            self.calls += 1
+        if not ok:
+            raise RuntimeError(f"[SHARD {self.shard_id}] {method}: {result}")
+        return result
+
+    def stop(self, timeout=10.0):
+        with self.lock:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def stats(self):
+        return {
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "zones": self.zones,
+            "generation": self.generation,
+            "calls": self.calls,
+            "started_at": datetime.utcfromtimestamp(self.started_at).isoformat() if self.started_at else None,
+        }
+
+
+class ShardedMiddleware:
+    """Mesma interface do Middleware, com as zonas distribuídas entre processos (shards).
+
+    Cada shard roda em um processo próprio os controladores, sensores e atuadores das suas zonas, com
+    conexões MQTT e MongoDB próprias, e portanto sem disputar o GIL com os demais nem com o servidor RPyC.
+    Este processo só roteia as chamadas ao shard dono da zona e reinicia os shards que caírem; os
+    controladores do shard reiniciado recuperam o estado do MongoDB, como em um failover frio.
+    """
+
+    # Consultas que podem ser repetidas no shard reiniciado; comandos e failovers nunca são executados duas vezes
+    RETRYABLE_METHODS = frozenset({
+        "get_zones", "get_controllers_and_replicas", "get_controller_stats", "get_failover_stats",
+        "get_supervisor_stats", "get_metrics", "export_metrics", "get_sensor_data", "get_sensor_data_bulk",
+        "get_actuator_data", "get_actuator_data_bulk", "get_historical_sensor_data", "get_controller_snapshot",
+        "get_aggregated_history", "get_history_page",
+    })
+
+    def __init__(self, zones, shards, options_factory, middleware_options=None, monitor_interval=1.0,
+                 start_timeout=60.0, start_method="spawn", call_timeout=30.0):
+        self.options_factory = options_factory  # Chamada no processo do shard com o client_id MQTT
+        self.middleware_options = middleware_options or {}
+        self.start_timeout = start_timeout
+        self.context = multiprocessing.get_context(start_method)
+        self.metrics = default_registry  # Métricas das chamadas RPC, feitas neste processo
+
+        # Distribui as zonas entre os shards (round-robin); não há shards sem zonas
+        zones = list(zones)
+        shards = max(1, min(shards, len(zones)))
+        self.shards = [Shard(i, zones[i::shards], self.context, call_timeout) for i in range(shards)]
+        self.zone_shards = {zone: shard for shard in self.shards for zone in shard.zones}
+
+        self.events = EventLog()
+        self.event_queue = self.context.Queue()
+        self.restart_lock = threading.Lock()
+        self.restart_history = deque(maxlen=100)
+
+        for shard in self.shards:
+            shard.start(self.options_factory, self.middleware_options, self.event_queue, self.start_timeout)
+            logger.info("[SHARD] Shard %d iniciado (pid %d) com as zonas %s.", shard.shard_id, shard.process.pid,
+                        ", ".join(shard.zones))
+
+        self.active = True
+        threading.Thread(target=self.receive_events, name="ShardEvents", daemon=True).start()
+        self.monitor_interval = monitor_interval
+        self.monitor_thread = threading.Thread(target=self.monitor, name="ShardMonitor", daemon=True)
+        self.monitor_thread.start()
+
+    def receive_events(self):
+        while self.active:
+            self.events.publish(self.event_queue.get())
+
+    def monitor(self):
+        """Reinicia os shards cujo processo terminou."""
+        while self.active:
+            time.sleep(self.monitor_interval)
+            for shard in self.shards:
+                if self.active and not shard.process.is_alive():
+                    try:
+                        self.restart_shard(shard, shard.generation,
+                                           f"processo terminou (código {shard.process.exitcode})")
+                    except Exception as e:
+                        # O processo continua morto: nova tentativa na próxima volta do monitor
+                        logger.exception("[SHARD] Falha ao reiniciar o shard %d: %s", shard.shard_id, e)
+
+    def restart_shard(self, shard, generation, reason):
+        with self.restart_lock:
+            if shard.generation != generation:
+                return  # Já reiniciado por outra thread
+            logger.error("[SHARD] Shard %d (zonas %s) falhou: %s. Reiniciando...", shard.shard_id,
+                         ", ".join(shard.zones), reason)
+            started = time.perf_counter()
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join(5.0)
+            if shard.process.is_alive():
+                shard.process.kill()  # Travado (ex.: sem responder dentro do call_timeout): SIGTERM não basta
+            shard.process.join()
+            options = {**self.middleware_options, "recover_state": True}
+            shard.start(self.options_factory, options, self.event_queue, self.start_timeout)
+            event = {
+                "timestamp": datetime.utcnow().isoformat(),
+                "shard": shard.shard_id,
+                "zones": shard.zones,
+                "reason": reason,
+                "restart_ms": round((time.perf_counter() - started) * 1000, 3)
+            }
+            self.restart_history.append(event)
+            logger.warning("[SHARD] Shard %d reiniciado (pid %d) em %s ms.", shard.shard_id, shard.process.pid,
+                           event["restart_ms"])
+
+    def call_shard(self, shard, method, /, *args, **kwargs):
+        """Chama o método no shard; se o processo caiu ou não respondeu, reinicia o shard.
+
+        Só as consultas (RETRYABLE_METHODS) são repetidas no shard reiniciado: um comando pode ter sido
+        executado antes da falha, então o erro volta para quem chamou.
+        """
+        generation = shard.generation
+        try:
+            return shard.call(method, *args, **kwargs)
+        except TimeoutError as e:
+            self.restart_shard(shard, generation, str(e))
+            error = e
+        except (EOFError, OSError) as e:
+            self.restart_shard(shard, generation, f"canal de comunicação fechado ({type(e).__name__})")
+            error = e
+        if method not in self.RETRYABLE_METHODS:
+            raise RuntimeError(f"[SHARD {shard.shard_id}] {method} interrompido pela falha do shard, "
+                               f"que foi reiniciado; a chamada não foi repetida") from error
+        return shard.call(method, *args, **kwargs)
+
+    def call_zone(self, zone, method, /, *args, **kwargs):
+        # Zonas desconhecidas vão ao primeiro shard, que responde como o Middleware (vazio/None)
+        return self.call_shard(self.zone_shards.get(zone, self.shards[0]), method, *args, **kwargs)
+
+    def call_all(self, method, /, *args, **kwargs):
+        return [(shard, self.call_shard(shard, method, *args, **kwargs)) for shard in self.shards]
+
+    def group_zones(self, zones):
+        """Agrupa as zonas pedidas (None = todas) pelo shard dono."""
+        if zones is None:
+            return [(shard, None) for shard in self.shards]
+        groups = {}
+        for zone in zones:
+            if zone in self.zone_shards:
+                groups.setdefault(self.zone_shards[zone], []).append(zone)
+        return list(groups.items())
+
+    def stop(self):
+        self.active = False
+        for shard in self.shards:
+            shard.stop()
+
+    def wait_for_events(self, after_seq, timeout=25.0):
+        last_seq, events = self.events.wait_for_events(after_seq, timeout)
+        return {"seq": last_seq, "events": events}
+
+    def get_zones(self):
+        zones = {}
+        for _, shard_zones in self.call_all("get_zones"):
+            zones.update(shard_zones)
+        return zones
+
+    def get_controllers_and_replicas(self, zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_controllers_and_replicas", zone)
+
+    def get_controller_stats(self):
+        stats = {}
+        for _, shard_stats in self.call_all("get_controller_stats"):
+            stats.update(shard_stats)
+        return stats
+
+    def get_failover_stats(self):
+        """Failovers de controladores de cada shard e reinícios de shards."""
+        shards = {shard.shard_id: stats for shard, stats in self.call_all("get_failover_stats")}
+        return {
+            "count": sum(stats["count"] for stats in shards.values()),
+            "shards": shards,
+            "shard_restarts": list(self.restart_history)
+        }
+
+    def get_supervisor_stats(self):
+        return {shard.shard_id: stats for shard, stats in self.call_all("get_supervisor_stats")}
+
+    def get_shard_stats(self):
+        return {shard.shard_id: shard.stats() for shard in self.shards}
+
+    def get_metrics(self):
+        snapshot = self.metrics.snapshot()
+        for shard, shard_snapshot in self.call_all("get_metrics"):
+            for name, entry in shard_snapshot.items():
+                merged = snapshot.setdefault(name, {**entry, "series": []})
+                merged["series"].extend({**series, "labels": {**series["labels"], "shard": str(shard.shard_id)}}
+                                        for series in entry["series"])
+        return snapshot
+
+    def render_metrics(self):
+        series = []
+        for shard in self.shards:
+            series.extend(self.call_shard(shard, "export_metrics", shard=str(shard.shard_id)))
+        return self.metrics.render_prometheus(series)
+
+    def simulate_failover(self, controller_type, zone=DEFAULT_ZONE):
+        self.call_zone(zone, "simulate_failover", controller_type, zone)
+
+    def get_sensor_data(self, zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_sensor_data", zone)
+
+    def get_sensor_data_bulk(self, zones=None, controller_types=None):
+        sensor_data = {}
+        for shard, shard_zones in self.group_zones(zones):
+            sensor_data.update(self.call_shard(shard, "get_sensor_data_bulk", shard_zones, controller_types))
+        return sensor_data
+
+    def get_actuator_data(self, zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_actuator_data", zone)
+
+    def get_actuator_data_bulk(self, zones=None, controller_types=None):
+        actuator_data = {}
+        for shard, shard_zones in self.group_zones(zones):
+            actuator_data.update(self.call_shard(shard, "get_actuator_data_bulk", shard_zones, controller_types))
+        return actuator_data
+
+    def control_actuators(self, actuator_type, action, zone=DEFAULT_ZONE):
+        self.call_zone(zone, "control_actuators", actuator_type, action, zone)
+
+    def control_sensors(self, sensor_type, action, zone=DEFAULT_ZONE):
+        self.call_zone(zone, "control_sensors", sensor_type, action, zone)
+
+    def get_historical_sensor_data(self, controller_name, zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_historical_sensor_data", controller_name, zone)
+
+    def get_controller_snapshot(self, controller_id, bucket="1m", zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_controller_snapshot", controller_id, bucket, zone)
+
+    def get_aggregated_history(self, controller_name, start=None, end=None, bucket="1m", zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_aggregated_history", controller_name, start, end, bucket, zone)
+
+    def get_history_page(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        return self.call_zone(zone, "get_history_page", controller_name, start, end, fields, resume_token,
+                              chunk_size, zone)
+
+    def export_history(self, controller_name, start=None, end=None, fields=None, resume_token=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, zone=DEFAULT_ZONE):
+        # Uma chamada ao shard por página: o gerador fica neste processo, as consultas no shard
+        return iterate_pages(lambda token: self.get_history_page(controller_name, start, end, fields, token,
+                                                                 chunk_size, zone), resume_token)
@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatSupervisor:
+    """Detecta falhas dos controladores principais e aciona o failover automaticamente.
+
+    Uma única thread verifica todos os grupos de réplicas, usando um heap ordenado
+    pelo prazo da próxima verificação de cada grupo.
+    """
+
+    def __init__(self, on_failure, check_interval=5.0, message_timeout=90.0, queue_stall_timeout=30.0, confirmations=2):
+        self.on_failure = on_failure  # Chamada com (chave, lista de controladores, motivo)
+        self.check_interval = check_interval
+        self.message_timeout = message_timeout  # Tempo máximo sem mensagens do sensor
+        self.queue_stall_timeout = queue_stall_timeout  # Tempo máximo com a fila de ingestão parada
+        self.confirmations = confirmations  # Verificações seguidas com falha antes do failover
+        self.heap = []  # (prazo, sequência, chave)
+        self.sequence = itertools.count()
+        self.groups = {}  # chave -> estado do grupo
+        self.condition = threading.Condition()
+        self.thread = None
+        self.active = False
+
+    def watch(self, key, controllers):
+        """Passa a monitorar o controlador principal (controllers[0]) do grupo."""
+        with self.condition:
+            self.groups[key] = {
+                "controllers": controllers,
+                "primary": None,
+                "healthy_since": time.time(),
+                "last_processed": 0,
+                "progress_time": time.time(),
+                "strikes": 0,
+                "reason": None,
+                "checks": 0,
+                "suspicions": 0,
+                "false_suspicions": 0,
+                "failovers": 0,
+                "detection_latencies": [],
+            }
+            self.schedule(key, time.monotonic() + self.check_interval)
+
+    def unwatch(self, key):
+        with self.condition:
+            self.groups.pop(key, None)
+
+    def schedule(self, key, deadline):
+        heapq.heappush(self.heap, (deadline, next(self.sequence), key))
+        self.condition.notify_all()
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.thread = threading.Thread(target=self.run, name="HeartbeatSupervisor", daemon=True)
+            self.thread.start()
+            logger.info("[SUPERVISOR] Monitorando %d grupo(s) de controladores.", len(self.groups))
+
+    def stop(self):
+        with self.condition:
+            self.active = False
+            self.condition.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.active and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+                    self.condition.wait(timeout)
+                if not self.active:
+                    return
+                _, _, key = heapq.heappop(self.heap)
+                if key not in self.groups:
+                    continue
+            self.check(key)
+            with self.condition:
+                if key in self.groups:
+                    self.schedule(key, time.monotonic() + self.check_interval)
+
+    def detect(self, group, controller, now):
+        """Retorna o motivo da suspeita de falha do controlador, ou None se estiver saudável."""
+        if controller is not group["primary"]:
+            # Novo principal (failover): reinicia as referências de saúde
+            group["primary"] = controller
+            group["healthy_since"] = now
+            group["last_processed"] = controller.ingest.processed
+            group["progress_time"] = now
+
+        transport = controller.transport
+        if transport.users > 0 and not transport.connected:
+            if any(replica.transport is transport for replica in group["controllers"][1:]):
+                # Conexão compartilhada com as réplicas (queda do broker): promover não resolve e só gera uma
+                # cascata de failovers. Aguarda a reconexão, sem contar o tempo desconectado como silêncio
+                group["healthy_since"] = now
+                group["progress_time"] = now
+                return None
+            return "mqtt_disconnected"
+
+        ingest = controller.ingest
+        if ingest.processed != group["last_processed"] or len(ingest.queue) == 0:
+            group["last_processed"] = ingest.processed
+            group["progress_time"] = now
+        elif now - group["progress_time"] > self.queue_stall_timeout:
+            return "ingest_stalled"
+
+        sensor = getattr(controller, "sensor", None)
+        if sensor is not None and sensor.active:
+            last_message = controller.last_message_time
+            last_seen = (last_message - datetime(1970, 1, 1)).total_seconds() if last_message else group["healthy_since"]
+            if now - max(last_seen, group["healthy_since"]) > self.message_timeout:
+                return "stale_messages"
+        return None
+
+    def check(self, key):
+        with self.condition:
+            group = self.groups.get(key)
+        if group is None or not group["controllers"]:
+            return
+        now = time.time()
+        group["checks"] += 1
+        reason = self.detect(group, group["controllers"][0], now)
+
+        if reason is None:
+            if group["strikes"] > 0:
+                # Suspeita desfeita sem failover: teria sido um falso positivo
+                group["false_suspicions"] += 1
+                logger.info("[SUPERVISOR] %s: suspeita (%s) desfeita.", key, group["reason"])
+            group["strikes"] = 0
+            group["reason"] = None
+            return
+
+        if group["strikes"] == 0:
+            group["suspicions"] += 1
+            logger.warning("[SUPERVISOR] %s: suspeita de falha (%s).", key, reason)
+        group["strikes"] += 1
+        group["reason"] = reason
+        if group["strikes"] < self.confirmations:
+            return
+
+        controller = group["controllers"][0]
+        last_message = controller.last_message_time
+        last_healthy = max(
+            (last_message - datetime(1970, 1, 1)).total_seconds() if last_message else group["healthy_since"],
+            group["progress_time"] if reason == "ingest_stalled" else group["healthy_since"]
+        )
+        group["detection_latencies"] = (group["detection_latencies"] + [now - last_healthy])[-100:]
+        group["failovers"] += 1
+        group["strikes"] = 0
+        group["reason"] = None
+        logger.error("[SUPERVISOR] %s: falha confirmada (%s) em %s. Iniciando failover.", key, reason, controller.name)
+        try:
+            self.on_failure(key, group["controllers"], reason)
+        except Exception as e:
+            logger.error("[SUPERVISOR] %s: Erro ao executar failover: %s", key, e)
+
+    def get_stats(self):
+        """Retorna, por grupo, verificações, suspeitas, failovers, taxa de falsos positivos e latência de detecção."""
+        stats = {}
+        with self.condition:
+            groups = dict(self.groups)
+        for key, group in groups.items():
+            latencies = group["detection_latencies"]
+            stats[key] = {
+                "checks": group["checks"],
+                "suspected": group["strikes"] > 0,
+                "reason": group["reason"],
+                "suspicions": group["suspicions"],
+                "false_suspicions": group["false_suspicions"],
+                "false_positive_rate": round(group["false_suspicions"] / group["suspicions"], 4) if group["suspicions"] else 0.0,
+                "failovers": group["failovers"],
+                "last_detection_latency_s": round(latencies[-1], 3) if latencies else None,
+                "avg_detection_latency_s": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "max_detection_latency_s": round(max(latencies), 3) if latencies else None,
+            }
+        return stats
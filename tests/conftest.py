@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Os módulos do projeto são importados a partir da raiz do repositório (como em middleware_app.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.local_mongo import InMemoryMongoManager
+from metrics import MetricsRegistry
+from middleware_app import Middleware
+from tests.fakes import InMemoryTransport
+
+
+@pytest.fixture
+def middleware():
+    """Middleware completo (3 grupos, com supervisor) sobre transporte e MongoDB em memória."""
+    options = {"transport": InMemoryTransport(), "mongo_manager": InMemoryMongoManager(), "metrics": MetricsRegistry()}
+    middleware = Middleware(controller_options=options,
+                            supervisor_options={"check_interval": 0.05, "confirmations": 2, "message_timeout": 90.0})
+    yield middleware
+    middleware.stop_all_controllers()
+
+
+@pytest.fixture
+def web_client(middleware):
+    """Cliente Flask ligado ao middleware por uma conexão RPyC real (ThreadPoolServer, como em start_service)."""
+    import threading
+    import time
+
+    from rpyc import ThreadPoolServer
+
+    from middleware_app import MiddlewareService
+
+    server = ThreadPoolServer(MiddlewareService(middleware), hostname="127.0.0.1", port=0)
+    threading.Thread(target=server.start, daemon=True).start()
+    while not server.active:  # O socket só passa a aceitar conexões dentro de start()
+        time.sleep(0.01)
+    client_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client")
+    if client_dir not in sys.path:
+        sys.path.insert(0, client_dir)
+    import client as webclient
+
+    webclient.rpyc_pool.host, webclient.rpyc_pool.port = "127.0.0.1", server.port
+    webclient.rpyc_pool.backoff, webclient.rpyc_pool.next_attempt = 0.0, 0.0
+    webclient.response_cache.invalidate()
+    yield webclient.app.test_client()
+    webclient.rpyc_pool.close()
+    server.close()
@@ -0,0 +1,50 @@
+"""Dublês usados pelos testes: transporte MQTT em memória, com queda do broker simulável."""
+import threading
+from collections import namedtuple
+
+import paho.mqtt.client as mqtt
+
+Message = namedtuple("Message", ["topic", "payload", "qos", "retain"])
+
+
+class InMemoryTransport:
+    """Mesma interface do MqttTransport, entregando as publicações aos handlers na própria thread."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self.users = 0
+        self.connected = True
+        self.messages_out = 0
+
+    def start(self):
+        with self.lock:
+            self.users += 1
+
+    def stop(self):
+        with self.lock:
+            self.users = max(0, self.users - 1)
+
+    def subscribe(self, topic, handler):
+        with self.lock:
+            self.handlers.setdefault(topic, []).append(handler)
+
+    def unsubscribe(self, topic, handler):
+        with self.lock:
+            handlers = [h for h in self.handlers.get(topic, []) if h != handler]
+            self.handlers[topic] = handlers
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if not self.connected:
+            return None  # Broker fora do ar: a publicação se perde, como no paho desconectado
+        self.messages_out += 1
+        payload = payload.encode() if isinstance(payload, str) else payload
+        with self.lock:
+            handlers = [handler for topic_filter, topic_handlers in self.handlers.items()
+                        if mqtt.topic_matches_sub(topic_filter, topic) for handler in topic_handlers]
+        for handler in handlers:
+            handler(None, None, Message(topic, payload, qos, retain))
+        return None
+
+    def stats(self):
+        return {"connected": self.connected, "users": self.users, "messages_out": self.messages_out}
@@ -0,0 +1,10 @@
+def test_index_lists_controllers_over_rpyc(web_client):
+    import client as webclient
+
+    response = web_client.get("/")
+
+    assert response.status_code == 200
+    assert "Erro ao carregar" not in response.get_data(as_text=True)
+    controllers = webclient.load_controllers_and_replicas()
+    assert set(controllers) == {"irrigation", "cooling", "lighting"}
+    assert controllers["cooling"][0] == {"name": "Refrigeração (Primary)", "role": "Primary"}
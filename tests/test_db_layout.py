@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from benchmarks.local_mongo import InMemoryMongoManager
+from controllers.cooling_controller import CoolingController
+from controllers.db_layout import history_index_keys
+from metrics import MetricsRegistry
+from tests.fakes import InMemoryTransport
+
+
+def build_controller(collection_name, **options):
+    return CoolingController(transport=InMemoryTransport(), mongo_manager=InMemoryMongoManager(),
+                             metrics=MetricsRegistry(), collection_name=collection_name, **options)
+
+
+def store_readings(controller, values):
+    base = datetime(2026, 1, 1)
+    controller.db_writer.start()
+    for i, value in enumerate(values):
+        controller.store_data_in_db("sensor", value, timestamp=base + timedelta(seconds=i))
+    controller.store_data_in_db("actuator", "ON", timestamp=base + timedelta(seconds=len(values)))
+    controller.db_writer.stop()
+
+
+def test_timeseries_layout_keeps_series_in_meta():
+    controller = build_controller("ts_layout_data", timeseries=True)
+    store_readings(controller, [20.0, 21.0, 22.0])
+
+    assert controller.timeseries
+    stored = controller.collection.find_one({"meta.data_type": "sensor"})
+    assert stored["meta"] == {"controller": "Refrigeração (Primary)", "data_type": "sensor"}
+    assert "controller" not in stored and "data_type" not in stored
+    assert controller.db.options["ts_layout_data"]["timeseries"]["metaField"] == "meta"
+    assert controller.collection.indexes["controller_data_type_timestamp"] == history_index_keys(True)
+
+    # Leitores: histórico, exportação e recuperação de estado no layout time-series
+    assert [entry["value"] for entry in controller.get_historical_sensor_data()] == [22.0, 21.0, 20.0]
+    rows, _ = controller.get_history_page(fields=["timestamp", "value", "controller", "data_type"])
+    assert rows[0] == {"timestamp": "2026-01-01T00:00:00", "value": 20.0,
+                       "controller": "Refrigeração (Primary)", "data_type": "sensor"}
+    controller.recover_state_from_db()
+    assert (controller.sensor_last_value, controller.actuator_last_value) == (22.0, "ON")
+
+
+def test_regular_layout_keeps_flat_documents():
+    controller = build_controller("regular_layout_data")
+    store_readings(controller, [20.0])
+
+    assert not controller.timeseries
+    stored = controller.collection.find_one({"data_type": "sensor"})
+    assert stored["controller"] == "Refrigeração (Primary)" and "meta" not in stored
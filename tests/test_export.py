@@ -0,0 +1,14 @@
+def test_export_rejects_bad_parameters_without_remote_traceback(web_client):
+    response = web_client.get("/controller/cooling/export?fields=senha")
+
+    assert response.status_code == 400
+    body = response.get_data(as_text=True)
+    assert "Campos inválidos para exportação" in body
+    assert "Traceback" not in body and "\n" not in body
+
+
+def test_export_empty_range_writes_header_and_final_token(web_client):
+    response = web_client.get("/controller/cooling/export?start=2100-01-01T00:00:00&fields=timestamp,value")
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines() == ["timestamp,value", "# resume_token="]
@@ -0,0 +1,51 @@
+import time
+
+from middleware_app import Middleware
+
+
+def active_sensors(controllers):
+    return sum(1 for controller in controllers if controller.sensor.active)
+
+
+def all_controllers(middleware):
+    return [controller for controllers in middleware.controllers.values() for controller in controllers]
+
+
+def test_broker_outage_does_not_trigger_failover(middleware):
+    transport = middleware.get_primary("cooling").transport
+    known = all_controllers(middleware)
+
+    transport.connected = False  # Queda do broker: a conexão compartilhada por primários e réplicas cai
+    time.sleep(0.6)  # Bem mais que confirmations * check_interval
+    transport.connected = True
+    time.sleep(0.2)
+
+    assert len(middleware.failover_history) == 0
+    assert sum(stats["failovers"] for stats in middleware.supervisor.get_stats().values()) == 0
+    assert active_sensors(set(known + all_controllers(middleware))) == len(middleware.controllers)
+
+
+def test_failover_stops_failed_primary_sensor(middleware):
+    known = all_controllers(middleware)
+    for controller_type in Middleware.CONTROLLER_CLASSES:
+        middleware.simulate_failover(controller_type)
+
+    assert len(middleware.failover_history) == len(Middleware.CONTROLLER_CLASSES)
+    # Um sensor ativo por grupo: os dos primários falhos foram desligados
+    assert active_sensors(set(known + all_controllers(middleware))) == len(middleware.controllers)
+
+
+def test_cold_failover_keeps_sensor_history(middleware):
+    primary = middleware.get_primary("cooling")
+    for value in (21.5, 22.0, 22.5):
+        primary.transport.publish(primary.sensor_topic, primary.sensor.build_payload(value))
+    time.sleep(0.2)  # Fila de ingestão
+    history = primary.get_historical_sensor_data()
+
+    middleware.simulate_failover("cooling")  # Para o primário, gravando os pendentes, e promove a réplica a frio
+
+    new_primary = middleware.get_primary("cooling")
+    assert new_primary is not primary
+    assert [entry["value"] for entry in history][:3] == [22.5, 22.0, 21.5]  # Mais recentes primeiro
+    assert new_primary.get_historical_sensor_data() == history
+    assert len(new_primary.history) == len(history)  # Servido do buffer aquecido, não só do MongoDB
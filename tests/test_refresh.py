@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from controllers.rule_table import RuleBatcher
+
+
+@pytest.fixture
+def cooling(middleware):
+    controller = middleware.get_primary("cooling")
+    controller.control_sensor("off")  # As leituras vêm do teste
+    controller.hysteresis = {"max_temperature": 2.0}
+    controller.refresh_interval = 0.05
+    controller.min_dwell = 0.0
+    controller.process_sensor_data(controller.limits["max_temperature"] + 1)
+    assert controller.actuator_last_value == "ON"
+    return controller
+
+
+def in_band(controller):
+    return controller.limits["max_temperature"] - 1
+
+
+def test_reading_inside_band_refreshes_state(cooling):
+    sent = cooling.commands_sent
+    cooling.process_sensor_data(in_band(cooling))
+    assert cooling.commands_sent == sent  # Refresh ainda não venceu
+
+    time.sleep(0.1)
+    cooling.process_sensor_data(in_band(cooling))
+    assert cooling.commands_sent == sent + 1
+    assert cooling.commands_refreshed == 1
+    assert cooling.actuator_last_value == "ON"
+
+
+def test_batched_reading_inside_band_refreshes_state(cooling):
+    batcher = RuleBatcher()
+    sent = cooling.commands_sent
+    batcher.evaluate_batch([cooling], [in_band(cooling)])
+    assert cooling.commands_sent == sent
+
+    time.sleep(0.1)
+    batcher.evaluate_batch([cooling], [in_band(cooling)])
+    assert cooling.commands_sent == sent + 1
+    assert cooling.commands_refreshed == 1
+    assert batcher.stats()["commands"] == 1
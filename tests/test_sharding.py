@@ -0,0 +1,59 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from benchmarks.local_mongo import InMemoryMongoManager
+from metrics import MetricsRegistry
+from middleware_app import Middleware
+from sharding import ShardedMiddleware
+from tests.fakes import InMemoryTransport
+
+
+def shard_options(client_id):
+    return {"transport": InMemoryTransport(), "mongo_manager": InMemoryMongoManager(), "metrics": MetricsRegistry()}
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    # fork: o processo do shard herda o método de teste adicionado ao Middleware
+    monkeypatch.setattr(Middleware, "sleep_for", lambda self, seconds: time.sleep(seconds) or seconds, raising=False)
+    middleware = ShardedMiddleware(["zona-0"], 1, shard_options, {"replicas": 1}, monitor_interval=0.1,
+                                   start_method="fork", call_timeout=10.0)
+    yield middleware
+    middleware.stop()
+
+
+def test_slow_call_does_not_block_other_calls(sharded):
+    slow = threading.Thread(target=sharded.call_zone, args=("zona-0", "sleep_for", 2.0))
+    slow.start()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    assert "zona-0" in sharded.get_zones()
+    assert time.perf_counter() - started < 1.0
+    slow.join()
+
+
+def test_monitor_survives_failed_restart(sharded, monkeypatch):
+    restart_shard = sharded.restart_shard
+    attempts = []
+
+    def flaky_restart(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise RuntimeError("falha simulada")
+        restart_shard(*args)
+
+    monkeypatch.setattr(sharded, "restart_shard", flaky_restart)
+    shard = sharded.shards[0]
+    generation = shard.generation
+    os.kill(shard.process.pid, signal.SIGKILL)
+
+    deadline = time.monotonic() + 20.0
+    while shard.generation == generation and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert len(attempts) >= 2
+    assert shard.generation == generation + 1
+    assert "zona-0" in sharded.get_zones()
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+
+import paho.mqtt.client as mqtt
+
+try:
+    import aiomqtt
+except ImportError:  # Dependência opcional, necessária só com ENGINE=asyncio
+    aiomqtt = None
+
+logger = logging.getLogger(__name__)
+
+# Mensagem entregue aos handlers, com os mesmos atributos usados da mensagem do paho
+ReceivedMessage = namedtuple("ReceivedMessage", ["topic", "payload", "qos", "retain"])
+
+
+class AsyncMqttTransport:
+    """Mesma interface do MqttTransport, com o cliente aiomqtt rodando no loop do AsyncEngine.
+
+    Os handlers são chamados no loop, um por vez: enquanto um handler processa a mensagem, a próxima
+    não é lida do socket (contrapressão natural, sem thread de rede própria).
+    """
+
+    def __init__(self, engine, client_id=None, broker="localhost", port=1883, keepalive=60,
+                 min_reconnect_delay=1, max_reconnect_delay=30, connect_timeout=10.0, pending_calls_warning=1000):
+        if aiomqtt is None:
+            raise RuntimeError("O motor asyncio requer o pacote aiomqtt (pip install aiomqtt==1.2.1)")
+        self.engine = engine
+        self.client_id = client_id or f"AsyncTransport_{id(self):x}"
+        self.broker = broker
+        self.port = port
+        self.keepalive = keepalive
+        self.min_reconnect_delay = min_reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connect_timeout = connect_timeout
+        self.pending_calls_warning = pending_calls_warning
+        self.client = None
+        self.task = None
+        self.connected_event = threading.Event()
+
+        self.handlers = {}  # Tópico exato -> handlers (despacho O(1))
+        self.wildcard_handlers = {}  # Filtros com + ou # -> handlers
+        self.lock = threading.RLock()
+        self.users = 0  # Componentes que iniciaram o transporte
+        self.connected = False
+
+        # Contadores expostos por stats()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.publish_errors = 0
+        self.unroutable = 0
+        self.handler_errors = 0
+        self.connections = 0
+        self.disconnections = 0
+
+    def start(self):
+        """Conecta ao broker no primeiro uso; chamadas seguintes só incrementam a contagem de usuários."""
+        with self.lock:
+            self.users += 1
+            if self.users > 1:
+                return
+            self.task = self.engine.submit(self.run())
+        if not self.engine.in_loop() and not self.connected_event.wait(self.connect_timeout):
+            logger.warning("[MQTT] %s: Broker %s:%s não respondeu em %s s; tentando em segundo plano",
+                           self.client_id, self.broker, self.port, self.connect_timeout)
+            return
+        logger.info("[MQTT] %s conectado ao broker %s:%s (asyncio)", self.client_id, self.broker, self.port)
+
+    def stop(self):
+        """Libera um usuário; a conexão é encerrada quando nenhum componente a utiliza mais."""
+        with self.lock:
+            if self.users == 0:
+                return
+            self.users -= 1
+            if self.users > 0:
+                return
+            task, self.task = self.task, None
+        task.cancel()
+        self.connected = False
+        self.connected_event.clear()
+        logger.info("[MQTT] %s desconectado do broker", self.client_id)
+
+    async def run(self):
+        """Mantém a conexão, reconectando com espera exponencial, e despacha as mensagens recebidas."""
+        delay = self.min_reconnect_delay
+        while True:
+            try:
+                async with aiomqtt.Client(self.broker, self.port, client_id=self.client_id,
+                                          keepalive=self.keepalive) as client:
+                    # Publicações são disparadas sem aguardar; o aviso padrão do aiomqtt (>10 pendentes) é só ruído
+                    client.pending_calls_threshold = self.pending_calls_warning
+                    async with client.messages() as messages:
+                        # Lista e conexão mudam juntas: um subscribe() depois deste ponto assina pelo cliente novo
+                        with self.lock:
+                            topics = list(self.handlers) + list(self.wildcard_handlers)
+                            self.client = client
+                            self.connected = True
+                            self.connections += 1
+                        # Reassina todos os tópicos (necessário após uma reconexão)
+                        if topics:
+                            await client.subscribe([(topic, 0) for topic in topics])
+                        self.connected_event.set()
+                        delay = self.min_reconnect_delay
+                        async for message in messages:
+                            self.dispatch(ReceivedMessage(message.topic.value, message.payload, message.qos,
+                                                          message.retain))
+            except aiomqtt.MqttError as e:
+                with self.lock:
+                    if self.connected:
+                        self.disconnections += 1
+                    self.client = None
+                    self.connected = False
+                logger.warning("[MQTT] %s: Conexão perdida (%s), tentando reconectar em %s s...",
+                               self.client_id, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            finally:
+                with self.lock:
+                    self.client = None
+                    self.connected = False
+
+    def subscribe(self, topic, handler):
+        """Registra um handler (client, userdata, message) para o tópico, assinando-o no broker se necessário."""
+        with self.lock:
+            table = self.wildcard_handlers if ("+" in topic or "#" in topic) else self.handlers
+            handlers = table.setdefault(topic, [])
+            first = not handlers
+            if handler not in handlers:
+                # Copia a lista para não alterar uma iteração em andamento no loop
+                table[topic] = handlers + [handler]
+            client = self.client if first and self.connected else None
+        if client is not None:
+            self.send(client.subscribe(topic))
+
+    def unsubscribe(self, topic, handler):
+        with self.lock:
+            table = self.wildcard_handlers if ("+" in topic or "#" in topic) else self.handlers
+            handlers = [h for h in table.get(topic, []) if h != handler]
+            removed = False
+            if handlers:
+                table[topic] = handlers
+            elif topic in table:
+                del table[topic]
+                removed = True
+            client = self.client if removed and self.connected else None
+        if client is not None:
+            self.send(client.unsubscribe(topic))
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        client = self.client
+        if client is None:
+            self.publish_errors += 1
+            logger.warning("[MQTT] %s: Sem conexão; publicação em %s descartada", self.client_id, topic)
+            return None
+        self.messages_out += 1
+        return self.send(client.publish(topic, payload, qos=qos, retain=retain))
+
+    def send(self, coroutine):
+        """Executa a operação do aiomqtt no loop sem bloquear quem chama."""
+        if self.engine.in_loop():
+            task = asyncio.ensure_future(coroutine)
+            task.add_done_callback(self.on_send_done)
+            return task
+        future = self.engine.submit(coroutine)
+        future.add_done_callback(self.on_send_done)
+        return future
+
+    def on_send_done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.publish_errors += 1
+            logger.error("[MQTT] %s: Erro ao enviar ao broker: %s", self.client_id, future.exception())
+
+    def dispatch(self, message):
+        """Encaminha a mensagem aos handlers do tópico."""
+        self.messages_in += 1
+        handlers = self.handlers.get(message.topic, [])
+        if self.wildcard_handlers:
+            handlers = handlers + [
+                handler
+                for topic_filter, topic_handlers in list(self.wildcard_handlers.items())
+                if mqtt.topic_matches_sub(topic_filter, message.topic)
+                for handler in topic_handlers
+            ]
+        if not handlers:
+            self.unroutable += 1
+            return
+        for handler in handlers:
+            try:
+                handler(self.client, None, message)
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error("[MQTT] %s: Erro no handler de %s: %s", self.client_id, message.topic, e)
+
+    def stats(self):
+        return {
+            "client_id": self.client_id,
+            "engine": "asyncio",
+            "connected": self.connected,
+            "users": self.users,
+            "topics": len(self.handlers) + len(self.wildcard_handlers),
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "publish_errors": self.publish_errors,
+            "unroutable": self.unroutable,
+            "handler_errors": self.handler_errors,
+            "connections": self.connections,
+            "disconnections": self.disconnections,
+        }
@@ -0,0 +1,141 @@
+import logging
+import threading
+import uuid
+
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+
+class MqttTransport:
+    """Conexão MQTT que multiplexa assinaturas e publicações de vários componentes do processo."""
+
+    def __init__(self, client_id=None, broker="localhost", port=1883, keepalive=60,
+                 min_reconnect_delay=1, max_reconnect_delay=30):
+        self.client_id = client_id or f"Transport_{uuid.uuid4().hex[:8]}"
+        self.broker = broker
+        self.port = port
+        self.keepalive = keepalive
+        self.client = mqtt.Client(self.client_id)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        # Reconexão automática com espera exponencial feita pela thread de rede do paho
+        self.client.reconnect_delay_set(min_reconnect_delay, max_reconnect_delay)
+
+        self.handlers = {}  # Tópico exato -> handlers (despacho O(1))
+        self.wildcard_handlers = {}  # Filtros com + ou # -> handlers
+        self.lock = threading.RLock()
+        self.users = 0  # Componentes que iniciaram o transporte
+        self.connected = False
+
+        # Contadores expostos por stats()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.unroutable = 0
+        self.handler_errors = 0
+        self.connections = 0
+        self.disconnections = 0
+
+    def start(self):
+        """Conecta ao broker no primeiro uso; chamadas seguintes só incrementam a contagem de usuários."""
+        with self.lock:
+            self.users += 1
+            if self.users > 1:
+                return
+            self.client.connect(self.broker, self.port, self.keepalive)
+            self.client.loop_start()
+        logger.info("[MQTT] %s conectado ao broker %s:%s", self.client_id, self.broker, self.port)
+
+    def stop(self):
+        """Libera um usuário; a conexão é encerrada quando nenhum componente a utiliza mais."""
+        with self.lock:
+            if self.users == 0:
+                return
+            self.users -= 1
+            if self.users > 0:
+                return
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.connected = False
+        logger.info("[MQTT] %s desconectado do broker", self.client_id)
+
+    def subscribe(self, topic, handler):
+        """Registra um handler (client, userdata, message) para o tópico, assinando-o no broker se necessário."""
+        with self.lock:
+            table = self.wildcard_handlers if ("+" in topic or "#" in topic) else self.handlers
+            handlers = table.setdefault(topic, [])
+            first = not handlers
+            if handler not in handlers:
+                # Copia a lista para não alterar uma iteração em andamento na thread de rede
+                table[topic] = handlers + [handler]
+            if first and self.connected:
+                self.client.subscribe(topic)
+
+    def unsubscribe(self, topic, handler):
+        with self.lock:
+            table = self.wildcard_handlers if ("+" in topic or "#" in topic) else self.handlers
+            handlers = [h for h in table.get(topic, []) if h != handler]
+            if handlers:
+                table[topic] = handlers
+            elif topic in table:
+                del table[topic]
+                if self.connected:
+                    self.client.unsubscribe(topic)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.messages_out += 1
+        return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            logger.error("[MQTT] %s: Falha na conexão com o broker (rc=%s)", self.client_id, rc)
+            return
+        with self.lock:
+            self.connected = True
+            self.connections += 1
+            topics = list(self.handlers) + list(self.wildcard_handlers)
+        # Reassina todos os tópicos (necessário após uma reconexão)
+        if topics:
+            client.subscribe([(topic, 0) for topic in topics])
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        self.disconnections += 1
+        if rc != 0:
+            logger.warning("[MQTT] %s: Conexão perdida (rc=%s), tentando reconectar...", self.client_id, rc)
+
+    def on_message(self, client, userdata, message):
+        """Encaminha a mensagem aos handlers do tópico."""
+        self.messages_in += 1
+        handlers = self.handlers.get(message.topic, [])
+        if self.wildcard_handlers:
+            handlers = handlers + [
+                handler
+                for topic_filter, topic_handlers in list(self.wildcard_handlers.items())
+                if mqtt.topic_matches_sub(topic_filter, message.topic)
+                for handler in topic_handlers
+            ]
+        if not handlers:
+            self.unroutable += 1
+            return
+        for handler in handlers:
+            try:
+                handler(client, userdata, message)
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error("[MQTT] %s: Erro no handler de %s: %s", self.client_id, message.topic, e)
+
+    def stats(self):
+        return {
+            "client_id": self.client_id,
+            "connected": self.connected,
+            "users": self.users,
+            "topics": len(self.handlers) + len(self.wildcard_handlers),
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "unroutable": self.unroutable,
+            "handler_errors": self.handler_errors,
+            "connections": self.connections,
+            "disconnections": self.disconnections,
+        }
@@ -0,0 +1,67 @@
+import json
+import struct
+
+# Primeiro byte do formato binário: versão do esquema. Payloads JSON começam com "{" ou espaço em branco,
+# então qualquer primeiro byte de controle (abaixo de 0x20, exceto tab/CR/LF) identifica o formato binário.
+BINARY_VERSION = 1
+JSON_WHITESPACE = b"\t\n\r"
+
+# Versão 1: versão (B), código da unidade (B), valor (float64, big-endian) = 10 bytes
+BINARY_FORMAT_V1 = struct.Struct("!BBd")
+
+# Código de cada unidade no formato binário (0 = sem unidade/desconhecida)
+UNIT_CODES = {"°C": 1, "%": 2, "lux": 3}
+UNITS_BY_CODE = {code: unit for unit, code in UNIT_CODES.items()}
+
+
+class JsonCodec:
+    """Formato original: {"valor": ..., "unidade": ...} em JSON."""
+
+    name = "json"
+
+    def encode(self, value, unit):
+        return json.dumps({"valor": value, "unidade": unit})
+
+    def decode(self, payload):
+        data = json.loads(payload.decode() if isinstance(payload, (bytes, bytearray)) else payload)
+        if not isinstance(data, dict):
+            # JSON válido mas não é um objeto (ex.: 42 ou [1]): data["valor"] levantaria TypeError
+            raise ValueError(f"Payload JSON não é um objeto: {type(data).__name__}")
+        return data
+
+
+class BinaryCodec:
+    """Formato compacto de tamanho fixo, com byte de versão do esquema."""
+
+    name = "binary"
+
+    def encode(self, value, unit):
+        return BINARY_FORMAT_V1.pack(BINARY_VERSION, UNIT_CODES.get(unit, 0), value)
+
+    def decode(self, payload):
+        if payload[0] != BINARY_VERSION:
+            raise ValueError(f"Versão de payload binário não suportada: {payload[0]}")
+        try:
+            _, unit_code, value = BINARY_FORMAT_V1.unpack(payload)
+        except struct.error as e:
+            raise ValueError(f"Payload binário malformado: {e}") from None
+        return {"valor": value, "unidade": UNITS_BY_CODE.get(unit_code)}
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), BinaryCodec())}
+
+
+def get_codec(name):
+    if name not in CODECS:
+        raise ValueError(f"Codec de payload desconhecido: {name}. Use um de {list(CODECS)}")
+    return CODECS[name]
+
+
+def decode_payload(payload):
+    """Decodifica um payload de sensor detectando o formato: binário pelo byte de versão, JSON caso contrário.
+
+    Retorna o dicionário {"valor": ..., "unidade": ...}; levanta ValueError se o payload for inválido.
+    """
+    if isinstance(payload, (bytes, bytearray)) and payload and payload[0] < 0x20 and payload[0] not in JSON_WHITESPACE:
+        return CODECS["binary"].decode(payload)
+    return CODECS["json"].decode(payload)